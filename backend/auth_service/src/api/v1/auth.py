@@ -1,27 +1,53 @@
-from fastapi import APIRouter, Body, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Path, Request, status
+from fastapi.responses import StreamingResponse
 
 from service.auth import (
     SendCodeService,
     get_send_code_service,
+    SendCodeBatchService,
+    get_send_code_batch_service,
+    SendCodeJobService,
+    get_send_code_job_service,
     ValidateCodeService,
     get_validate_code_service,
     ValidatePasswordService,
     get_validate_password_service,
 )
+from service.idempotency import IdempotencyCache, get_idempotency_cache
 from schema.auth import (
     SendCodeRequest,
+    SendCodeBatchRequest,
     ValidateCodeRequest,
+    SendCodeAcceptedResponse,
     ValidatePasswordRequest,
     SendCodeResponse,
     ValidateCodeResponse,
     ValidatePasswordResponse,
 )
-from exception.telegram import AlreadyLoggedIn, CodeExpired, PasswordExpired
+from core.settings import settings
+from middleware import is_peer_request
+from middleware.rate_limit import get_client_ip
+from exception.storage import StorageCapacityExceeded
+from exception.telegram import (
+    AlreadyLoggedIn,
+    CodeExpired,
+    PasswordExpired,
+    FloodWait,
+    TelegramUnavailable,
+)
 
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 
+def get_caller(request: Request) -> str:
+    """Client IP, the node forwarding a request appends it to X-Forwarded-For."""
+    forwarded_hops = settings.rate_limit.forwarded_hops
+    if is_peer_request(request.scope):
+        forwarded_hops += 1
+    return get_client_ip(request.scope, forwarded_hops=forwarded_hops)
+
+
 @router.post(
     path="/send_code",
     summary="Send telegram code to phone number.",
@@ -34,6 +60,10 @@ router = APIRouter(prefix="/auth", tags=["Auth"])
         },
         status.HTTP_400_BAD_REQUEST: {"description": "Something went wrong"},
         status.HTTP_409_CONFLICT: {"description": "Telegram account already logged in"},
+        status.HTTP_429_TOO_MANY_REQUESTS: {
+            "description": "Too many pending auth flows or telegram flood limit"
+        },
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Telegram is unreachable"},
     },
 )
 async def send_code(
@@ -41,6 +71,14 @@ async def send_code(
         description="Neccessary info to send code in telegram."
     ),
     send_code_service: SendCodeService = Depends(get_send_code_service),
+    idempotency_key: str | None = Header(
+        default=None,
+        alias="Idempotency-Key",
+        max_length=255,
+        description="Retries with the same key replay the first response.",
+    ),
+    idempotency_cache: IdempotencyCache = Depends(get_idempotency_cache),
+    caller: str = Depends(get_caller),
 ) -> SendCodeResponse:
     """
     `Initiates` Telegram account authentication by `phone number`.
@@ -58,11 +96,168 @@ async def send_code(
     - `200`: Verification code sent successfully
     - `400`: Something went wrong
     - `409`: Already logged in
+    - `429`: Too many pending auth flows or telegram flood limit, retry after `Retry-After` seconds
+    - `503`: Telegram is unreachable, retry after `Retry-After` seconds
+
+    Requests retried with the same `Idempotency-Key` get the first response,
+    except for `429` and `503` ones.
+    """
+
+    async def process() -> SendCodeResponse:
+        try:
+            return await send_code_service.send_code(
+                send_code_request=send_code_request
+            )
+        except AlreadyLoggedIn:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT, detail="Already logged in."
+            )
+        except StorageCapacityExceeded:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many pending auth flows.",
+                headers={"Retry-After": str(settings.capacity.retry_after)},
+            )
+        except FloodWait as exception:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Telegram flood limit reached.",
+                headers={"Retry-After": str(exception.seconds)},
+            )
+        except TelegramUnavailable as exception:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Telegram is unavailable.",
+                headers={"Retry-After": str(exception.seconds)},
+            )
+
+    return await idempotency_cache.run(
+        scope="send_code",
+        caller=caller,
+        key=idempotency_key,
+        request=send_code_request,
+        func=process,
+    )
+
+
+@router.post(
+    path="/send_code/async",
+    summary="Send telegram code to phone number in the background.",
+    response_model=SendCodeAcceptedResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={
+        status.HTTP_202_ACCEPTED: {
+            "model": SendCodeAcceptedResponse,
+            "description": "Sending code started.",
+        },
+        status.HTTP_429_TOO_MANY_REQUESTS: {
+            "description": "Too many pending auth flows or running jobs"
+        },
+    },
+)
+async def send_code_async(
+    send_code_request: SendCodeRequest = Body(
+        description="Neccessary info to send code in telegram."
+    ),
+    send_code_job_service: SendCodeJobService = Depends(get_send_code_job_service),
+) -> SendCodeAcceptedResponse:
+    """
+    `Initiates` Telegram account authentication by `phone number` without waiting for telegram.
+
+    The session is returned at once, the code is sent by a background job.
+    Follow the job at `/send_code/events/{session}`.
+
+    Status Codes:
+    - `202`: Sending code started
+    - `429`: Too many pending auth flows or running jobs, retry after `Retry-After` seconds
     """
     try:
-        return await send_code_service.send_code(send_code_request=send_code_request)
-    except AlreadyLoggedIn:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Already logged in.")
+        return await send_code_job_service.submit(
+            phone_number=send_code_request.phone_number
+        )
+    except StorageCapacityExceeded:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many pending auth flows.",
+            headers={"Retry-After": str(settings.capacity.retry_after)},
+        )
+
+
+@router.get(
+    path="/send_code/events/{session}",
+    summary="Stream auth steps of a background send code.",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "content": {"text/event-stream": {}},
+            "description": "Server-Sent Events until the job finishes.",
+        },
+        status.HTTP_404_NOT_FOUND: {"description": "Unknown or long finished job"},
+    },
+)
+async def send_code_events(
+    session: str = Path(description="The session string of a background send code."),
+    send_code_job_service: SendCodeJobService = Depends(get_send_code_job_service),
+) -> StreamingResponse:
+    """
+    `Streams` auth steps of a background send code as Server-Sent Events.
+
+    Events:
+    - `step`: `{"step": ..., "session": ...}` with step `pending`, then `validate_code`
+    or `validate_password`. Continue with the `session` of this event, it differs
+    from the requested one when the phone number already had a pending auth flow.
+    - `error`: `{"error": ..., "retry_after": ...}` with the same errors as `/send_code/batch`
+
+    The stream ends after the last event.
+    """
+    channel = send_code_job_service.channel(handle=session)
+    if channel is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found.")
+    return StreamingResponse(
+        content=send_code_job_service.stream(channel=channel),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post(
+    path="/send_code/batch",
+    summary="Send telegram codes to several phone numbers.",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "content": {"application/x-ndjson": {}},
+            "description": "One JSON line per phone number as soon as it is processed.",
+        },
+    },
+)
+async def send_code_batch(
+    send_code_batch_request: SendCodeBatchRequest = Body(
+        description="Phone numbers to send code in telegram."
+    ),
+    send_code_batch_service: SendCodeBatchService = Depends(
+        get_send_code_batch_service
+    ),
+) -> StreamingResponse:
+    """
+    `Initiates` Telegram account authentication for several `phone numbers`.
+
+    Phone numbers are processed concurrently, `BATCH__CONCURRENCY` at once.
+    Each line of the NDJSON stream carries:
+    - `phone_number`
+    - `session` and `step` when the code was sent
+    - `error` otherwise: `AlreadyLoggedIn`, `FloodWait`, `TelegramUnavailable`,
+    `StorageCapacityExceeded` or `Internal`, with `retry_after` seconds when retrying makes sense
+    """
+    return StreamingResponse(
+        content=send_code_batch_service.stream(
+            phone_numbers=send_code_batch_request.phone_numbers
+        ),
+        media_type="application/x-ndjson",
+    )
+
 
 @router.post(
     path="/validate_code",
@@ -76,6 +271,8 @@ async def send_code(
         },
         status.HTTP_400_BAD_REQUEST: {"description": "Something went wrong."},
         status.HTTP_409_CONFLICT: {"description": "Telegram sent code expired."},
+        status.HTTP_429_TOO_MANY_REQUESTS: {"description": "Telegram flood limit"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Telegram is unreachable"},
     },
 )
 async def validate_code(
@@ -83,6 +280,14 @@ async def validate_code(
         description="Neccessary info to verify telegram code."
     ),
     validate_code_service: ValidateCodeService = Depends(get_validate_code_service),
+    idempotency_key: str | None = Header(
+        default=None,
+        alias="Idempotency-Key",
+        max_length=255,
+        description="Retries with the same key replay the first response.",
+    ),
+    idempotency_cache: IdempotencyCache = Depends(get_idempotency_cache),
+    caller: str = Depends(get_caller),
 ) -> ValidateCodeResponse:
     """`Authenticates` Telegram account using received verification `code`.
 
@@ -101,13 +306,42 @@ async def validate_code(
     - `200`: Authentication successful (background tasks started).
     - `400`: Something went wrong
     - `409`: Code expired
+    - `429`: Telegram flood limit, retry after `Retry-After` seconds
+    - `503`: Telegram is unreachable, retry after `Retry-After` seconds
+
+    Requests retried with the same `Idempotency-Key` get the first response,
+    except for `429` and `503` ones.
     """
-    try:
-        return await validate_code_service.validate(
-            validate_code_request=validate_code_request
-        )
-    except CodeExpired:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Code expired.")
+
+    async def process() -> ValidateCodeResponse:
+        try:
+            return await validate_code_service.validate(
+                validate_code_request=validate_code_request
+            )
+        except CodeExpired:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT, detail="Code expired."
+            )
+        except FloodWait as exception:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Telegram flood limit reached.",
+                headers={"Retry-After": str(exception.seconds)},
+            )
+        except TelegramUnavailable as exception:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Telegram is unavailable.",
+                headers={"Retry-After": str(exception.seconds)},
+            )
+
+    return await idempotency_cache.run(
+        scope="validate_code",
+        caller=caller,
+        key=idempotency_key,
+        request=validate_code_request,
+        func=process,
+    )
 
 
 @router.post(
@@ -121,6 +355,8 @@ async def validate_code(
             "description": "Sign in by cloud password was successfully.",
         },
         status.HTTP_400_BAD_REQUEST: {"description": "Something went wrong"},
+        status.HTTP_429_TOO_MANY_REQUESTS: {"description": "Telegram flood limit"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Telegram is unreachable"},
     },
 )
 async def validate_password(
@@ -130,6 +366,14 @@ async def validate_password(
     validate_password_service: ValidatePasswordService = Depends(
         get_validate_password_service
     ),
+    idempotency_key: str | None = Header(
+        default=None,
+        alias="Idempotency-Key",
+        max_length=255,
+        description="Retries with the same key replay the first response.",
+    ),
+    idempotency_cache: IdempotencyCache = Depends(get_idempotency_cache),
+    caller: str = Depends(get_caller),
 ) -> ValidatePasswordResponse:
     """`Authenticates` Telegram account using `cloud password` (2FA).
 
@@ -148,10 +392,39 @@ async def validate_password(
     - `200`: Authentication successfull.
     - `400`: Something went wrong.
     - `409`: Session password expired.
+    - `429`: Telegram flood limit, retry after `Retry-After` seconds.
+    - `503`: Telegram is unreachable, retry after `Retry-After` seconds.
+
+    Requests retried with the same `Idempotency-Key` get the first response,
+    except for `429` and `503` ones.
     """
-    try:
-        return await validate_password_service.validate(
-        validate_password_request=validate_password_request
+
+    async def process() -> ValidatePasswordResponse:
+        try:
+            return await validate_password_service.validate(
+                validate_password_request=validate_password_request
+            )
+        except PasswordExpired:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT, detail="Password expired"
+            )
+        except FloodWait as exception:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Telegram flood limit reached.",
+                headers={"Retry-After": str(exception.seconds)},
+            )
+        except TelegramUnavailable as exception:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Telegram is unavailable.",
+                headers={"Retry-After": str(exception.seconds)},
+            )
+
+    return await idempotency_cache.run(
+        scope="validate_password",
+        caller=caller,
+        key=idempotency_key,
+        request=validate_password_request,
+        func=process,
     )
-    except PasswordExpired:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Password expired")
@@ -1,4 +1,12 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import ORJSONResponse
+
+from service.cluster import ClusterRouter, get_cluster_router
+from service.health import ReadinessService, get_readiness_service
+from service.telegram.circuit import ConnectivityGuard, get_connectivity_guard
+from service.telegram.credential import CredentialPool, get_credential_pool
+from service.telegram.dc import DCPredictor, get_dc_predictor
+from service.telegram.proxy import ProxyPool, get_proxy_pool
 
 
 router = APIRouter(prefix="/healthcheck", tags=["Health"])
@@ -7,3 +15,53 @@ router = APIRouter(prefix="/healthcheck", tags=["Health"])
 @router.get(path="")
 async def check_healt_status():
     return {"status": "ok"}
+
+
+@router.get(path="/ready")
+async def check_readiness(
+    readiness_service: ReadinessService = Depends(get_readiness_service),
+):
+    """
+    Report loop lag, pending flows, telegram connections and activity.
+
+    Responds 503 while a threshold is exceeded, so traffic is routed
+    to other instances. Pending flows are null with the redis storage.
+    """
+    ready, report = await readiness_service.check()
+    return ORJSONResponse(
+        content=report,
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+
+@router.get(path="/dc_prediction")
+async def get_dc_prediction_stats(
+    dc_predictor: DCPredictor = Depends(get_dc_predictor),
+):
+    return dc_predictor.stats()
+
+
+@router.get(path="/circuit")
+async def get_circuit_states(
+    connectivity_guard: ConnectivityGuard = Depends(get_connectivity_guard),
+):
+    return connectivity_guard.stats()
+
+
+@router.get(path="/credentials")
+async def get_credential_stats(
+    credential_pool: CredentialPool = Depends(get_credential_pool),
+):
+    return credential_pool.stats()
+
+
+@router.get(path="/proxies")
+async def get_proxy_stats(proxy_pool: ProxyPool = Depends(get_proxy_pool)):
+    return proxy_pool.stats()
+
+
+@router.get(path="/cluster")
+async def get_cluster_stats(
+    cluster_router: ClusterRouter = Depends(get_cluster_router),
+):
+    return cluster_router.stats()
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from service.metrics import registry
+
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get(path="/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(
+        content=await registry.render(), media_type=registry.CONTENT_TYPE
+    )
@@ -0,0 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache, partial
+from typing import AsyncIterator, Callable, TypeVar
+import asyncio
+
+from core.settings import settings
+
+
+T = TypeVar("T")
+
+
+@lru_cache
+def get_blocking_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers=settings.executor.workers, thread_name_prefix="blocking"
+    )
+
+
+async def run_blocking(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run blocking disk work in the thread pool, keeping the event loop free."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_blocking_executor(), partial(func, *args, **kwargs)
+    )
+
+
+@asynccontextmanager
+async def executor_lifespan() -> AsyncIterator[None]:
+    try:
+        yield
+    finally:
+        get_blocking_executor().shutdown(wait=True)
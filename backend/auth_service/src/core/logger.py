@@ -1,30 +1,186 @@
+from contextvars import ContextVar, Token
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import datetime
+import hashlib
+import hmac
+import logging
+import os
+import queue
+import random
+
+import orjson
+
+from core.settings import settings
+
+
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 LOG_DEFAULT_HANDLERS = [
     "console",
 ]
 
-LOGGING = {
-    "version": 1,
-    "disable_existing_loggers": False,
-    "formatters": {
-        "verbose": {"format": LOG_FORMAT},
-    },
-    "handlers": {
-        "console": {
-            "level": "DEBUG",
-            "class": "logging.StreamHandler",
-            "formatter": "verbose",
+_log_context: ContextVar[dict[str, str]] = ContextVar("log_context", default={})
+
+
+@lru_cache
+def _redact_key() -> bytes:
+    """`LOG__REDACT_KEY`, or a random key which hashes stay stable under until restart."""
+    return settings.log.redact_key.encode() or os.urandom(32)
+
+
+def redact(value: str) -> str:
+    """Short keyed hash logged in place of a phone number or a session handle.
+
+    The key keeps phone numbers from being recovered by hashing every number.
+    """
+    return hmac.new(_redact_key(), value.encode(), hashlib.sha256).hexdigest()[:12]
+
+
+def bind_log_context(
+    request_id: str | None = None,
+    step: str | None = None,
+    phone_number: str | None = None,
+) -> Token:
+    """Add fields to records logged by the current task and the tasks it starts.
+
+    Phone numbers are logged as a short hash only.
+    """
+    context = dict(_log_context.get())
+    if request_id is not None:
+        context["request_id"] = request_id
+    if step is not None:
+        context["step"] = step
+    if phone_number is not None:
+        context["phone"] = redact(phone_number)
+    return _log_context.set(context)
+
+
+def reset_log_context(token: Token) -> None:
+    _log_context.reset(token)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, context fields included.
+
+    Queued records carry the context of the task which logged them,
+    records formatted in place read it from the current task.
+    """
+
+    CONTEXT_FIELDS = ("request_id", "step", "phone")
+
+    def format(self, record: logging.LogRecord) -> str:
+        context = _log_context.get()
+        payload = {
+            "time": datetime.datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
         }
-    },
-    "loggers": {
-        "": {
+        for field in self.CONTEXT_FIELDS:
+            value = getattr(record, field, None) or context.get(field)
+            if value is not None:
+                payload[field] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return orjson.dumps(payload).decode()
+
+
+class QueueLogHandler(QueueHandler):
+    """Hand records to a writer thread, the event loop never waits for stdout.
+
+    Records are dropped while the bounded queue is full and the count of
+    dropped records is logged once there is room again. DEBUG records are
+    sampled at `debug_sample_rate`.
+    """
+
+    FORMATTERS = {"json": JsonFormatter, "text": lambda: logging.Formatter(LOG_FORMAT)}
+
+    def __init__(
+        self,
+        format: str = "text",
+        queue_size: int = 10000,
+        debug_sample_rate: float = 1.0,
+    ) -> None:
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.dropped = 0
+        self._debug_sample_rate = debug_sample_rate
+
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(self.FORMATTERS[format]())
+        self.listener = QueueListener(self.queue, stream_handler)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Freeze the message and the task context, formatting is left to the writer."""
+        record.msg = record.getMessage()
+        record.args = None
+        record.__dict__.update(_log_context.get())
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.dropped and not self.queue.full():
+            dropped, self.dropped = self.dropped, 0
+            self.queue.put_nowait(
+                logging.makeLogRecord({
+                    "name": __name__,
+                    "levelno": logging.WARNING,
+                    "levelname": "WARNING",
+                    "msg": f"Dropped {dropped} log records, the log queue was full.",
+                })
+            )
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if (
+            record.levelno <= logging.DEBUG
+            and random.random() >= self._debug_sample_rate
+        ):
+            return
+        super().emit(record)
+
+
+def get_logging_config() -> dict:
+    """`logging.config.dictConfig` of the log settings.
+
+    Built on call, importing this module does not load the settings.
+    """
+    formatter = "json" if settings.log.format == "json" else "verbose"
+    return {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "formatters": {
+            "verbose": {"format": LOG_FORMAT},
+            "json": {"()": JsonFormatter},
+        },
+        "handlers": {
+            "console": {
+                "level": "DEBUG",
+                "()": QueueLogHandler,
+                "format": settings.log.format,
+                "queue_size": settings.log.queue_size,
+                "debug_sample_rate": settings.log.debug_sample_rate,
+            }
+            if settings.log.queue
+            else {
+                "level": "DEBUG",
+                "class": "logging.StreamHandler",
+                "formatter": formatter,
+            }
+        },
+        "loggers": {
+            "": {
+                "handlers": LOG_DEFAULT_HANDLERS,
+                "level": settings.log.level,
+            }
+        },
+        "root": {
+            "level": settings.log.level,
+            "formatter": formatter,
             "handlers": LOG_DEFAULT_HANDLERS,
-            "level": "INFO",
-        }
-    },
-    "root": {
-        "level": "INFO",
-        "formatter": "verbose",
-        "handlers": LOG_DEFAULT_HANDLERS,
-    },
-}
+        },
+    }
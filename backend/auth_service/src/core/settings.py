@@ -1,9 +1,9 @@
-from typing import Literal
+from typing import Any, Callable, Generic, Literal, TypeVar
 import os
 
 from cryptography.fernet import Fernet
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 
 class PathSettings:
@@ -13,12 +13,18 @@ class PathSettings:
 
     session_dir: str = os.path.join(media_dir, "session")
 
+    shared_session_file: str = os.path.join(session_dir, "shared.sqlite")
+
+    dc_prefix_file: str = os.path.join(media_dir, "dc_prefix.json")
+
+    trace_file: str = os.path.join(media_dir, "traces.jsonl")
+
 
 class CryptSettings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="CRYPT__", frozen=True, extra="forbid")
 
     key: bytes = Field(
-        default=Fernet.generate_key(),
+        default_factory=Fernet.generate_key,
         description="The main application host",
         repr=False,
     )
@@ -35,6 +41,14 @@ class UvicornSettings(BaseSettings):
     workers: int = Field(default=1, description="Count of uvicorn workers", ge=0)
 
 
+class TelegramCredential(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    api_id: int = Field(..., description="Telegram app api id", repr=False)
+    api_hash: str = Field(..., description="Telegram app api hash", repr=False)
+    weight: int = Field(default=1, description="Share of auth flows", ge=1)
+
+
 class TelegramSettings(BaseSettings):
     model_config = SettingsConfigDict(
         env_prefix="TELEGRAM__", frozen=True, extra="forbid"
@@ -42,6 +56,10 @@ class TelegramSettings(BaseSettings):
 
     api_id: int = Field(..., description="Telegram app api id", repr=False)
     api_hash: str = Field(..., description="Telegram app api hash", repr=False)
+    credentials: list[TelegramCredential] = Field(
+        default_factory=list,
+        description="JSON list of app credentials to balance, api_id/api_hash when empty",
+    )
 
     use_proxy: bool = Field(..., description="Use or not proxy")
 
@@ -54,6 +72,405 @@ class ProxySettings(BaseSettings):
     hostname: str = Field(description="proxy hostname", default="localhost")
     port: int = Field(description="proxy port", ge=1024)
 
+    pool: list[str] = Field(
+        default_factory=list,
+        description="JSON list of proxy urls, scheme://[user:password@]host:port",
+    )
+    pool_file: str | None = Field(
+        default=None, description="File with one proxy url per line"
+    )
+    strategy: Literal["least_connections", "ewma"] = Field(
+        default="ewma", description="Proxy selection strategy"
+    )
+    probe_interval: float = Field(
+        default=30.0, description="Seconds between proxy health probes", gt=0
+    )
+    probe_timeout: float = Field(
+        default=5.0, description="Seconds to open a probe connection", gt=0
+    )
+    ewma_alpha: float = Field(
+        default=0.3, description="Weight of the latest latency sample", gt=0, le=1
+    )
+    eject_failures: int = Field(
+        default=3, description="Consecutive failures to eject a proxy", ge=1
+    )
+    eject_time: float = Field(
+        default=60.0, description="Min seconds an ejected proxy stays out", gt=0
+    )
+
+
+class StorageSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_prefix="STORAGE__", frozen=True, extra="forbid"
+    )
+
+    backend: Literal["memory", "redis"] = Field(
+        default="memory", description="Auth flow storage backend"
+    )
+    ttl: int = Field(default=300, description="Auth flow time to live in seconds", ge=1)
+    reap_interval: float = Field(
+        default=5.0, description="Seconds between expired auth flows eviction", gt=0
+    )
+    reap_batch_size: int = Field(
+        default=100, description="Max count of auth flows evicted at once", ge=1
+    )
+
+
+class CapacitySettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_prefix="CAPACITY__", frozen=True, extra="forbid"
+    )
+
+    max_flows: int = Field(
+        default=10000, description="Max count of pending auth flows", ge=1
+    )
+    overflow: Literal["reject", "evict"] = Field(
+        default="reject",
+        description="Reject new auth flows or evict the least recently used one when full",
+    )
+    retry_after: int = Field(
+        default=5, description="Retry-After seconds for rejected auth flows", ge=1
+    )
+
+
+class PoolSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="POOL__", frozen=True, extra="forbid")
+
+    enabled: bool = Field(default=False, description="Use pre-warmed telegram clients")
+    size: int = Field(default=4, description="Target count of idle clients", ge=1)
+    refill_interval: float = Field(
+        default=1.0, description="Seconds between pool refills", gt=0
+    )
+    health_check_interval: float = Field(
+        default=30.0, description="Seconds between idle clients health checks", gt=0
+    )
+    max_idle: int = Field(
+        default=600, description="Seconds an idle client may stay in the pool", ge=1
+    )
+
+
+class DCPredictionSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_prefix="DC_PREDICTION__", frozen=True, extra="forbid"
+    )
+
+    enabled: bool = Field(default=True, description="Start new clients on predicted DC")
+    max_depth: int = Field(
+        default=5, description="Count of phone number digits used as prefix", ge=1
+    )
+    min_samples: int = Field(
+        default=3, description="Min count of finished flows to trust a prefix", ge=1
+    )
+    save_interval: float = Field(
+        default=60.0, description="Seconds between DC prefixes saves", gt=0
+    )
+
+
+class SessionSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_prefix="SESSION__", frozen=True, extra="forbid"
+    )
+
+    backend: Literal["file", "shared"] = Field(
+        default="file",
+        description="One sqlite file per phone number or one shared sqlite database",
+    )
+    flush_interval: float = Field(
+        default=0.5, description="Seconds between shared session store commits", gt=0
+    )
+
+
+class AuthIndexSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_prefix="AUTH_INDEX__", frozen=True, extra="forbid"
+    )
+
+    enabled: bool = Field(
+        default=True, description="Answer logged in accounts from memory"
+    )
+    refresh_after: float = Field(
+        default=300.0, description="Seconds before re-checking authorization", gt=0
+    )
+    max_staleness: float = Field(
+        default=3600.0, description="Seconds an unchecked status stays trusted", gt=0
+    )
+    max_size: int = Field(
+        default=100000, description="Max count of remembered accounts", ge=1
+    )
+
+
+class PostLoginSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_prefix="POST_LOGIN__", frozen=True, extra="forbid"
+    )
+
+    workers: int = Field(
+        default=2, description="Count of finished auth flows processed at once", ge=1
+    )
+    queue_size: int = Field(
+        default=1000, description="Max count of queued finished auth flows", ge=1
+    )
+    drain_timeout: float = Field(
+        default=10.0, description="Seconds to finish queued auth flows on shutdown", gt=0
+    )
+
+
+class RPCSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="RPC__", frozen=True, extra="forbid")
+
+    api_rate: float = Field(
+        default=5.0, description="Telegram calls per second of one api_id", gt=0
+    )
+    api_burst: int = Field(
+        default=10, description="Telegram calls burst of one api_id", ge=1
+    )
+    dc_rate: float = Field(
+        default=2.0, description="Telegram calls per second to one DC", gt=0
+    )
+    dc_burst: int = Field(default=5, description="Telegram calls burst to one DC", ge=1)
+    max_wait: float = Field(
+        default=5.0,
+        description="Max seconds a call is queued before reporting the flood wait",
+        ge=0,
+    )
+
+
+class CircuitSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_prefix="CIRCUIT__", frozen=True, extra="forbid"
+    )
+
+    failure_threshold: int = Field(
+        default=5, description="Consecutive connection failures to open a circuit", ge=1
+    )
+    base_backoff: float = Field(
+        default=1.0, description="Seconds a circuit stays open the first time", gt=0
+    )
+    max_backoff: float = Field(
+        default=60.0, description="Max seconds a circuit stays open", gt=0
+    )
+    connect_timeout: float = Field(
+        default=10.0, description="Seconds to connect to telegram servers", gt=0
+    )
+
+
+class HandleSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="HANDLE__", frozen=True, extra="forbid")
+
+    mode: Literal["fernet", "opaque"] = Field(
+        default="fernet",
+        description="Encrypted phone number or random token stored server side",
+    )
+
+
+class ExecutorSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_prefix="EXECUTOR__", frozen=True, extra="forbid"
+    )
+
+    workers: int = Field(
+        default=4, description="Count of threads for blocking disk operations", ge=1
+    )
+
+
+class BatchSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="BATCH__", frozen=True, extra="forbid")
+
+    concurrency: int = Field(
+        default=8, description="Count of phone numbers of one batch processed at once", ge=1
+    )
+    max_size: int = Field(
+        default=100, description="Max count of phone numbers in one batch", ge=1
+    )
+
+
+class JobSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="JOB__", frozen=True, extra="forbid")
+
+    max_running: int = Field(
+        default=1000, description="Max count of send code jobs running at once", ge=1
+    )
+    retention: float = Field(
+        default=60.0, description="Seconds events of a finished job stay readable", gt=0
+    )
+    heartbeat: float = Field(
+        default=15.0, description="Seconds between keep-alive comments of event streams", gt=0
+    )
+
+
+class IdempotencySettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_prefix="IDEMPOTENCY__", frozen=True, extra="forbid"
+    )
+
+    max_size: int = Field(
+        default=10000, description="Max count of remembered idempotent requests", ge=1
+    )
+    ttl: float = Field(
+        default=300.0, description="Seconds a finished request is replayed to retries", gt=0
+    )
+
+
+class RateLimitSettings(BaseSettings):
+    model_config = SettingsConfigDict(
+        env_prefix="RATE_LIMIT__", frozen=True, extra="forbid"
+    )
+
+    enabled: bool = Field(default=True, description="Throttle auth requests")
+    backend: Literal["memory", "redis"] = Field(
+        default="memory", description="Limiter state per worker or shared in redis"
+    )
+    ip_rate: float = Field(
+        default=2.0, description="Auth requests per second of one client IP", gt=0
+    )
+    ip_burst: int = Field(
+        default=20, description="Auth requests burst of one client IP", ge=1
+    )
+    phone_rate: float = Field(
+        default=1 / 30, description="Auth requests per second for one phone number", gt=0
+    )
+    phone_burst: int = Field(
+        default=3, description="Auth requests burst for one phone number", ge=1
+    )
+    forwarded_hops: int = Field(
+        default=1,
+        description="Count of trusted proxies appending to X-Forwarded-For, 0 to ignore it",
+        ge=0,
+    )
+    cleanup_interval: float = Field(
+        default=60.0, description="Seconds between idle limiter state sweeps", gt=0
+    )
+
+
+class TraceSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="TRACE__", frozen=True, extra="forbid")
+
+    sample_rate: float = Field(
+        default=0.01, description="Share of requests traced, 0 to disable", ge=0, le=1
+    )
+    batch_size: int = Field(
+        default=512, description="Count of spans written at once", ge=1
+    )
+    queue_size: int = Field(
+        default=10000, description="Max count of spans waiting for export", ge=1
+    )
+    flush_interval: float = Field(
+        default=5.0, description="Seconds between span exports", gt=0
+    )
+    max_file_size: int = Field(
+        default=64 * 1024 * 1024, description="Bytes of the trace file before rotation", ge=1
+    )
+
+
+class LogSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="LOG__", frozen=True, extra="forbid")
+
+    level: Literal["DEBUG", "INFO", "WARNING", "ERROR"] = Field(
+        default="INFO", description="Min level of logged records"
+    )
+    format: Literal["text", "json"] = Field(
+        default="text", description="Plain text lines or one JSON object per line"
+    )
+    queue: bool = Field(
+        default=True, description="Write logs from a separate thread through a queue"
+    )
+    queue_size: int = Field(
+        default=10000, description="Max count of queued records, newer ones are dropped", ge=1
+    )
+    debug_sample_rate: float = Field(
+        default=0.01, description="Share of DEBUG records written", ge=0, le=1
+    )
+    redact_key: str = Field(
+        default="",
+        description="HMAC key of logged phone number hashes, random per process when empty",
+    )
+
+
+class HealthSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="HEALTH__", frozen=True, extra="forbid")
+
+    lag_interval: float = Field(
+        default=0.5, description="Seconds between event loop lag samples", gt=0
+    )
+    lag_window: int = Field(
+        default=120, description="Count of lag samples kept for percentiles", ge=1
+    )
+    max_loop_lag: float = Field(
+        default=0.5, description="Seconds of p99 loop lag of a ready instance", gt=0
+    )
+    max_pending_flows: int = Field(
+        default=10000, description="Pending auth flows of a ready instance", ge=1
+    )
+    max_connections: int = Field(
+        default=1000, description="Open telegram connections of a ready instance", ge=1
+    )
+    max_telegram_failing: float = Field(
+        default=60.0,
+        description="Seconds telegram may fail without a success before unready",
+        gt=0,
+    )
+
+
+class ClusterSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="CLUSTER__", frozen=True, extra="forbid")
+
+    enabled: bool = Field(default=False, description="Route auth flows among several nodes")
+    node_id: str = Field(
+        default="node-1", description="Id of this node", pattern=r"^[A-Za-z0-9_-]+$"
+    )
+    peers: dict[str, str] = Field(
+        default_factory=dict,
+        description="JSON object of node ids to base urls, http://host:port",
+    )
+    draining: list[str] = Field(
+        default_factory=list,
+        description="JSON list of node ids serving their flows but no new ones",
+    )
+    peers_file: str | None = Field(
+        default=None,
+        description="JSON file with `peers` and `draining`, reloaded when it changes",
+    )
+    reload_interval: float = Field(
+        default=5.0, description="Seconds between checks of the peers file", gt=0
+    )
+    secret: str = Field(
+        default="",
+        description="Shared secret of requests forwarded by nodes, required in cluster mode",
+        repr=False,
+    )
+    vnodes: int = Field(
+        default=128, description="Points of one node on the hash ring", ge=1
+    )
+    pool_size: int = Field(
+        default=32, description="Max concurrent forwarded requests to one node", ge=1
+    )
+    idle_timeout: float = Field(
+        default=4.0,
+        description="Seconds a connection to a node is kept idle, below its keep-alive",
+        gt=0,
+    )
+    connect_timeout: float = Field(
+        default=2.0, description="Seconds to connect to a node", gt=0
+    )
+    response_timeout: float = Field(
+        default=30.0, description="Seconds to wait for the response of a node", gt=0
+    )
+
+    @model_validator(mode="after")
+    def check_secret(self) -> "ClusterSettings":
+        # Without it any client could pass for a node and skip the routing.
+        if self.enabled and not self.secret:
+            raise ValueError("CLUSTER__SECRET is required in cluster mode")
+        return self
+
+
+class RedisSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="REDIS__", frozen=True, extra="forbid")
+
+    host: str = Field(default="localhost", description="Redis hostname")
+    port: int = Field(default=6379, description="Redis port", ge=1, le=65535)
+    db: int = Field(default=0, description="Redis database index", ge=0)
+
 
 class ProjectSettings(BaseSettings):
     model_config = SettingsConfigDict(
@@ -64,15 +481,66 @@ class ProjectSettings(BaseSettings):
     description: str = Field(..., description="The project's description", min_length=3)
 
     api_v1: str = Field(default="/v1", description="The api v1 string")
+    max_body_size: int = Field(
+        default=64 * 1024,
+        description="Max bytes of a request body read by middlewares, larger ones get 413",
+        ge=1,
+    )
+
+
+T = TypeVar("T")
+
+
+class Section(Generic[T]):
+    """Settings section built on first access and cached on the instance.
+
+    Sections are validated when first used instead of all at import time,
+    later reads are plain instance attribute lookups.
+    """
+
+    __slots__ = ("_factory", "_name")
+
+    def __init__(self, factory: Callable[[], T]) -> None:
+        self._factory = factory
+        self._name = ""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self._name = name
+
+    def __get__(self, instance: Any, owner: type) -> T:
+        if instance is None:
+            return self
+        # The first value stored wins if threads build a section concurrently.
+        return instance.__dict__.setdefault(self._name, self._factory())
 
 
 class Settings:
-    uvcorn: UvicornSettings = UvicornSettings()
-    project: ProjectSettings = ProjectSettings()
-    telegram: TelegramSettings = TelegramSettings()
-    proxy: ProxySettings = ProxySettings()
-    crypt: CryptSettings = CryptSettings()
-    path: PathSettings = PathSettings()
+    uvcorn = Section(UvicornSettings)
+    project = Section(ProjectSettings)
+    telegram = Section(TelegramSettings)
+    proxy = Section(ProxySettings)
+    storage = Section(StorageSettings)
+    redis = Section(RedisSettings)
+    capacity = Section(CapacitySettings)
+    pool = Section(PoolSettings)
+    dc_prediction = Section(DCPredictionSettings)
+    session = Section(SessionSettings)
+    auth_index = Section(AuthIndexSettings)
+    post_login = Section(PostLoginSettings)
+    executor = Section(ExecutorSettings)
+    rpc = Section(RPCSettings)
+    circuit = Section(CircuitSettings)
+    handle = Section(HandleSettings)
+    batch = Section(BatchSettings)
+    job = Section(JobSettings)
+    idempotency = Section(IdempotencySettings)
+    rate_limit = Section(RateLimitSettings)
+    trace = Section(TraceSettings)
+    log = Section(LogSettings)
+    health = Section(HealthSettings)
+    cluster = Section(ClusterSettings)
+    crypt = Section(CryptSettings)
+    path = Section(PathSettings)
 
 
 settings = Settings()
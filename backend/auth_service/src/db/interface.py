@@ -0,0 +1,33 @@
+from abc import ABC, abstractmethod
+from typing import Any
+
+
+class StorageInterface(ABC):
+    @abstractmethod
+    async def has_capacity(self) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def put_record(self, key: str, record: Any) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_record(self, key: str) -> Any | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def record_exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_record(self, key: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def update_record(self, key: str, record: Any) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def release_record(self, record: Any) -> None:
+        """Release what a record read by `get_record` holds, unless the storage keeps it."""
+        raise NotImplementedError
@@ -0,0 +1,81 @@
+import asyncio
+import datetime
+from contextlib import asynccontextmanager, suppress
+from typing import TYPE_CHECKING, AsyncIterator
+
+from core.settings import settings
+from db.object.reaper import ObjectStorageReaper
+from db.object.storage import ObjectStorage
+from service.telegram.client import get_client_record_serializer
+
+if TYPE_CHECKING:
+    from db.redis.storage import RedisStorage
+
+
+@asynccontextmanager
+async def object_storage_lifespan() -> AsyncIterator[tuple[ObjectStorage, ObjectStorage]]:
+    ttl = datetime.timedelta(seconds=settings.storage.ttl)
+    storage = ObjectStorage(
+        ttl=ttl,
+        max_records=settings.capacity.max_flows,
+        overflow=settings.capacity.overflow,
+    )
+    # Handles are admitted with their flows, they take no slot of the capacity.
+    handle_storage = ObjectStorage(ttl=ttl, max_records=None, overflow="reject")
+    reaper_tasks = [
+        asyncio.create_task(
+            ObjectStorageReaper(
+                object_storage=reaped_storage,
+                interval=settings.storage.reap_interval,
+                batch_size=settings.storage.reap_batch_size,
+            ).run()
+        )
+        for reaped_storage in (storage, handle_storage)
+    ]
+    try:
+        yield storage, handle_storage
+    finally:
+        for reaper_task in reaper_tasks:
+            reaper_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await reaper_task
+
+
+@asynccontextmanager
+async def redis_storage_lifespan() -> AsyncIterator[tuple["RedisStorage", "RedisStorage"]]:
+    # The redis client is imported only when the redis backend is used.
+    from redis.asyncio import Redis
+
+    from db.redis.storage import RedisStorage
+
+    redis = Redis(
+        host=settings.redis.host, port=settings.redis.port, db=settings.redis.db
+    )
+    ttl = datetime.timedelta(seconds=settings.storage.ttl)
+    try:
+        yield (
+            RedisStorage(
+                redis=redis,
+                serializer=get_client_record_serializer(),
+                ttl=ttl,
+                max_records=settings.capacity.max_flows,
+                overflow=settings.capacity.overflow,
+            ),
+            RedisStorage(
+                redis=redis,
+                serializer=get_client_record_serializer(),
+                ttl=ttl,
+                max_records=None,
+                overflow="reject",
+                key_prefix="auth_handle:",
+            ),
+        )
+    finally:
+        await redis.aclose()
+
+
+def storage_lifespan():
+    """Storages of auth flows and of their session handles."""
+    if settings.storage.backend == "redis":
+        return redis_storage_lifespan()
+    return object_storage_lifespan()
@@ -0,0 +1,37 @@
+import asyncio
+import logging
+
+from db.object.storage import ObjectStorage
+
+
+class ObjectStorageReaper:
+    __slots__ = ("_object_storage", "_interval", "_batch_size")
+
+    def __init__(
+        self, object_storage: ObjectStorage, interval: float, batch_size: int
+    ) -> None:
+        self._object_storage = object_storage
+        self._interval = interval
+        self._batch_size = batch_size
+
+    async def reap(self) -> int:
+        """Evict expired auth flows and disconnect their telegram clients."""
+        reaped = 0
+        while records := self._object_storage.pop_expired(limit=self._batch_size):
+            await asyncio.gather(
+                *(self._object_storage.release(record) for record in records)
+            )
+            reaped += len(records)
+        if reaped:
+            logging.info("Evicted %s expired auth flows.", reaped)
+        return reaped
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.reap()
+            except Exception as exception:
+                logging.exception(
+                    "Fail to evict expired auth flows. Error: %s", str(exception)
+                )
@@ -1,38 +1,185 @@
+from collections import Counter, OrderedDict
 from functools import lru_cache
-from typing import Any
+from typing import Any, Literal
+import datetime
+import heapq
 import logging
 
+from core.logger import redact
+from db.interface import StorageInterface
+from exception.storage import StorageCapacityExceeded
 
-class ObjectStorage:
-    __slots__ = ("storage",)
 
-    def __init__(self) -> None:
-        self.storage = {}
+class ObjectStorage(StorageInterface):
+    """Records with live telegram clients kept in process memory.
 
-    def put_record(self, key: str, record: Any) -> None:
-        logging.info("Save data in object storage. Key: %s", key)
+    Without `max_records` records are not counted against any capacity.
+    Records are counted by their step as they come and go, so the pending
+    flows are read without walking the storage.
+    """
+
+    __slots__ = (
+        "storage",
+        "_ttl",
+        "_expiry_index",
+        "_max_records",
+        "_overflow",
+        "_steps",
+    )
+
+    def __init__(
+        self,
+        ttl: datetime.timedelta,
+        max_records: int | None,
+        overflow: Literal["reject", "evict"],
+    ) -> None:
+        self.storage: OrderedDict[str, Any] = OrderedDict()
+
+        self._ttl = ttl
+        self._expiry_index: list[tuple[datetime.datetime, str]] = []
+        self._max_records = max_records
+        self._overflow = overflow
+        self._steps: Counter[str] = Counter()
+
+    @staticmethod
+    async def release(record: Any) -> None:
+        """Disconnect telegram client of a record which leaves the storage."""
+        client = record.get("client") if isinstance(record, dict) else None
+        if client is None:
+            return
+        try:
+            await client.disconnect()
+        except Exception as exception:
+            logging.warning(
+                "Fail to disconnect evicted telegram client. Error: %s", str(exception)
+            )
+
+    def _expires_at(self, record: Any) -> datetime.datetime:
+        timestamp = record.get("timestamp") if isinstance(record, dict) else None
+        return (timestamp or datetime.datetime.now()) + self._ttl
+
+    def count_by_step(self) -> dict[str, int]:
+        return dict(self._steps)
+
+    def _count(self, record: Any, delta: int) -> None:
+        step = record.get("step") if isinstance(record, dict) else None
+        if step is not None:
+            self._steps[step] += delta
+
+    def _pop(self, key: str) -> Any | None:
+        record = self.storage.pop(key, None)
+        if record is not None:
+            self._count(record=record, delta=-1)
+        return record
+
+    def _index_record(self, key: str, record: Any) -> None:
+        heapq.heappush(self._expiry_index, (self._expires_at(record), key))
+        if len(self._expiry_index) > 2 * len(self.storage) + 64:
+            # Entries of deleted, refreshed and evicted records wait for their
+            # expiration, rebuild the index before they outnumber the records.
+            self._expiry_index = [
+                (self._expires_at(record), key) for key, record in self.storage.items()
+            ]
+            heapq.heapify(self._expiry_index)
+
+    async def _make_room(self) -> None:
+        """Free one slot: expired records go first, then the least recently used."""
+        if self._max_records is None or len(self.storage) < self._max_records:
+            return
+
+        for record in self.pop_expired(limit=len(self.storage) - self._max_records + 1):
+            await self.release(record)
+        if len(self.storage) < self._max_records:
+            return
+
+        if self._overflow == "reject":
+            raise StorageCapacityExceeded(
+                f"Object storage is full. Max records: {self._max_records}"
+            )
+        while len(self.storage) >= self._max_records:
+            key, record = self.storage.popitem(last=False)
+            self._count(record=record, delta=-1)
+            logging.warning("Evict least recently used record. Key: %s", redact(key))
+            await self.release(record)
+
+    async def has_capacity(self) -> bool:
+        if (
+            self._overflow == "evict"
+            or self._max_records is None
+            or len(self.storage) < self._max_records
+        ):
+            return True
+        for record in self.pop_expired(limit=len(self.storage) - self._max_records + 1):
+            await self.release(record)
+        return len(self.storage) < self._max_records
+
+    async def _save(self, key: str, record: Any) -> None:
+        if key not in self.storage:
+            await self._make_room()
+        else:
+            self._count(record=self.storage[key], delta=-1)
+        self._count(record=record, delta=1)
         self.storage.update({key: record})
+        self.storage.move_to_end(key)
+        self._index_record(key=key, record=record)
+
+    async def put_record(self, key: str, record: Any) -> None:
+        logging.debug("Save data in object storage. Key: %s", redact(key))
+        await self._save(key=key, record=record)
 
-    def get_record(self, key: str) -> Any | None:
-        logging.info("Retrieve data from object storage. Key: %s", key)
-        return self.storage.get(key)
+    async def get_record(self, key: str) -> Any | None:
+        logging.debug("Retrieve data from object storage. Key: %s", redact(key))
+        record = self.storage.get(key)
+        if record is not None:
+            self.storage.move_to_end(key)
+        return record
 
-    def record_exists(self, key: str) -> bool:
-        logging.info("Check the record existence by key.")
+    async def record_exists(self, key: str) -> bool:
+        logging.debug("Check the record existence by key.")
         return True if self.storage.get(key) else False
 
-    def delete_record(self, key: str) -> None:
-        logging.info("Retrieve data from object storage. Key: %s", key)
-        self.storage.pop(key, None)
+    async def delete_record(self, key: str) -> None:
+        logging.debug("Delete data from object storage. Key: %s", redact(key))
+        self._pop(key=key)
 
-    def update_record(self, key: str, record: Any) -> None:
-        logging.info("Update data in object storage. Key: %s", key)
-        self.storage.update({key: record})
+    async def update_record(self, key: str, record: Any) -> None:
+        logging.debug("Update data in object storage. Key: %s", redact(key))
+        await self._save(key=key, record=record)
+
+    async def release_record(self, record: Any) -> None:
+        # Records stay in the storage with their live clients.
+        return None
+
+    def pop_expired(self, limit: int) -> list[Any]:
+        """Evict up to `limit` expired records in expiration order.
 
+        Index entries left behind by deleted or refreshed records are
+        dropped lazily when they reach the top of the heap.
+        """
+        now = datetime.datetime.now()
+        expired = []
+        while self._expiry_index and len(expired) < limit:
+            expires_at, key = self._expiry_index[0]
+            if expires_at > now:
+                break
+            heapq.heappop(self._expiry_index)
 
-object_storage: ObjectStorage | None = None
+            record = self.storage.get(key)
+            if record is None or self._expires_at(record) > now:
+                continue
+            expired.append(self._pop(key=key))
+        return expired
+
+
+object_storage: StorageInterface | None = None
+handle_storage: StorageInterface | None = None
 
 
 @lru_cache
 def get_object_storage():
     return object_storage
+
+
+@lru_cache
+def get_handle_storage():
+    return handle_storage
@@ -0,0 +1,7 @@
+from typing import Any, Protocol
+
+
+class RecordSerializerProtocol(Protocol):
+    def dump(self, record: Any) -> bytes: ...
+
+    def load(self, value: bytes) -> Any: ...
@@ -0,0 +1,138 @@
+from typing import Any, Literal
+import datetime
+import logging
+import time
+
+from redis.asyncio import Redis
+
+from core.logger import redact
+from db.interface import StorageInterface
+from db.redis.serializer import RecordSerializerProtocol
+from exception.storage import StorageCapacityExceeded
+
+
+class RedisStorage(StorageInterface):
+    """Auth flow storage shared between uvicorn workers.
+
+    Records are kept in serialized form only, so the live telegram client
+    of a record is released as soon as its state is persisted and every
+    worker rebuilds the client on demand. Without `max_records` records
+    are not counted against any capacity and expire by their redis TTL.
+    """
+
+    KEY_PREFIX = "auth_flow:"
+    INDEX_KEY = "auth_flow_index"
+
+    __slots__ = (
+        "_redis",
+        "_serializer",
+        "_ttl",
+        "_max_records",
+        "_overflow",
+        "_key_prefix",
+    )
+
+    def __init__(
+        self,
+        redis: Redis,
+        serializer: RecordSerializerProtocol,
+        ttl: datetime.timedelta,
+        max_records: int | None,
+        overflow: Literal["reject", "evict"],
+        key_prefix: str = KEY_PREFIX,
+    ) -> None:
+        self._redis = redis
+        self._serializer = serializer
+        self._ttl = ttl
+        self._max_records = max_records
+        self._overflow = overflow
+        self._key_prefix = key_prefix
+
+    def _create_key(self, key: str) -> str:
+        return f"{self._key_prefix}{key}"
+
+    def _expires_in(self, record: Any) -> int:
+        timestamp = record.get("timestamp") if isinstance(record, dict) else None
+        if timestamp is None:
+            return int(self._ttl.total_seconds())
+        expires_in = timestamp + self._ttl - datetime.datetime.now()
+        return max(1, int(expires_in.total_seconds()))
+
+    @staticmethod
+    async def _release_client(record: Any) -> None:
+        client = record.get("client") if isinstance(record, dict) else None
+        if client is not None and client.is_connected():
+            await client.disconnect()
+
+    async def _count_records(self) -> int:
+        """Count live records. The index is scored by expiration time."""
+        await self._redis.zremrangebyscore(self.INDEX_KEY, "-inf", time.time())
+        return await self._redis.zcard(self.INDEX_KEY)
+
+    async def _make_room(self, key: str) -> None:
+        if await self._redis.zscore(self.INDEX_KEY, key) is not None:
+            return
+
+        count = await self._count_records()
+        if count < self._max_records:
+            return
+
+        if self._overflow == "reject":
+            raise StorageCapacityExceeded(
+                f"Redis storage is full. Max records: {self._max_records}"
+            )
+        evicted = await self._redis.zpopmin(self.INDEX_KEY, count - self._max_records + 1)
+        logging.warning("Evict %s oldest records from redis storage.", len(evicted))
+        await self._redis.delete(*(self._create_key(member.decode()) for member, _ in evicted))
+
+    async def has_capacity(self) -> bool:
+        if self._overflow == "evict" or self._max_records is None:
+            return True
+        return await self._count_records() < self._max_records
+
+    async def _save(self, key: str, record: Any) -> None:
+        if self._max_records is not None:
+            await self._make_room(key=key)
+
+        expires_in = self._expires_in(record)
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.set(
+                name=self._create_key(key),
+                value=self._serializer.dump(record),
+                ex=expires_in,
+            )
+            if self._max_records is not None:
+                pipeline.zadd(self.INDEX_KEY, {key: time.time() + expires_in})
+            await pipeline.execute()
+        await self._release_client(record)
+
+    async def put_record(self, key: str, record: Any) -> None:
+        logging.debug("Save data in redis storage. Key: %s", redact(key))
+        await self._save(key=key, record=record)
+
+    async def get_record(self, key: str) -> Any | None:
+        logging.debug("Retrieve data from redis storage. Key: %s", redact(key))
+        value = await self._redis.get(self._create_key(key))
+        if value is None:
+            return None
+        return self._serializer.load(value)
+
+    async def record_exists(self, key: str) -> bool:
+        logging.debug("Check the record existence by key.")
+        return bool(await self._redis.exists(self._create_key(key)))
+
+    async def delete_record(self, key: str) -> None:
+        logging.debug("Delete data from redis storage. Key: %s", redact(key))
+        async with self._redis.pipeline(transaction=True) as pipeline:
+            pipeline.delete(self._create_key(key))
+            if self._max_records is not None:
+                pipeline.zrem(self.INDEX_KEY, key)
+            await pipeline.execute()
+
+    async def update_record(self, key: str, record: Any) -> None:
+        logging.debug("Update data in redis storage. Key: %s", redact(key))
+        await self._save(key=key, record=record)
+
+    async def release_record(self, record: Any) -> None:
+        # Every read restores a new client, nothing else would disconnect it.
+        await self._release_client(record)
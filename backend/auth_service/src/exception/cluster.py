@@ -0,0 +1,6 @@
+from .base import BaseCustomError
+
+
+class PeerUnavailable(BaseCustomError): ...
+
+class PeerRequestFailed(BaseCustomError): ...
@@ -0,0 +1,4 @@
+from .base import BaseCustomError
+
+
+class RequestBodyTooLarge(BaseCustomError): ...
@@ -0,0 +1,4 @@
+from .base import BaseCustomError
+
+
+class StorageCapacityExceeded(BaseCustomError): ...
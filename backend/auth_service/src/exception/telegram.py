@@ -6,3 +6,13 @@ class AlreadyLoggedIn(BaseCustomError): ...
 class CodeExpired(BaseCustomError): ...
 
 class PasswordExpired(BaseCustomError): ...
+
+class FloodWait(BaseCustomError):
+    def __init__(self, message, seconds: int) -> None:
+        super().__init__(message)
+        self.seconds = seconds
+
+class TelegramUnavailable(BaseCustomError):
+    def __init__(self, message, seconds: int) -> None:
+        super().__init__(message)
+        self.seconds = seconds
@@ -5,18 +5,52 @@ import uvicorn
 from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
 
-from core.logger import LOGGING
+from core.executor import executor_lifespan
+from core.logger import get_logging_config
 from core.settings import settings
+from db.lifespan import storage_lifespan
 from db.object import storage as object_storage
+from middleware import (
+    ClusterMiddleware,
+    LogContextMiddleware,
+    MetricsMiddleware,
+    RateLimitMiddleware,
+    TraceMiddleware,
+    rate_limit_lifespan,
+)
+from service.auth.post_login import post_login_lifespan
+from service.health import loop_lag_lifespan
+from service.auth.send_code import send_code_jobs_lifespan
+from service.cluster import cluster_lifespan
+from service.telegram.client.pool import client_pool_lifespan
+from service.telegram.dc import dc_predictor_lifespan
+from service.telegram.proxy import proxy_pool_lifespan
+from service.telegram.session import session_store_lifespan
+from service.trace import trace_lifespan
 from api.v1 import router as v1_router
 
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     logging.info("Starup the application")
-    object_storage.object_storage = object_storage.ObjectStorage()
-    yield
-    logging.info("Stop the application")
+    async with (
+        executor_lifespan(),
+        loop_lag_lifespan(),
+        trace_lifespan(),
+        rate_limit_lifespan(),
+        cluster_lifespan(),
+        session_store_lifespan(),
+        proxy_pool_lifespan(),
+        storage_lifespan() as (storage, handle_storage),
+        client_pool_lifespan(),
+        dc_predictor_lifespan(),
+        post_login_lifespan(),
+        send_code_jobs_lifespan(),
+    ):
+        object_storage.object_storage = storage
+        object_storage.handle_storage = handle_storage
+        yield
+        logging.info("Stop the application")
 
 
 app = FastAPI(
@@ -27,15 +61,21 @@ app = FastAPI(
     root_path="/api",
 )
 
+app.add_middleware(ClusterMiddleware)
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TraceMiddleware)
+app.add_middleware(LogContextMiddleware)
+
 app.include_router(router=v1_router)
 
 
 if __name__ == "__main__":
     uvicorn.run(
-        app=app,
+        app="main:app",
         host=settings.uvcorn.host,
         port=settings.uvcorn.port,
         reload=False,
         workers=settings.uvcorn.workers,
-        log_config=LOGGING,
+        log_config=get_logging_config(),
     )
@@ -0,0 +1,16 @@
+from .rate_limit import RateLimitMiddleware, rate_limit_lifespan
+from .metrics import MetricsMiddleware
+from .trace import TraceMiddleware
+from .log_context import LogContextMiddleware
+from .cluster import ClusterMiddleware, is_peer_request
+
+
+__all__ = (
+    "RateLimitMiddleware",
+    "rate_limit_lifespan",
+    "MetricsMiddleware",
+    "TraceMiddleware",
+    "LogContextMiddleware",
+    "ClusterMiddleware",
+    "is_peer_request",
+)
@@ -0,0 +1,40 @@
+from fastapi.responses import ORJSONResponse
+from starlette.types import Message, Receive
+
+from exception.request import RequestBodyTooLarge
+
+
+async def read_body(receive: Receive, max_size: int) -> tuple[bytes, Receive]:
+    """Read the whole body and return a receive replaying it to the app.
+
+    Raises `RequestBodyTooLarge` as soon as more than `max_size` bytes
+    were received, the rest of the body is not read.
+    """
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > max_size:
+            raise RequestBodyTooLarge(f"Request body is over {max_size} bytes.")
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            break
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay() -> Message:
+        nonlocal replayed
+        if replayed:
+            return await receive()
+        replayed = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return body, replay
+
+
+def body_too_large_response() -> ORJSONResponse:
+    return ORJSONResponse(content={"detail": "Request body is too large."}, status_code=413)
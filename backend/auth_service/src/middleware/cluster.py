@@ -0,0 +1,379 @@
+from typing import Awaitable, Callable
+import asyncio
+import hmac
+import logging
+import re
+
+from fastapi import status
+from fastapi.responses import ORJSONResponse
+from pydantic import ValidationError
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import orjson
+
+from core.settings import settings
+from exception.cluster import PeerRequestFailed, PeerUnavailable
+from exception.request import RequestBodyTooLarge
+from middleware.body import body_too_large_response, read_body
+from schema.auth import SendCodeBatchRequest
+from service.cluster import ClusterRouter, Peer, get_cluster_router
+from service.trace import current_span
+
+
+def is_peer_request(scope: Scope) -> bool:
+    """Whether a node of the cluster forwarded the request, by the shared secret."""
+    if not settings.cluster.enabled:
+        return False
+    for name, value in scope["headers"]:
+        if name == b"x-cluster-token":
+            return hmac.compare_digest(value, settings.cluster.secret.encode())
+    return False
+
+
+class ClusterMiddleware:
+    """Forward requests of auth flows owned by another node to it.
+
+    Requests with a phone number go to its owner on the ring, or to the
+    next nodes of the ring while the owner is unreachable. Requests with
+    a session handle go to the node holding the flow. Requests forwarded
+    by a node are always served locally, so they never loop. A request
+    which may have reached a node that failed to answer is not sent to
+    another one, it gets 502.
+
+    A batch is split by the owners of its phone numbers, every node gets
+    its part and their NDJSON lines are merged into one stream. Phone
+    numbers of a part which failed on its node are reported as `Internal`.
+    """
+
+    EVENTS_PATH = re.compile(r"/send_code/events/([^/]+)$")
+    BATCH_PATH = re.compile(r"/send_code/batch$")
+
+    __slots__ = ("app", "_router")
+
+    def __init__(self, app: ASGIApp, router: ClusterRouter | None = None) -> None:
+        self.app = app
+        self._router = router
+
+    @staticmethod
+    def _payload(body: bytes) -> dict:
+        try:
+            payload = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return {}
+        return payload if isinstance(payload, dict) else {}
+
+    def _route(
+        self, router: ClusterRouter, scope: Scope, body: bytes
+    ) -> tuple[list[str], bool]:
+        """Nodes to try in order and whether to serve locally when all failed."""
+        if scope["method"] == "GET":
+            match = self.EVENTS_PATH.search(scope["path"])
+            handle = match.group(1) if match else None
+        else:
+            payload = self._payload(body)
+            phone_number = payload.get("phone_number")
+            if isinstance(phone_number, str):
+                return router.owners(phone_number), True
+            handle = payload.get("session")
+        if not isinstance(handle, str):
+            return [], True
+        node_id = router.holder(handle)
+        return ([node_id] if node_id else []), False
+
+    @staticmethod
+    def _batch_parts(
+        router: ClusterRouter, phone_numbers: list[str], unavailable: frozenset[str]
+    ) -> dict[str, list[str]]:
+        """Phone numbers grouped by their first owner which is not unavailable.
+
+        Phone numbers without such an owner are grouped under the local node.
+        """
+        parts: dict[str, list[str]] = {}
+        for phone_number in phone_numbers:
+            node_id = next(
+                (
+                    node_id
+                    for node_id in router.owners(phone_number)
+                    if node_id not in unavailable
+                ),
+                router.node_id,
+            )
+            parts.setdefault(node_id, []).append(phone_number)
+        return parts
+
+    @staticmethod
+    def _headers(router: ClusterRouter, scope: Scope) -> list[tuple[bytes, bytes]]:
+        client = scope.get("client")
+        client_host = client[0].encode() if client else b"unknown"
+        headers = [
+            (b"x-cluster-node", router.node_id.encode()),
+            (b"x-cluster-token", settings.cluster.secret.encode()),
+        ]
+        # The node continues the trace of a sampled request only.
+        span = current_span()
+        if span is not None:
+            headers.append((b"traceparent", span.traceparent.encode()))
+        forwarded_for = client_host
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                forwarded_for = value + b", " + client_host
+            elif name not in (b"x-cluster-node", b"x-cluster-token", b"traceparent"):
+                headers.append((name, value))
+        headers.append((b"x-forwarded-for", forwarded_for))
+        return headers
+
+    @staticmethod
+    async def _wait_disconnect(receive: Receive) -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    async def _forward(
+        self,
+        peer: Peer,
+        router: ClusterRouter,
+        scope: Scope,
+        body: bytes,
+        receive: Receive,
+        send: Send,
+    ) -> None:
+        """Relay the response of the peer until it ends or the client leaves."""
+        target = scope.get("raw_path") or scope["path"].encode()
+        if scope["query_string"]:
+            target += b"?" + scope["query_string"]
+        forward_task = asyncio.create_task(
+            peer.forward(
+                method=scope["method"],
+                target=target,
+                headers=self._headers(router=router, scope=scope),
+                body=body,
+                send=send,
+            )
+        )
+        disconnect_task = asyncio.create_task(self._wait_disconnect(receive))
+        try:
+            await asyncio.wait(
+                (forward_task, disconnect_task), return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            disconnect_task.cancel()
+            if not forward_task.done():
+                forward_task.cancel()
+                try:
+                    await forward_task
+                except asyncio.CancelledError:
+                    pass
+        if not forward_task.cancelled():
+            forward_task.result()
+
+    async def _send_batch_part(
+        self,
+        router: ClusterRouter,
+        scope: Scope,
+        node_id: str,
+        phone_numbers: list[str],
+        unavailable: frozenset[str],
+        write: Callable[[bytes], Awaitable[None]],
+    ) -> None:
+        """Serve a part of a batch on its node and write its complete lines.
+
+        A part whose node is unavailable is split again among the next owners.
+        """
+        body = orjson.dumps({"phone_numbers": phone_numbers})
+        pending = set(phone_numbers)
+        buffer = b""
+        succeeded = False
+
+        async def send_part(message: Message) -> None:
+            nonlocal buffer, succeeded
+            if message["type"] == "http.response.start":
+                succeeded = message["status"] == status.HTTP_200_OK
+                return
+            if not succeeded:
+                return
+            *lines, buffer = (buffer + message.get("body", b"")).split(b"\n")
+            for line in lines:
+                pending.discard(orjson.loads(line).get("phone_number"))
+                await write(line + b"\n")
+
+        async def receive_part() -> Message:
+            nonlocal body
+            if body is None:
+                # Cancelled with the batch when the client leaves.
+                await asyncio.Future()
+            message = {"type": "http.request", "body": body, "more_body": False}
+            body = None
+            return message
+
+        try:
+            if node_id == router.node_id:
+                local_scope = dict(scope)
+                local_scope["headers"] = [
+                    (name, value)
+                    for name, value in scope["headers"]
+                    if name != b"content-length"
+                ]
+                local_scope["headers"].append((b"content-length", str(len(body)).encode()))
+                await self.app(local_scope, receive_part, send_part)
+                return
+            try:
+                await router.peer(node_id).forward(
+                    method="POST",
+                    target=scope.get("raw_path") or scope["path"].encode(),
+                    headers=self._headers(router=router, scope=scope),
+                    body=body,
+                    send=send_part,
+                )
+                return
+            except PeerUnavailable as exception:
+                logging.warning(
+                    "Fail to forward batch part to node %s. Error: %s", node_id, str(exception)
+                )
+            unavailable |= {node_id}
+            parts = self._batch_parts(
+                router=router, phone_numbers=phone_numbers, unavailable=unavailable
+            )
+            pending.clear()
+            await asyncio.gather(*(
+                self._send_batch_part(
+                    router=router,
+                    scope=scope,
+                    node_id=next_node_id,
+                    phone_numbers=part,
+                    unavailable=unavailable,
+                    write=write,
+                )
+                for next_node_id, part in parts.items()
+            ))
+        except Exception as exception:
+            logging.error(
+                "Fail to serve batch part on node %s. Error: %s", node_id, str(exception)
+            )
+        finally:
+            if not asyncio.current_task().cancelling():
+                for phone_number in phone_numbers:
+                    if phone_number in pending:
+                        await write(
+                            orjson.dumps({"phone_number": phone_number, "error": "Internal"})
+                            + b"\n"
+                        )
+
+    async def _send_batch(
+        self,
+        router: ClusterRouter,
+        scope: Scope,
+        parts: dict[str, list[str]],
+        receive: Receive,
+        send: Send,
+    ) -> None:
+        """Stream the lines of every part of a batch until they end or the client leaves."""
+        await send({
+            "type": "http.response.start",
+            "status": status.HTTP_200_OK,
+            "headers": [(b"content-type", b"application/x-ndjson")],
+        })
+        lock = asyncio.Lock()
+
+        async def write(line: bytes) -> None:
+            async with lock:
+                await send({"type": "http.response.body", "body": line, "more_body": True})
+
+        tasks = [
+            asyncio.create_task(
+                self._send_batch_part(
+                    router=router,
+                    scope=scope,
+                    node_id=node_id,
+                    phone_numbers=phone_numbers,
+                    unavailable=frozenset(),
+                    write=write,
+                )
+            )
+            for node_id, phone_numbers in parts.items()
+        ]
+        disconnect_task = asyncio.create_task(self._wait_disconnect(receive))
+        try:
+            await asyncio.wait(
+                (asyncio.gather(*tasks), disconnect_task), return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            disconnect_task.cancel()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if disconnect_task.done() and not disconnect_task.cancelled():
+            return
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in ("GET", "POST")
+            or not settings.cluster.enabled
+            or is_peer_request(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # The app gets the body replayed, the forwarding waits for the
+        # client to disconnect on the drained receive.
+        body, replay = b"", receive
+        if scope["method"] == "POST":
+            try:
+                body, replay = await read_body(receive, max_size=settings.project.max_body_size)
+            except RequestBodyTooLarge:
+                await body_too_large_response()(scope, receive, send)
+                return
+        router = self._router or get_cluster_router()
+        if scope["method"] == "POST" and self.BATCH_PATH.search(scope["path"]):
+            try:
+                batch = SendCodeBatchRequest.model_validate_json(body)
+            except ValidationError:
+                # Invalid batches get their error from the local node.
+                batch = SendCodeBatchRequest.model_construct(phone_numbers=[])
+            parts = self._batch_parts(
+                router=router, phone_numbers=batch.phone_numbers, unavailable=frozenset()
+            )
+            if any(node_id != router.node_id for node_id in parts):
+                await self._send_batch(
+                    router=router, scope=scope, parts=parts, receive=receive, send=send
+                )
+                return
+        nodes, local_fallback = self._route(router=router, scope=scope, body=body)
+        for node_id in nodes:
+            if node_id == router.node_id:
+                break
+            try:
+                await self._forward(
+                    peer=router.peer(node_id),
+                    router=router,
+                    scope=scope,
+                    body=body,
+                    receive=receive,
+                    send=send,
+                )
+                return
+            except PeerUnavailable as exception:
+                logging.warning(
+                    "Fail to forward request to node %s. Error: %s", node_id, str(exception)
+                )
+            except PeerRequestFailed as exception:
+                logging.error(
+                    "Node %s failed to answer a forwarded request. Error: %s",
+                    node_id,
+                    str(exception),
+                )
+                response = ORJSONResponse(
+                    content={"detail": "Node of the auth flow failed to answer."},
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                )
+                await response(scope, replay, send)
+                return
+        else:
+            if nodes and not local_fallback:
+                response = ORJSONResponse(
+                    content={"detail": "Node of the auth flow is unavailable."},
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={"Retry-After": "1"},
+                )
+                await response(scope, replay, send)
+                return
+        await self.app(scope, replay, send)
@@ -0,0 +1,51 @@
+import secrets
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.logger import bind_log_context, reset_log_context
+
+
+class LogContextMiddleware:
+    """Tag the records logged while handling a request with its request id.
+
+    The id is taken from the `X-Request-ID` header of the caller or
+    generated, and is returned in the same header unless the app (e.g. a
+    cluster node the request was forwarded to) already set it.
+    """
+
+    MAX_REQUEST_ID_LENGTH = 64
+
+    __slots__ = ("app",)
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    @classmethod
+    def _request_id(cls, scope: Scope) -> str:
+        for name, value in scope["headers"]:
+            if name == b"x-request-id" and 0 < len(value) <= cls.MAX_REQUEST_ID_LENGTH:
+                return value.decode("latin-1")
+        return secrets.token_hex(8)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = self._request_id(scope)
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start" and not any(
+                name == b"x-request-id" for name, _ in message.get("headers", ())
+            ):
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"x-request-id", request_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        token = bind_log_context(request_id=request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            reset_log_context(token)
@@ -0,0 +1,28 @@
+import time
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from service.metrics import AUTH_REQUEST_LATENCY
+
+
+class MetricsMiddleware:
+    """Observe latency of auth endpoints, resolved after routing by endpoint name."""
+
+    __slots__ = ("app",)
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            endpoint = scope.get("endpoint")
+            latency = AUTH_REQUEST_LATENCY.get(getattr(endpoint, "__name__", None))
+            if latency is not None:
+                latency.observe(time.perf_counter() - started_at)
@@ -0,0 +1,18 @@
+from .backend import (
+    RateLimitBackendInterface,
+    MemoryRateLimitBackend,
+    RedisRateLimitBackend,
+)
+from .middleware import RateLimitMiddleware, get_rate_limit_backend, get_client_ip
+from .lifespan import rate_limit_lifespan
+
+
+__all__ = (
+    "RateLimitBackendInterface",
+    "MemoryRateLimitBackend",
+    "RedisRateLimitBackend",
+    "RateLimitMiddleware",
+    "get_rate_limit_backend",
+    "get_client_ip",
+    "rate_limit_lifespan",
+)
@@ -0,0 +1,93 @@
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+import logging
+import time
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+
+class RateLimitBackendInterface(ABC):
+    """GCRA limiter state.
+
+    Each key keeps only its theoretical arrival time (TAT), the moment its
+    bucket is empty again. A request is let through when the TAT it would
+    push stays within `burst` emission intervals from now.
+    """
+
+    @abstractmethod
+    async def hit(self, key: str, rate: float, burst: int) -> float:
+        """Count one request of `key`, 0 when allowed, seconds to wait otherwise."""
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackendInterface):
+    """Limiter state of one worker, a dict of TATs swept every `cleanup_interval`."""
+
+    __slots__ = ("_tats", "_cleanup_interval", "_next_cleanup")
+
+    def __init__(self, cleanup_interval: float) -> None:
+        self._tats: dict[str, float] = {}
+        self._cleanup_interval = cleanup_interval
+        self._next_cleanup = time.monotonic() + cleanup_interval
+
+    def _cleanup(self, now: float) -> None:
+        """Forget keys whose bucket is full again, they behave as unseen ones."""
+        self._tats = {key: tat for key, tat in self._tats.items() if tat > now}
+        self._next_cleanup = now + self._cleanup_interval
+
+    async def hit(self, key: str, rate: float, burst: int) -> float:
+        now = time.monotonic()
+        if now >= self._next_cleanup:
+            self._cleanup(now)
+
+        interval = 1 / rate
+        tat = max(self._tats.get(key, now), now) + interval
+        excess = tat - now - burst * interval
+        if excess > 0:
+            return excess
+        self._tats[key] = tat
+        return 0.0
+
+
+class RedisRateLimitBackend(RateLimitBackendInterface):
+    """Limiter state shared between uvicorn workers.
+
+    The GCRA step runs as one Lua script on redis time, keys expire
+    together with their TAT. Requests are let through when redis fails.
+    """
+
+    KEY_PREFIX = "rate_limit:"
+
+    SCRIPT = """
+    local now = redis.call("TIME")
+    now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+    local interval = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local tat = math.max(tonumber(redis.call("GET", KEYS[1]) or now), now) + interval
+    local excess = tat - now - burst * interval
+    if excess > 0 then
+        return tostring(excess)
+    end
+    redis.call("SET", KEYS[1], tostring(tat), "PX", math.ceil((tat - now) * 1000))
+    return "0"
+    """
+
+    __slots__ = ("_redis", "_script")
+
+    def __init__(self, redis: "Redis") -> None:
+        self._redis = redis
+        self._script = redis.register_script(self.SCRIPT)
+
+    async def hit(self, key: str, rate: float, burst: int) -> float:
+        try:
+            excess = await self._script(
+                keys=[f"{self.KEY_PREFIX}{key}"], args=[1 / rate, burst]
+            )
+        except Exception as exception:
+            logging.warning("Fail to check rate limit in redis. Error: %s", str(exception))
+            return 0.0
+        return float(excess)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
@@ -0,0 +1,15 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from middleware.rate_limit.backend import RedisRateLimitBackend
+from middleware.rate_limit.middleware import get_rate_limit_backend
+
+
+@asynccontextmanager
+async def rate_limit_lifespan() -> AsyncIterator[None]:
+    try:
+        yield
+    finally:
+        backend = get_rate_limit_backend()
+        if isinstance(backend, RedisRateLimitBackend):
+            await backend.close()
@@ -0,0 +1,131 @@
+from functools import lru_cache
+import asyncio
+import math
+
+from fastapi import status
+from fastapi.responses import ORJSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+import orjson
+
+from core.settings import settings
+from exception.request import RequestBodyTooLarge
+from middleware.body import body_too_large_response, read_body
+from middleware.cluster import is_peer_request
+from middleware.rate_limit.backend import (
+    MemoryRateLimitBackend,
+    RateLimitBackendInterface,
+    RedisRateLimitBackend,
+)
+
+
+@lru_cache
+def get_rate_limit_backend() -> RateLimitBackendInterface:
+    if settings.rate_limit.backend == "redis":
+        from redis.asyncio import Redis
+
+        return RedisRateLimitBackend(
+            redis=Redis(
+                host=settings.redis.host, port=settings.redis.port, db=settings.redis.db
+            )
+        )
+    return MemoryRateLimitBackend(cleanup_interval=settings.rate_limit.cleanup_interval)
+
+
+def get_client_ip(scope: Scope, forwarded_hops: int) -> str:
+    """Address of the client as seen by the outermost trusted proxy.
+
+    Every trusted proxy appends the address it was connected from to
+    X-Forwarded-For, so entries left of the trusted ones can be forged.
+    """
+    if forwarded_hops:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                addresses = [address.strip() for address in value.decode().split(",")]
+                if len(addresses) >= forwarded_hops:
+                    return addresses[-forwarded_hops]
+                break
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """Throttle POST requests per client IP and per phone number of the body.
+
+    Every phone number of a batch is charged, and the batch is throttled
+    when any of them is. Throttled requests get 429 with Retry-After before
+    they are routed. Requests forwarded by cluster nodes were throttled by
+    the first node.
+    """
+
+    __slots__ = ("app",)
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    @staticmethod
+    def _phone_numbers(body: bytes) -> list[str]:
+        try:
+            payload = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return []
+        if not isinstance(payload, dict):
+            return []
+        phone_numbers = payload.get("phone_numbers")
+        if not isinstance(phone_numbers, list):
+            phone_numbers = []
+        phone_numbers = [payload.get("phone_number"), *phone_numbers]
+        # Larger batches are rejected by the app without sending any code.
+        return list(
+            dict.fromkeys(
+                phone_number for phone_number in phone_numbers if isinstance(phone_number, str)
+            )
+        )[: settings.batch.max_size]
+
+    async def _throttle(self, scope: Scope, receive: Receive) -> tuple[float, Receive]:
+        backend = get_rate_limit_backend()
+        ip = get_client_ip(scope, forwarded_hops=settings.rate_limit.forwarded_hops)
+        wait = await backend.hit(
+            key=f"ip:{ip}",
+            rate=settings.rate_limit.ip_rate,
+            burst=settings.rate_limit.ip_burst,
+        )
+        if wait:
+            return wait, receive
+
+        body, receive = await read_body(receive, max_size=settings.project.max_body_size)
+        waits = await asyncio.gather(
+            *(
+                backend.hit(
+                    key=f"phone:{phone_number}",
+                    rate=settings.rate_limit.phone_rate,
+                    burst=settings.rate_limit.phone_burst,
+                )
+                for phone_number in self._phone_numbers(body)
+            )
+        )
+        return max(waits, default=0), receive
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not settings.rate_limit.enabled
+            or is_peer_request(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            wait, receive = await self._throttle(scope, receive)
+        except RequestBodyTooLarge:
+            await body_too_large_response()(scope, receive, send)
+            return
+        if wait:
+            response = ORJSONResponse(
+                content={"detail": "Too many requests."},
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
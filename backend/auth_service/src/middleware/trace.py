@@ -0,0 +1,56 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from middleware.cluster import is_peer_request
+from service.trace import get_tracer
+
+
+class TraceMiddleware:
+    """Open the root span of sampled requests and return its W3C traceparent.
+
+    Cluster nodes forwarding a request pass on whether it is sampled.
+    """
+
+    __slots__ = ("app",)
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    @staticmethod
+    def _traceparent(scope: Scope) -> str | None:
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                return value.decode("latin-1")
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with get_tracer().start_trace(
+            name=scope["method"],
+            traceparent=self._traceparent(scope),
+            trusted=is_peer_request(scope),
+        ) as span:
+            if span is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_traceparent(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.set("http.status_code", message["status"])
+                    headers = message.get("headers", ())
+                    # Responses relayed from a cluster node carry its traceparent.
+                    if not any(name == b"traceparent" for name, _ in headers):
+                        message["headers"] = [
+                            *headers,
+                            (b"traceparent", span.traceparent.encode()),
+                        ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_traceparent)
+            finally:
+                endpoint = getattr(scope.get("endpoint"), "__name__", scope["path"])
+                span.name = f"{scope['method']} {endpoint}"
+                span.set("http.path", scope["path"])
@@ -0,0 +1,83 @@
+"""Move per-phone `.session` files into the shared session store.
+
+Usage: python src/migrate_sessions.py [--remove]
+"""
+import argparse
+import glob
+import logging
+import logging.config
+import os
+import sqlite3
+import sys
+
+from core.logger import get_logging_config, redact
+from core.settings import settings
+from service.telegram.session import SharedSessionStore, get_shared_session_store
+
+
+def read_session_file(path: str) -> tuple | None:
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute(
+            "select dc_id, server_address, port, auth_key, takeout_id from sessions"
+        ).fetchone()
+    except sqlite3.Error as exception:
+        logging.warning("Fail to read %s. Error: %s", redact(path), str(exception))
+        return None
+    finally:
+        connection.close()
+
+
+class MigrationError(Exception): ...
+
+
+def migrate(
+    store: SharedSessionStore, session_dir: str, remove: bool, batch_size: int = 1000
+) -> int:
+    """Copy sessions missing from the store and return their count.
+
+    Sessions are committed by batches, and with `remove` the files of a
+    batch are removed only once the store holds every session of it.
+    """
+    migrated = 0
+    paths = sorted(glob.glob(os.path.join(session_dir, "*.session")))
+    for start in range(0, len(paths), batch_size):
+        stored, added = [], 0
+        for path in paths[start : start + batch_size]:
+            phone_number = os.path.basename(path).removesuffix(".session")
+            row = read_session_file(path=path)
+            if row is None:
+                continue
+            if not store.exists(phone_number=phone_number):
+                store.put(phone_number=phone_number, row=row)
+                added += 1
+            stored.append(path)
+        if store.flush() < added:
+            raise MigrationError(
+                f"Fail to commit {added} sessions, {migrated} were migrated before."
+            )
+        migrated += added
+        if remove:
+            for path in stored:
+                os.remove(path)
+    return migrated
+
+
+if __name__ == "__main__":
+    logging.config.dictConfig(get_logging_config())
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--remove", action="store_true", help="remove session files after migration"
+    )
+    args = parser.parse_args()
+
+    store = get_shared_session_store()
+    try:
+        count = migrate(store=store, session_dir=settings.path.session_dir, remove=args.remove)
+    except MigrationError as exception:
+        logging.error("%s Session files are kept.", str(exception))
+        sys.exit(1)
+    finally:
+        store.close()
+    logging.info("Migrated %s session files into %s", count, settings.path.shared_session_file)
@@ -1,10 +1,19 @@
-from .send_code import SendCodeRequest, SendCodeResponse
+from .send_code import (
+    SendCodeRequest,
+    SendCodeResponse,
+    SendCodeAcceptedResponse,
+    SendCodeBatchRequest,
+    SendCodeBatchItem,
+)
 from .validate_code import ValidateCodeRequest, ValidateCodeResponse
 from .validate_password import ValidatePasswordRequest, ValidatePasswordResponse
 
 __all__ = (
     "SendCodeRequest",
     "SendCodeResponse",
+    "SendCodeAcceptedResponse",
+    "SendCodeBatchRequest",
+    "SendCodeBatchItem",
     "ValidateCodeRequest",
     "ValidateCodeResponse",
     "ValidatePasswordRequest",
@@ -1,7 +1,9 @@
-from typing import Literal
+from typing import Annotated, Literal
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 
+from core.settings import settings
+
 
 class BaseSendCode(BaseModel):
     phone_number: str = Field(
@@ -31,3 +33,45 @@ class SendCodeResponse(BaseModel):
     step: Literal["validate_code", "validate_password"] = Field(
         ..., description="Auth step."
     )
+
+
+class SendCodeAcceptedResponse(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
+    session: str = Field(..., description="The session string.")
+    step: Literal["pending"] = Field(..., description="Auth step.")
+
+
+class SendCodeBatchRequest(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
+    phone_numbers: list[Annotated[str, Field(min_length=8, max_length=18)]] = Field(
+        ...,
+        description="The telegram accounts' phone numbers",
+        min_length=1,
+        examples=[["9996621234", "9996625678"]],
+    )
+
+    @field_validator("phone_numbers")
+    @classmethod
+    def validate_phone_numbers(cls, value: list[str]) -> list[str]:
+        # Read on validation, so importing the schema does not build the settings.
+        if len(value) > settings.batch.max_size:
+            raise ValueError(f"At most {settings.batch.max_size} phone numbers are allowed")
+        for phone_number in value:
+            BaseSendCode.validate_phone_number(phone_number)
+        return value
+
+
+class SendCodeBatchItem(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
+    phone_number: str = Field(..., description="The telegram account's phone number")
+    session: str | None = Field(default=None, description="The session string.")
+    step: Literal["validate_code", "validate_password"] | None = Field(
+        default=None, description="Auth step."
+    )
+    error: str | None = Field(default=None, description="Failure reason.")
+    retry_after: int | None = Field(
+        default=None, description="Seconds to wait before retrying the phone number."
+    )
@@ -1,4 +1,11 @@
-from .send_code import SendCodeService, get_send_code_service
+from .send_code import (
+    SendCodeService,
+    get_send_code_service,
+    SendCodeBatchService,
+    get_send_code_batch_service,
+    SendCodeJobService,
+    get_send_code_job_service,
+)
 from .validate_code import ValidateCodeService, get_validate_code_service
 from .validate_password import ValidatePasswordService, get_validate_password_service
 
@@ -6,6 +13,10 @@ from .validate_password import ValidatePasswordService, get_validate_password_se
 __all__ = (
     "SendCodeService",
     "get_send_code_service",
+    "SendCodeBatchService",
+    "get_send_code_batch_service",
+    "SendCodeJobService",
+    "get_send_code_job_service",
     "ValidateCodeService",
     "get_validate_code_service",
     "ValidatePasswordService",
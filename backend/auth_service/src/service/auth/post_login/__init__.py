@@ -0,0 +1,5 @@
+from .pipeline import PostLoginPipeline, get_post_login_pipeline
+from .lifespan import post_login_lifespan
+
+
+__all__ = ("PostLoginPipeline", "get_post_login_pipeline", "post_login_lifespan")
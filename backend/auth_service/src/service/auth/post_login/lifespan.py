@@ -0,0 +1,15 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from core.settings import settings
+from service.auth.post_login.pipeline import get_post_login_pipeline
+
+
+@asynccontextmanager
+async def post_login_lifespan() -> AsyncIterator[None]:
+    pipeline = get_post_login_pipeline()
+    pipeline.start(workers=settings.post_login.workers)
+    try:
+        yield
+    finally:
+        await pipeline.stop(timeout=settings.post_login.drain_timeout)
@@ -0,0 +1,105 @@
+from functools import lru_cache
+import asyncio
+import logging
+
+from telethon import TelegramClient, utils
+
+from core.settings import settings
+from core.logger import redact
+from service.telegram.client import ClientCreateContext, get_client_create_context
+from service.telegram.client.check import AuthorizedIndex, get_authorized_index
+from service.telegram.dc import DCPredictor, get_dc_predictor
+
+
+class PostLoginJob:
+    __slots__ = ("phone_number", "client")
+
+    def __init__(self, phone_number: str, client: TelegramClient) -> None:
+        self.phone_number = phone_number
+        self.client = client
+
+
+class PostLoginPipeline:
+    """Persist and release clients of finished auth flows off the request path."""
+
+    __slots__ = (
+        "_client_context",
+        "_dc_predictor",
+        "_authorized_index",
+        "_queue",
+        "_workers",
+    )
+
+    def __init__(
+        self,
+        client_context: ClientCreateContext,
+        dc_predictor: DCPredictor,
+        authorized_index: AuthorizedIndex,
+        queue_size: int,
+    ) -> None:
+        self._client_context = client_context
+        self._dc_predictor = dc_predictor
+        self._authorized_index = authorized_index
+
+        self._queue: asyncio.Queue[PostLoginJob] = asyncio.Queue(maxsize=queue_size)
+        self._workers: list[asyncio.Task] = []
+
+    async def submit(self, phone_number: str, client: TelegramClient) -> None:
+        self._authorized_index.mark(phone_number=phone_number)
+        job = PostLoginJob(phone_number=phone_number, client=client)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            logging.warning("Post login queue is full. Wait for a free slot.")
+            await self._queue.put(job)
+
+    async def _process(self, job: PostLoginJob) -> None:
+        client = job.client
+        try:
+            await utils.maybe_async(client.session.save())
+            await self._client_context.persist(client=client, phone_number=job.phone_number)
+            if settings.dc_prediction.enabled:
+                self._dc_predictor.record(
+                    phone_number=job.phone_number, session=client.session
+                )
+        finally:
+            await client.disconnect()
+            logging.info("Released telegram client of phone: %s", redact(job.phone_number))
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job=job)
+            except Exception as exception:
+                logging.exception(
+                    "Fail to finish auth flow of phone %s. Error: %s",
+                    redact(job.phone_number),
+                    str(exception),
+                )
+            finally:
+                self._queue.task_done()
+
+    def start(self, workers: int) -> None:
+        self._workers = [asyncio.create_task(self._work()) for _ in range(workers)]
+
+    async def stop(self, timeout: float) -> None:
+        """Drain queued jobs for up to `timeout` seconds and stop the workers."""
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except TimeoutError:
+            logging.warning("Drop %s unfinished post login jobs.", self._queue.qsize())
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+@lru_cache
+def get_post_login_pipeline() -> PostLoginPipeline:
+    return PostLoginPipeline(
+        client_context=get_client_create_context(),
+        dc_predictor=get_dc_predictor(),
+        authorized_index=get_authorized_index(),
+        queue_size=settings.post_login.queue_size,
+    )
@@ -1,4 +1,18 @@
 from .facade import SendCodeService, get_send_code_service
+from .batch import SendCodeBatchService, get_send_code_batch_service
+from .job import (
+    SendCodeJobService,
+    get_send_code_job_service,
+    send_code_jobs_lifespan,
+)
 
 
-__all__ = ("SendCodeService", "get_send_code_service")
+__all__ = (
+    "SendCodeService",
+    "get_send_code_service",
+    "SendCodeBatchService",
+    "get_send_code_batch_service",
+    "SendCodeJobService",
+    "get_send_code_job_service",
+    "send_code_jobs_lifespan",
+)
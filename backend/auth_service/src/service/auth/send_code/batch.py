@@ -0,0 +1,71 @@
+from typing import AsyncIterator
+import asyncio
+import logging
+
+from fastapi import Depends
+import orjson
+
+from core.settings import settings
+from core.logger import redact
+from schema.auth import SendCodeBatchItem, SendCodeRequest
+from service.auth.send_code.error import describe_error
+from service.auth.send_code.facade import SendCodeService, get_send_code_service
+
+
+class SendCodeBatchService:
+    __slots__ = ("_send_code_service", "_concurrency")
+
+    def __init__(self, send_code_service: SendCodeService, concurrency: int) -> None:
+        self._send_code_service = send_code_service
+        self._concurrency = concurrency
+
+    async def _send_code(
+        self, phone_number: str, semaphore: asyncio.Semaphore
+    ) -> SendCodeBatchItem:
+        async with semaphore:
+            try:
+                response = await self._send_code_service.send_code(
+                    send_code_request=SendCodeRequest(phone_number=phone_number)
+                )
+            except Exception as exception:
+                error, retry_after = describe_error(exception)
+                if error == "Internal":
+                    logging.exception(
+                        "Fail to send code in batch. Phone: %s. Error: %s",
+                        redact(phone_number),
+                        str(exception),
+                    )
+                return SendCodeBatchItem(
+                    phone_number=phone_number, error=error, retry_after=retry_after
+                )
+        return SendCodeBatchItem(
+            phone_number=phone_number, session=response.session, step=response.step
+        )
+
+    async def stream(self, phone_numbers: list[str]) -> AsyncIterator[bytes]:
+        """Send codes concurrently and yield one NDJSON line per finished phone number.
+
+        Lines come in completion order. Pending phone numbers are cancelled
+        when the client goes away.
+        """
+        semaphore = asyncio.Semaphore(self._concurrency)
+        tasks = [
+            asyncio.create_task(self._send_code(phone_number, semaphore))
+            for phone_number in phone_numbers
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                item = await task
+                yield orjson.dumps(item.model_dump(exclude_none=True)) + b"\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+def get_send_code_batch_service(
+    send_code_service: SendCodeService = Depends(get_send_code_service),
+) -> SendCodeBatchService:
+    return SendCodeBatchService(
+        send_code_service=send_code_service,
+        concurrency=settings.batch.concurrency,
+    )
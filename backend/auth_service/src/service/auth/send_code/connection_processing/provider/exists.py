@@ -1,7 +1,7 @@
 import datetime
 from typing import Any
 
-
+from core.settings import settings
 from service.auth.send_code.connection_processing.provider.interface import (
     ProviderInterface,
 )
@@ -19,6 +19,6 @@ class ExistsConnectionProcessionProvider(ProviderInterface):
             datetime.datetime.now() - self.client_info.get("timestamp")
         ).seconds
 
-        if registration_timedelta < 300:
+        if registration_timedelta < settings.storage.ttl:
             return self.client_info
         return None
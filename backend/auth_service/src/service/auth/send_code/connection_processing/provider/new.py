@@ -2,50 +2,70 @@ import logging
 import datetime
 
 from telethon import TelegramClient
+from telethon.tl.types.auth import SentCode
 
+from core.settings import settings
+from core.logger import redact
 from service.auth.send_code.connection_processing.provider.interface import (
     ProviderInterface,
 )
-from service.crypt import CryptRepository, get_crypt_repo
 from service.telegram.client import ClientCreateContext, get_client_create_context
+from service.telegram.circuit import ConnectivityGuard, get_connectivity_guard
+from service.telegram.dc import DCPredictor, get_dc_predictor
+from service.telegram.rpc import RPCLimiter, get_rpc_limiter
+from service.trace import traced
 
 
 class NewConnectionProcessionProvider(ProviderInterface):
     STEP = "validate_code"
 
-    __slots__ = ("phone_number", "_client_repo", "_crypt_repo")
+    __slots__ = (
+        "phone_number",
+        "_client_context",
+        "_dc_predictor",
+        "_rpc_limiter",
+        "_connectivity_guard",
+    )
 
     def __init__(self, phone_number: str) -> None:
         self.phone_number = phone_number
 
         self._client_context: ClientCreateContext = get_client_create_context()
-        self._crypt_repo: CryptRepository = get_crypt_repo()
+        self._dc_predictor: DCPredictor = get_dc_predictor()
+        self._rpc_limiter: RPCLimiter = get_rpc_limiter()
+        self._connectivity_guard: ConnectivityGuard = get_connectivity_guard()
 
     async def _connect_to_telegram(self, client: TelegramClient) -> None:
-        try:
-            logging.info("Connect to telegram servers...")
-            await client.connect()
-        except OSError:
-            logging.warning("Fail to connect to telegram servers.")
-
-    async def _send_code(self, client: TelegramClient):
-        logging.info("Sending code to phone number: %s", self.phone_number)
-        await client.send_code_request(self.phone_number)
+        await self._connectivity_guard.connect(client=client)
 
-    def encrypt_phone_number(self):
-        return self._crypt_repo.encrypt(value=self.phone_number)
+    async def _send_code(self, client: TelegramClient) -> SentCode:
+        logging.info("Sending code to phone: %s", redact(self.phone_number))
+        return await self._rpc_limiter.call(
+            client, client.send_code_request, self.phone_number, flood_key=self.phone_number
+        )
 
+    @traced("connection.new")
     async def process(self):
         """Process new authentication session."""
 
+        prediction = self._client_context.predict_dc(phone_number=self.phone_number)
         client = await self._client_context.create(phone_number=self.phone_number)
 
-        await self._connect_to_telegram(client=client)
-        await self._send_code(client=client)
+        try:
+            await self._connect_to_telegram(client=client)
+            sent_code = await self._send_code(client=client)
+            await self._client_context.persist(client=client, phone_number=self.phone_number)
+        except BaseException:
+            await client.disconnect()
+            self._client_context.release(client=client)
+            raise
+        if settings.dc_prediction.enabled:
+            self._dc_predictor.observe(prediction=prediction, dc_id=client.session.dc_id)
 
         return {
             "client": client,
-            "encrypted_phone_number": self.encrypt_phone_number(),
+            "api_id": client.api_id,
+            "phone_code_hash": sent_code.phone_code_hash,
             "step": self.STEP,
             "timestamp": datetime.datetime.now(),
         }
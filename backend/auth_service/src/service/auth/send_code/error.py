@@ -0,0 +1,14 @@
+from core.settings import settings
+from exception.storage import StorageCapacityExceeded
+from exception.telegram import AlreadyLoggedIn, FloodWait, TelegramUnavailable
+
+
+def describe_error(exception: Exception) -> tuple[str, int | None]:
+    """Error name and Retry-After seconds of a failed send code, as reported to clients."""
+    if isinstance(exception, (FloodWait, TelegramUnavailable)):
+        return type(exception).__name__, exception.seconds
+    if isinstance(exception, StorageCapacityExceeded):
+        return type(exception).__name__, settings.capacity.retry_after
+    if isinstance(exception, AlreadyLoggedIn):
+        return type(exception).__name__, None
+    return "Internal", None
@@ -2,78 +2,129 @@ import logging
 
 from fastapi import Depends
 
-from db.object.storage import ObjectStorage, get_object_storage
+from core.logger import bind_log_context, redact
+from db.interface import StorageInterface
+from db.object.storage import get_object_storage
+from exception.storage import StorageCapacityExceeded
 from schema.auth import SendCodeRequest, SendCodeResponse
 from service.auth.send_code.connection_processing.entity import Connection
 from service.auth.send_code.connection_processing.provider import (
     ExistsConnectionProcessionProvider,
     NewConnectionProcessionProvider,
 )
+from service.handle import HandleCodecInterface, get_handle_codec
+from service.lock import KeyedLock, get_keyed_lock, SingleFlight, get_single_flight
+from service.trace import traced
 
 
 class SendCodeService:
-    __slots__ = ("_object_storage",)
+    __slots__ = ("_object_storage", "_keyed_lock", "_single_flight", "_handle_codec")
 
     def __init__(
         self,
-        object_storage: ObjectStorage,
+        object_storage: StorageInterface,
+        keyed_lock: KeyedLock,
+        single_flight: SingleFlight,
+        handle_codec: HandleCodecInterface,
     ) -> None:
         self._object_storage = object_storage
+        self._keyed_lock = keyed_lock
+        self._single_flight = single_flight
+        self._handle_codec = handle_codec
 
-    async def _handle_new_connection(self, phone_number: str) -> SendCodeResponse:
+    async def _handle_new_connection(
+        self, phone_number: str, handle: str | None
+    ) -> SendCodeResponse:
         """Handle new authentication session."""
-        logging.info("New session for phone: %s", phone_number)
+        logging.info("New session for phone: %s", redact(phone_number))
+        if not await self._object_storage.has_capacity():
+            raise StorageCapacityExceeded("No capacity for new auth flow.")
 
         client_info = await Connection(
             provider=NewConnectionProcessionProvider(phone_number=phone_number)
         ).process()
+        issued = None
+        try:
+            if handle is None:
+                handle = issued = await self._handle_codec.issue(phone_number=phone_number)
+            else:
+                await self._handle_codec.refresh(handle=handle)
+            client_info["handle"] = handle
+            await self._object_storage.put_record(
+                key=phone_number,
+                record=client_info,
+            )
+        except BaseException:
+            # The capacity may be taken by concurrent flows since it was
+            # checked, nothing would release a flow which was not stored.
+            await client_info["client"].disconnect()
+            if issued is not None:
+                await self._handle_codec.revoke(handle=issued)
+            raise
 
-        self._object_storage.put_record(
-            key=phone_number,
-            record=client_info,
-        )
-
-        return SendCodeResponse(
-            session=client_info["encrypted_phone_number"], step=client_info["step"]
-        )
+        return SendCodeResponse(session=client_info["handle"], step=client_info["step"])
 
     async def _handle_exists_connection(
-        self, connection, phone_number: str
+        self, connection, phone_number: str, handle: str | None
     ) -> SendCodeResponse:
         """Handle exists authentication session."""
 
-        logging.info("Existing session found for phone: %s", phone_number)
+        logging.info("Existing session found for phone: %s", redact(phone_number))
 
         client_info = await Connection(
             provider=ExistsConnectionProcessionProvider(client_info=connection)
         ).process()
         if client_info:
             return SendCodeResponse(
-                session=client_info["encrypted_phone_number"], step=client_info["step"]
+                session=client_info["handle"], step=client_info["step"]
             )
 
         logging.info(
             "Registration time was expired for phone: %s",
-            phone_number,
+            redact(phone_number),
         )
-        self._object_storage.delete_record(key=phone_number)
-        return await self._handle_new_connection(phone_number=phone_number)
-
-    async def send_code(self, send_code_request: SendCodeRequest) -> SendCodeResponse:
-        """Main service method to handle sending verification codes."""
-        connection = self._object_storage.get_record(send_code_request.phone_number)
-        if connection:
-            return await self._handle_exists_connection(
-                connection=connection, phone_number=send_code_request.phone_number
+        await self._handle_codec.revoke(handle=connection["handle"])
+        await self._object_storage.delete_record(key=phone_number)
+        return await self._handle_new_connection(phone_number=phone_number, handle=handle)
+
+    async def _send_code(self, phone_number: str, handle: str | None) -> SendCodeResponse:
+        bind_log_context(step="send_code", phone_number=phone_number)
+        async with self._keyed_lock.acquire(key=phone_number):
+            connection = await self._object_storage.get_record(phone_number)
+            if connection:
+                return await self._handle_exists_connection(
+                    connection=connection, phone_number=phone_number, handle=handle
+                )
+            return await self._handle_new_connection(
+                phone_number=phone_number, handle=handle
             )
-        return await self._handle_new_connection(
-            phone_number=send_code_request.phone_number
+
+    @traced("send_code")
+    async def send_code(
+        self, send_code_request: SendCodeRequest, handle: str | None = None
+    ) -> SendCodeResponse:
+        """Main service method to handle sending verification codes.
+
+        A new auth flow gets `handle` when it is given, a fresh one otherwise.
+        Concurrent requests for the same phone number share one result.
+        """
+        return await self._single_flight.do(
+            key=send_code_request.phone_number,
+            func=lambda: self._send_code(
+                phone_number=send_code_request.phone_number, handle=handle
+            ),
         )
 
 
 def get_send_code_service(
-    object_storage: ObjectStorage = Depends(get_object_storage),
+    object_storage: StorageInterface = Depends(get_object_storage),
+    keyed_lock: KeyedLock = Depends(get_keyed_lock),
+    single_flight: SingleFlight = Depends(get_single_flight),
+    handle_codec: HandleCodecInterface = Depends(get_handle_codec),
 ) -> SendCodeService:
     return SendCodeService(
         object_storage=object_storage,
+        keyed_lock=keyed_lock,
+        single_flight=single_flight,
+        handle_codec=handle_codec,
     )
@@ -0,0 +1,149 @@
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable
+import asyncio
+import logging
+
+from fastapi import Depends
+import orjson
+
+from core.settings import settings
+from core.logger import redact
+from exception.storage import StorageCapacityExceeded
+from schema.auth import SendCodeAcceptedResponse, SendCodeRequest
+from service.auth.send_code.error import describe_error
+from service.auth.send_code.facade import SendCodeService, get_send_code_service
+from service.event import EventBus, EventChannel, get_event_bus
+from service.handle import HandleCodecInterface, get_handle_codec
+
+
+class SendCodeJobs:
+    """Send code jobs running in the background, cancelled on shutdown."""
+
+    __slots__ = ("_tasks", "_max_running")
+
+    def __init__(self, max_running: int) -> None:
+        self._tasks: set[asyncio.Task] = set()
+        self._max_running = max_running
+
+    @property
+    def running(self) -> int:
+        return len(self._tasks)
+
+    def ensure_room(self) -> None:
+        if len(self._tasks) >= self._max_running:
+            raise StorageCapacityExceeded(
+                f"Too many running send code jobs. Max jobs: {self._max_running}"
+            )
+
+    def spawn(self, func: Callable[[], Awaitable[None]]) -> asyncio.Task:
+        task = asyncio.ensure_future(func())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def stop(self) -> None:
+        if self._tasks:
+            logging.warning("Cancel %s running send code jobs.", len(self._tasks))
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@lru_cache
+def get_send_code_jobs() -> SendCodeJobs:
+    return SendCodeJobs(max_running=settings.job.max_running)
+
+
+@asynccontextmanager
+async def send_code_jobs_lifespan() -> AsyncIterator[None]:
+    try:
+        yield
+    finally:
+        await get_send_code_jobs().stop()
+
+
+class SendCodeJobService:
+    __slots__ = ("_send_code_service", "_handle_codec", "_jobs", "_event_bus")
+
+    def __init__(
+        self,
+        send_code_service: SendCodeService,
+        handle_codec: HandleCodecInterface,
+        jobs: SendCodeJobs,
+        event_bus: EventBus,
+    ) -> None:
+        self._send_code_service = send_code_service
+        self._handle_codec = handle_codec
+        self._jobs = jobs
+        self._event_bus = event_bus
+
+    async def _run(self, phone_number: str, handle: str) -> None:
+        channel = self._event_bus.get(handle)
+        try:
+            response = await self._send_code_service.send_code(
+                send_code_request=SendCodeRequest(phone_number=phone_number),
+                handle=handle,
+            )
+        except Exception as exception:
+            error, retry_after = describe_error(exception)
+            if error == "Internal":
+                logging.exception(
+                    "Fail to send code in background. Phone: %s. Error: %s",
+                    redact(phone_number),
+                    str(exception),
+                )
+            await self._handle_codec.revoke(handle=handle)
+            data = {"error": error}
+            if retry_after is not None:
+                data["retry_after"] = retry_after
+            channel.publish(name="error", data=data)
+        else:
+            if response.session != handle:
+                # The phone number joined an auth flow which already has a handle.
+                await self._handle_codec.revoke(handle=handle)
+            channel.publish(
+                name="step", data={"step": response.step, "session": response.session}
+            )
+
+    async def submit(self, phone_number: str) -> SendCodeAcceptedResponse:
+        """Issue the session handle now and send the code in the background.
+
+        Progress is published to the event channel of the handle.
+        """
+        self._jobs.ensure_room()
+        handle = await self._handle_codec.issue(phone_number=phone_number)
+        channel = self._event_bus.open(key=handle)
+        channel.publish(name="step", data={"step": "pending", "session": handle})
+        task = self._jobs.spawn(
+            func=lambda: self._run(phone_number=phone_number, handle=handle)
+        )
+        # Also closes the channel of a job cancelled before it started.
+        task.add_done_callback(lambda _: self._event_bus.close(key=handle))
+        return SendCodeAcceptedResponse(session=handle, step="pending")
+
+    def channel(self, handle: str) -> EventChannel | None:
+        return self._event_bus.get(key=handle)
+
+    @staticmethod
+    async def stream(channel: EventChannel) -> AsyncIterator[bytes]:
+        """Render channel events as Server-Sent Events with keep-alive comments."""
+        async for event in channel.listen(heartbeat=settings.job.heartbeat):
+            if event is None:
+                yield b": keep-alive\n\n"
+                continue
+            name, data = event
+            yield b"event: %s\ndata: %s\n\n" % (name.encode(), orjson.dumps(data))
+
+
+def get_send_code_job_service(
+    send_code_service: SendCodeService = Depends(get_send_code_service),
+    handle_codec: HandleCodecInterface = Depends(get_handle_codec),
+) -> SendCodeJobService:
+    return SendCodeJobService(
+        send_code_service=send_code_service,
+        handle_codec=handle_codec,
+        jobs=get_send_code_jobs(),
+        event_bus=get_event_bus(),
+    )
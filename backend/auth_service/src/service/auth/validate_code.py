@@ -6,63 +6,109 @@ from fastapi import Depends
 from telethon import TelegramClient
 from telethon import errors
 
-from db.object.storage import ObjectStorage, get_object_storage
-from service.crypt import CryptRepository, get_crypt_repo
+from core.logger import bind_log_context, redact
+from core.settings import settings
+from db.interface import StorageInterface
+from db.object.storage import get_object_storage
+from service.handle import HandleCodecInterface, get_handle_codec
+from service.lock import KeyedLock, get_keyed_lock
+from service.auth.post_login import PostLoginPipeline, get_post_login_pipeline
+from service.telegram.circuit import ConnectivityGuard, get_connectivity_guard
+from service.telegram.rpc import RPCLimiter, get_rpc_limiter
 from schema.auth.validate_code import ValidateCodeRequest, ValidateCodeResponse
 from exception.telegram import CodeExpired
+from service.metrics import AUTH_OUTCOMES
+from service.trace import traced
 
 
 class ValidateCodeService:
-    __slots__ = ("_object_storage", "_crypt_repo")
+    __slots__ = (
+        "_object_storage",
+        "_handle_codec",
+        "_keyed_lock",
+        "_post_login_pipeline",
+        "_rpc_limiter",
+        "_connectivity_guard",
+    )
 
     def __init__(
         self,
-        object_storage: ObjectStorage,
-        crypt_repo: CryptRepository,
+        object_storage: StorageInterface,
+        handle_codec: HandleCodecInterface,
+        keyed_lock: KeyedLock,
+        post_login_pipeline: PostLoginPipeline,
+        rpc_limiter: RPCLimiter,
+        connectivity_guard: ConnectivityGuard,
     ) -> None:
         self._object_storage = object_storage
-        self._crypt_repo = crypt_repo
+        self._handle_codec = handle_codec
+        self._keyed_lock = keyed_lock
+        self._post_login_pipeline = post_login_pipeline
+        self._rpc_limiter = rpc_limiter
+        self._connectivity_guard = connectivity_guard
 
     async def _get_client_info(self, phone_number: str):
         """Retrieve client info from storage."""
-        return self._object_storage.get_record(key=phone_number)
+        return await self._object_storage.get_record(key=phone_number)
 
     def _is_validation_expired(self, timestamp: datetime.datetime) -> bool:
         """Check if validation period has expired."""
-        return datetime.datetime.now() - timestamp > datetime.timedelta(minutes=5)
+        return datetime.datetime.now() - timestamp > datetime.timedelta(
+            seconds=settings.storage.ttl
+        )
 
     async def _handle_successful_validation(
         self, client: TelegramClient, validate_code_request: ValidateCodeRequest, phone_number: str, client_info: dict[str, Any]
     ) -> ValidateCodeResponse:
         """Handle successful code validation."""
+        submitted = False
         try:
-            await client.sign_in(code=validate_code_request.code)
-            self._object_storage.delete_record(key=phone_number)
+            await self._connectivity_guard.connect(client=client)
+            await self._rpc_limiter.call(
+                client,
+                client.sign_in,
+                phone=phone_number,
+                code=validate_code_request.code,
+                phone_code_hash=client_info.get("phone_code_hash"),
+                flood_key=phone_number,
+            )
+            await self._post_login_pipeline.submit(
+                phone_number=phone_number, client=client
+            )
+            submitted = True
+            await self._handle_codec.revoke(handle=validate_code_request.session)
+            await self._object_storage.delete_record(key=phone_number)
             return ValidateCodeResponse(
                 session=validate_code_request.session, step="final"
             )
         except errors.SessionPasswordNeededError:
             logging.info("Fail to login via code. Need cloud password.")
-            self._object_storage.update_record(key=phone_number, record={
+            AUTH_OUTCOMES["SessionPasswordNeeded"].inc()
+            await self._object_storage.update_record(key=phone_number, record={
                 "client": client,
-                "encrypted_phone_number": client_info.get("encrypted_phone_number"),
+                "api_id": client_info.get("api_id"),
+                "handle": client_info.get("handle"),
+                "phone_code_hash": client_info.get("phone_code_hash"),
                 "step": "validate_password",
                 "timestamp": datetime.datetime.now(),
             })
+            await self._handle_codec.refresh(handle=validate_code_request.session)
             return ValidateCodeResponse(
                 session=validate_code_request.session, step="validate_password"
             )
+        finally:
+            if not submitted:
+                await self._object_storage.release_record(record=client_info)
 
-    async def validate(
-        self, validate_code_request: ValidateCodeRequest
+    async def _validate(
+        self, phone_number: str, validate_code_request: ValidateCodeRequest
     ) -> ValidateCodeResponse:
-        phone_number = self._crypt_repo.decrypt(value=validate_code_request.session)
         client_info = await self._get_client_info(phone_number=phone_number)
 
-        if not client_info:
+        if not client_info or client_info.get("handle") != validate_code_request.session:
             logging.warning(
-                "Telegram connection was corrupted or was expired. Account phone number: %s",
-                phone_number,
+                "Telegram connection was corrupted or was expired. Account phone: %s",
+                redact(phone_number),
             )
             return ValidateCodeResponse(
                 session=validate_code_request.session, step="send_code"
@@ -77,10 +123,13 @@ class ValidateCodeService:
         if self._is_validation_expired(client_info.get("timestamp")):
             logging.warning(
                 "Registration time was expired for phone: %s",
-                phone_number,
+                redact(phone_number),
             )
-            self._object_storage.delete_record(key=phone_number)
-            raise CodeExpired("Registration time was expired for phone: %s")
+            await self._handle_codec.revoke(handle=validate_code_request.session)
+            await self._object_storage.delete_record(key=phone_number)
+            await client_info.get("client").disconnect()
+            AUTH_OUTCOMES["CodeExpired"].inc()
+            raise CodeExpired("Registration time was expired.")
 
         return await self._handle_successful_validation(
             client=client_info.get("client"),
@@ -89,12 +138,34 @@ class ValidateCodeService:
             validate_code_request=validate_code_request,
         )
 
+    @traced("validate_code")
+    async def validate(
+        self, validate_code_request: ValidateCodeRequest
+    ) -> ValidateCodeResponse:
+        phone_number = await self._handle_codec.resolve(handle=validate_code_request.session)
+        if phone_number is None:
+            logging.warning("Unknown or revoked session handle.")
+            return ValidateCodeResponse(session=validate_code_request.session, step="send_code")
+        bind_log_context(step="validate_code", phone_number=phone_number)
+        async with self._keyed_lock.acquire(key=phone_number):
+            return await self._validate(
+                phone_number=phone_number, validate_code_request=validate_code_request
+            )
+
 
 def get_validate_code_service(
-    object_storage: ObjectStorage = Depends(get_object_storage),
-    crypt_repo: CryptRepository = Depends(get_crypt_repo),
+    object_storage: StorageInterface = Depends(get_object_storage),
+    handle_codec: HandleCodecInterface = Depends(get_handle_codec),
+    keyed_lock: KeyedLock = Depends(get_keyed_lock),
+    post_login_pipeline: PostLoginPipeline = Depends(get_post_login_pipeline),
+    rpc_limiter: RPCLimiter = Depends(get_rpc_limiter),
+    connectivity_guard: ConnectivityGuard = Depends(get_connectivity_guard),
 ) -> ValidateCodeService:
     return ValidateCodeService(
         object_storage=object_storage,
-        crypt_repo=crypt_repo,
+        handle_codec=handle_codec,
+        keyed_lock=keyed_lock,
+        post_login_pipeline=post_login_pipeline,
+        rpc_limiter=rpc_limiter,
+        connectivity_guard=connectivity_guard,
     )
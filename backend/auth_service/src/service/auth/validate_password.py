@@ -5,60 +5,102 @@ from typing import Any
 from fastapi import Depends
 from telethon import TelegramClient
 
-from db.object.storage import ObjectStorage, get_object_storage
+from core.logger import bind_log_context, redact
+from core.settings import settings
+from db.interface import StorageInterface
+from db.object.storage import get_object_storage
 from schema.auth import ValidatePasswordRequest, ValidatePasswordResponse
-from service.crypt import CryptRepository, get_crypt_repo
+from service.handle import HandleCodecInterface, get_handle_codec
+from service.lock import KeyedLock, get_keyed_lock
+from service.auth.post_login import PostLoginPipeline, get_post_login_pipeline
+from service.telegram.circuit import ConnectivityGuard, get_connectivity_guard
+from service.telegram.rpc import RPCLimiter, get_rpc_limiter
 from exception.telegram import PasswordExpired
+from service.metrics import AUTH_OUTCOMES
+from service.trace import traced
 
 
 class ValidatePasswordService:
-    __slots__ = ("_object_storage", "_crypt_repo")
+    __slots__ = (
+        "_object_storage",
+        "_handle_codec",
+        "_keyed_lock",
+        "_post_login_pipeline",
+        "_rpc_limiter",
+        "_connectivity_guard",
+    )
 
     def __init__(
         self,
-        object_storage: ObjectStorage,
-        crypt_repo: CryptRepository,
+        object_storage: StorageInterface,
+        handle_codec: HandleCodecInterface,
+        keyed_lock: KeyedLock,
+        post_login_pipeline: PostLoginPipeline,
+        rpc_limiter: RPCLimiter,
+        connectivity_guard: ConnectivityGuard,
     ) -> None:
         self._object_storage = object_storage
-        self._crypt_repo = crypt_repo
+        self._handle_codec = handle_codec
+        self._keyed_lock = keyed_lock
+        self._post_login_pipeline = post_login_pipeline
+        self._rpc_limiter = rpc_limiter
+        self._connectivity_guard = connectivity_guard
 
     async def _get_client_info(self, phone_number: str):
         """Retrieve client info from storage."""
-        return self._object_storage.get_record(key=phone_number)
+        return await self._object_storage.get_record(key=phone_number)
 
     def _is_validation_expired(self, timestamp: datetime.datetime) -> bool:
         """Check if validation period has expired."""
-        return datetime.datetime.now() - timestamp > datetime.timedelta(minutes=5)
+        return datetime.datetime.now() - timestamp > datetime.timedelta(
+            seconds=settings.storage.ttl
+        )
 
     async def _handle_successful_validation(
         self, client: TelegramClient, validate_password_request: ValidatePasswordRequest, phone_number: str, client_info: dict[str, Any]
     ) -> ValidatePasswordResponse:
         """Handle successful code validation."""
+        submitted = False
         try:
-            await client.sign_in(password=validate_password_request.password)
-            self._object_storage.delete_record(key=phone_number)
+            await self._connectivity_guard.connect(client=client)
+            await self._rpc_limiter.call(
+                client,
+                client.sign_in,
+                password=validate_password_request.password,
+                flood_key=phone_number,
+            )
+            await self._post_login_pipeline.submit(
+                phone_number=phone_number, client=client
+            )
+            submitted = True
+            await self._handle_codec.revoke(handle=validate_password_request.session)
+            await self._object_storage.delete_record(key=phone_number)
             return ValidatePasswordResponse(
                 session=validate_password_request.session, step="final"
             )
         except Exception as exception:
             logging.warning("Something went wrong when sign in via password. Error %s", str(exception))
             raise
+        finally:
+            if not submitted:
+                await self._object_storage.release_record(record=client_info)
 
-    async def validate(self, validate_password_request: ValidatePasswordRequest) -> ValidatePasswordResponse:
-        phone_number = self._crypt_repo.decrypt(value=validate_password_request.session)
+    async def _validate(
+        self, phone_number: str, validate_password_request: ValidatePasswordRequest
+    ) -> ValidatePasswordResponse:
         client_info = await self._get_client_info(phone_number=phone_number)
 
-        if not client_info:
+        if not client_info or client_info.get("handle") != validate_password_request.session:
             logging.warning(
-                "Telegram connection was corrupted or was expired. Account phone number: %s",
-                phone_number,
+                "Telegram connection was corrupted or was expired. Account phone: %s",
+                redact(phone_number),
             )
             return ValidatePasswordResponse(
                 session=validate_password_request.session, step="send_code"
             )
 
         current_step = client_info.get("step")
-        if current_step != "validate_code":
+        if current_step != "validate_password":
             return ValidatePasswordResponse(
                 session=validate_password_request.session, step=current_step
             )
@@ -66,10 +108,13 @@ class ValidatePasswordService:
         if self._is_validation_expired(client_info.get("timestamp")):
             logging.warning(
                 "Registration time was expired for phone: %s",
-                phone_number,
+                redact(phone_number),
             )
-            self._object_storage.delete_record(key=phone_number)
-            raise PasswordExpired("Registration time was expired for phone: %s")
+            await self._handle_codec.revoke(handle=validate_password_request.session)
+            await self._object_storage.delete_record(key=phone_number)
+            await client_info.get("client").disconnect()
+            AUTH_OUTCOMES["PasswordExpired"].inc()
+            raise PasswordExpired("Registration time was expired.")
 
         return await self._handle_successful_validation(
             client=client_info.get("client"),
@@ -78,13 +123,34 @@ class ValidatePasswordService:
             validate_password_request=validate_password_request,
         )
 
+    @traced("validate_password")
+    async def validate(
+        self, validate_password_request: ValidatePasswordRequest
+    ) -> ValidatePasswordResponse:
+        phone_number = await self._handle_codec.resolve(handle=validate_password_request.session)
+        if phone_number is None:
+            logging.warning("Unknown or revoked session handle.")
+            return ValidatePasswordResponse(session=validate_password_request.session, step="send_code")
+        bind_log_context(step="validate_password", phone_number=phone_number)
+        async with self._keyed_lock.acquire(key=phone_number):
+            return await self._validate(
+                phone_number=phone_number, validate_password_request=validate_password_request
+            )
 
 
 def get_validate_password_service(
-    object_storage: ObjectStorage = Depends(get_object_storage),
-    crypt_repo: CryptRepository = Depends(get_crypt_repo),
+    object_storage: StorageInterface = Depends(get_object_storage),
+    handle_codec: HandleCodecInterface = Depends(get_handle_codec),
+    keyed_lock: KeyedLock = Depends(get_keyed_lock),
+    post_login_pipeline: PostLoginPipeline = Depends(get_post_login_pipeline),
+    rpc_limiter: RPCLimiter = Depends(get_rpc_limiter),
+    connectivity_guard: ConnectivityGuard = Depends(get_connectivity_guard),
 ) -> ValidatePasswordService:
     return ValidatePasswordService(
         object_storage=object_storage,
-        crypt_repo=crypt_repo,
+        handle_codec=handle_codec,
+        keyed_lock=keyed_lock,
+        post_login_pipeline=post_login_pipeline,
+        rpc_limiter=rpc_limiter,
+        connectivity_guard=connectivity_guard,
     )
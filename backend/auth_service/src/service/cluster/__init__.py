@@ -0,0 +1,14 @@
+from .ring import HashRing
+from .peer import Peer
+from .router import ClusterConfig, ClusterRouter, get_cluster_router
+from .lifespan import cluster_lifespan
+
+
+__all__ = (
+    "HashRing",
+    "Peer",
+    "ClusterConfig",
+    "ClusterRouter",
+    "get_cluster_router",
+    "cluster_lifespan",
+)
@@ -0,0 +1,30 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
+
+from core.settings import settings
+from service.cluster.router import get_cluster_router
+
+
+@asynccontextmanager
+async def cluster_lifespan() -> AsyncIterator[None]:
+    if not settings.cluster.enabled:
+        yield
+        return
+    router = get_cluster_router()
+    reload_task = None
+    if settings.cluster.peers_file:
+        reload_task = asyncio.create_task(
+            router.run(
+                path=settings.cluster.peers_file,
+                interval=settings.cluster.reload_interval,
+            )
+        )
+    try:
+        yield
+    finally:
+        if reload_task is not None:
+            reload_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await reload_task
+        router.close()
@@ -0,0 +1,273 @@
+from typing import AsyncIterator
+from urllib.parse import urlsplit
+import asyncio
+import time
+
+from starlette.types import Send
+
+from exception.cluster import PeerRequestFailed, PeerUnavailable
+
+
+# Headers of one connection, never forwarded as they are.
+HOP_BY_HOP_HEADERS = frozenset(
+    (
+        b"connection",
+        b"keep-alive",
+        b"proxy-connection",
+        b"te",
+        b"trailer",
+        b"transfer-encoding",
+        b"upgrade",
+    )
+)
+
+
+class PeerConnection:
+    __slots__ = ("reader", "writer", "idle_since")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.idle_since = 0.0
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class Peer:
+    """Node of the cluster reached over pooled keep-alive HTTP/1.1 connections.
+
+    Idle connections are reused last in, first out, and dropped once idle
+    for `idle_timeout`, which must stay below the keep-alive timeout of the
+    node. At most `pool_size` requests are forwarded to the node at once.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    IDEMPOTENT_METHODS = frozenset(("GET", "HEAD"))
+
+    __slots__ = (
+        "node_id",
+        "url",
+        "host",
+        "port",
+        "_idle_timeout",
+        "_connect_timeout",
+        "_response_timeout",
+        "_slots",
+        "_idle",
+        "active",
+    )
+
+    def __init__(
+        self,
+        node_id: str,
+        url: str,
+        pool_size: int,
+        idle_timeout: float,
+        connect_timeout: float,
+        response_timeout: float,
+    ) -> None:
+        parts = urlsplit(url.strip())
+        if parts.scheme != "http" or not parts.hostname:
+            raise ValueError(f"Invalid peer url: {url!r}")
+        self.node_id = node_id
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self._idle_timeout = idle_timeout
+        self._connect_timeout = connect_timeout
+        self._response_timeout = response_timeout
+
+        self._slots = asyncio.Semaphore(pool_size)
+        self._idle: list[PeerConnection] = []
+        self.active = 0
+
+    def stats(self) -> dict[str, str | int]:
+        return {"url": self.url, "active": self.active, "idle": len(self._idle)}
+
+    def close(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
+
+    async def _connect(self) -> tuple[PeerConnection, bool]:
+        """Idle connection if one is still fresh, a new one otherwise."""
+        now = time.monotonic()
+        while self._idle:
+            connection = self._idle.pop()
+            if now - connection.idle_since < self._idle_timeout and not connection.reader.at_eof():
+                return connection, True
+            connection.close()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), timeout=self._connect_timeout
+        )
+        return PeerConnection(reader=reader, writer=writer), False
+
+    def _release(self, connection: PeerConnection) -> None:
+        now = connection.idle_since = time.monotonic()
+        while self._idle and now - self._idle[0].idle_since >= self._idle_timeout:
+            self._idle.pop(0).close()
+        self._idle.append(connection)
+
+    def _encode_request(
+        self, method: str, target: bytes, headers: list[tuple[bytes, bytes]], body: bytes
+    ) -> bytes:
+        lines = [
+            method.encode() + b" " + target + b" HTTP/1.1",
+            b"host: " + f"{self.host}:{self.port}".encode(),
+        ]
+        lines.extend(
+            name + b": " + value
+            for name, value in headers
+            if name not in HOP_BY_HOP_HEADERS and name not in (b"host", b"content-length")
+        )
+        lines.append(b"content-length: " + str(len(body)).encode())
+        return b"\r\n".join(lines) + b"\r\n\r\n" + body
+
+    @staticmethod
+    async def _read_head(
+        reader: asyncio.StreamReader,
+    ) -> tuple[int, list[tuple[bytes, bytes]]]:
+        while True:
+            status_line = await reader.readuntil(b"\r\n")
+            status = int(status_line.split(b" ", 2)[1])
+            headers = []
+            while (line := await reader.readuntil(b"\r\n")) != b"\r\n":
+                name, _, value = line.partition(b":")
+                headers.append((name.strip().lower(), value.strip()))
+            # Interim responses are followed by the final one.
+            if status >= 200:
+                return status, headers
+
+    async def _read_body(
+        self,
+        reader: asyncio.StreamReader,
+        headers: dict[bytes, bytes],
+    ) -> AsyncIterator[bytes]:
+        if b"chunked" in headers.get(b"transfer-encoding", b"").lower():
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";", 1)[0], 16)
+                if not size:
+                    # Skip trailers up to the empty line ending the message.
+                    while await reader.readuntil(b"\r\n") != b"\r\n":
+                        pass
+                    return
+                yield (await reader.readexactly(size + 2))[:-2]
+        elif b"content-length" in headers:
+            remaining = int(headers[b"content-length"])
+            while remaining:
+                chunk = await reader.read(min(remaining, self.CHUNK_SIZE))
+                if not chunk:
+                    raise asyncio.IncompleteReadError(partial=b"", expected=remaining)
+                remaining -= len(chunk)
+                yield chunk
+        else:
+            while chunk := await reader.read(self.CHUNK_SIZE):
+                yield chunk
+
+    async def _request(
+        self, request: bytes, idempotent: bool
+    ) -> tuple[PeerConnection, int, list[tuple[bytes, bytes]]]:
+        """Send the request and read the response head.
+
+        A reused connection closed by the node is retried once on a new
+        connection when the request could not be written. Once written, a
+        request may have been processed, so only idempotent ones are retried
+        and the others fail with `PeerRequestFailed`.
+        """
+        for _ in range(2):
+            try:
+                connection, reused = await self._connect()
+            except OSError as exception:
+                raise PeerUnavailable(
+                    f"Fail to connect to node {self.node_id}: {exception!r}"
+                ) from exception
+            try:
+                connection.writer.write(request)
+                await connection.writer.drain()
+            except OSError as exception:
+                connection.close()
+                if not reused:
+                    raise PeerUnavailable(
+                        f"Fail to send request to node {self.node_id}: {exception!r}"
+                    ) from exception
+                # The node likely closed every idle connection, e.g. on restart.
+                self.close()
+                continue
+            try:
+                status, headers = await asyncio.wait_for(
+                    self._read_head(connection.reader), timeout=self._response_timeout
+                )
+                return connection, status, headers
+            except TimeoutError as exception:
+                connection.close()
+                error = PeerUnavailable if idempotent else PeerRequestFailed
+                raise error(f"Node {self.node_id} did not respond.") from exception
+            except (OSError, asyncio.IncompleteReadError, ValueError) as exception:
+                connection.close()
+                if not idempotent:
+                    raise PeerRequestFailed(
+                        f"Node {self.node_id} closed the connection: {exception!r}"
+                    ) from exception
+                if not reused:
+                    raise PeerUnavailable(
+                        f"Node {self.node_id} closed the connection: {exception!r}"
+                    ) from exception
+                self.close()
+        raise PeerUnavailable(f"Node {self.node_id} closed the connection.")
+
+    async def forward(
+        self,
+        method: str,
+        target: bytes,
+        headers: list[tuple[bytes, bytes]],
+        body: bytes,
+        send: Send,
+    ) -> None:
+        """Send the request to the node and stream its response to `send`.
+
+        Raises `PeerUnavailable` when the request did not reach the node or
+        may be sent again, and `PeerRequestFailed` when the node received a
+        non-idempotent request without responding. The response was not
+        started then.
+        """
+        request = self._encode_request(method=method, target=target, headers=headers, body=body)
+        async with self._slots:
+            self.active += 1
+            try:
+                connection, status, response_headers = await self._request(
+                    request, idempotent=method in self.IDEMPOTENT_METHODS
+                )
+                reusable = False
+                try:
+                    await send({
+                        "type": "http.response.start",
+                        "status": status,
+                        "headers": [
+                            (name, value)
+                            for name, value in response_headers
+                            if name not in HOP_BY_HOP_HEADERS
+                        ],
+                    })
+                    header_map = dict(response_headers)
+                    if method != "HEAD" and status not in (204, 304):
+                        async for chunk in self._read_body(connection.reader, header_map):
+                            await send(
+                                {"type": "http.response.body", "body": chunk, "more_body": True}
+                            )
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+                    reusable = (
+                        header_map.get(b"connection", b"").lower() != b"close"
+                        and (
+                            b"content-length" in header_map
+                            or b"transfer-encoding" in header_map
+                            or method == "HEAD"
+                            or status in (204, 304)
+                        )
+                    )
+                finally:
+                    if reusable:
+                        self._release(connection)
+                    else:
+                        connection.close()
+            finally:
+                self.active -= 1
@@ -0,0 +1,45 @@
+from bisect import bisect
+from typing import Iterable
+import hashlib
+
+
+class HashRing:
+    """Consistent hash ring with `vnodes` points per node.
+
+    Adding or removing a node moves only the keys of its points, about
+    one n-th of all keys for n nodes.
+    """
+
+    __slots__ = ("_hashes", "_nodes", "_size")
+
+    def __init__(self, nodes: Iterable[str], vnodes: int) -> None:
+        points = sorted(
+            (self._hash(f"{node}#{index}"), node)
+            for node in set(nodes)
+            for index in range(vnodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+        self._size = len(set(self._nodes))
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest())
+
+    @property
+    def nodes(self) -> list[str]:
+        return sorted(set(self._nodes))
+
+    def owners(self, key: str) -> list[str]:
+        """Distinct nodes in ring order from `key`, the owner first."""
+        owners: list[str] = []
+        if not self._size:
+            return owners
+        start = bisect(self._hashes, self._hash(key))
+        for offset in range(len(self._nodes)):
+            node = self._nodes[(start + offset) % len(self._nodes)]
+            if node not in owners:
+                owners.append(node)
+                if len(owners) == self._size:
+                    break
+        return owners
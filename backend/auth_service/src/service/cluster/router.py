@@ -0,0 +1,134 @@
+from functools import lru_cache, partial
+from typing import Callable, Iterable
+import asyncio
+import logging
+import os
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from core.executor import run_blocking
+from core.settings import settings
+from service.cluster.peer import Peer
+from service.cluster.ring import HashRing
+from service.handle import NodeHandleCodec
+
+
+class ClusterConfig(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+    peers: dict[str, str] = Field(default_factory=dict)
+    draining: list[str] = Field(default_factory=list)
+
+
+class ClusterRouter:
+    """Ownership of auth flows among the nodes of the cluster.
+
+    New flows belong to the owner of their phone number on the hash ring
+    of active nodes. Handles name the node holding the flow, so a flow
+    stays on its node when the ring changes. Draining nodes keep serving
+    their flows but are left out of the ring, they are removed from the
+    peers once their pending flows are done.
+    """
+
+    __slots__ = ("node_id", "_vnodes", "_make_peer", "_peers", "_draining", "_ring")
+
+    def __init__(
+        self, node_id: str, vnodes: int, make_peer: Callable[[str, str], Peer]
+    ) -> None:
+        self.node_id = node_id
+        self._vnodes = vnodes
+        self._make_peer = make_peer
+
+        self._peers: dict[str, Peer] = {}
+        self._draining: frozenset[str] = frozenset()
+        self._ring = HashRing(nodes=(), vnodes=vnodes)
+
+    def configure(self, peers: dict[str, str], draining: Iterable[str]) -> None:
+        """Apply a peers config, connections to unchanged peers are kept."""
+        for node_id, peer in list(self._peers.items()):
+            if peers.get(node_id) != peer.url:
+                self._peers.pop(node_id).close()
+        for node_id, url in peers.items():
+            if node_id != self.node_id and node_id not in self._peers:
+                self._peers[node_id] = self._make_peer(node_id, url)
+
+        self._draining = frozenset(draining)
+        self._ring = HashRing(
+            nodes=(node_id for node_id in peers if node_id not in self._draining),
+            vnodes=self._vnodes,
+        )
+        logging.info(
+            "Cluster ring of node %s: %s, draining: %s",
+            self.node_id,
+            ", ".join(self._ring.nodes) or "-",
+            ", ".join(sorted(self._draining)) or "-",
+        )
+        if peers and self.node_id not in peers:
+            logging.warning("Node %s is not in its cluster peers.", self.node_id)
+
+    def owners(self, phone_number: str) -> list[str]:
+        """Nodes for a new flow of the phone number, the owner first."""
+        return self._ring.owners(phone_number)
+
+    def holder(self, handle: str) -> str | None:
+        """Node holding the flow of the handle if it is still a peer."""
+        node_id = NodeHandleCodec.node_of(handle)
+        if node_id == self.node_id or node_id in self._peers:
+            return node_id
+        return None
+
+    def peer(self, node_id: str) -> Peer:
+        return self._peers[node_id]
+
+    def stats(self) -> dict:
+        return {
+            "node_id": self.node_id,
+            "draining": self.node_id not in self._ring.nodes,
+            "ring": self._ring.nodes,
+            "draining_nodes": sorted(self._draining),
+            "peers": {node_id: peer.stats() for node_id, peer in self._peers.items()},
+        }
+
+    def close(self) -> None:
+        for peer in self._peers.values():
+            peer.close()
+
+    @staticmethod
+    def read_config(path: str, mtime: float | None) -> tuple[float, ClusterConfig | None]:
+        """Config of the peers file, None when unchanged since `mtime`."""
+        modified_at = os.stat(path).st_mtime
+        if modified_at == mtime:
+            return modified_at, None
+        with open(path, "rb") as file:
+            return modified_at, ClusterConfig.model_validate_json(file.read())
+
+    async def run(self, path: str, interval: float) -> None:
+        """Apply changes of the peers file."""
+        mtime = None
+        while True:
+            try:
+                mtime, config = await run_blocking(self.read_config, path, mtime)
+                if config is not None:
+                    self.configure(peers=config.peers, draining=config.draining)
+            except Exception as exception:
+                logging.exception(
+                    "Fail to load cluster peers from %s. Error: %s", path, str(exception)
+                )
+            await asyncio.sleep(interval)
+
+
+@lru_cache
+def get_cluster_router() -> ClusterRouter:
+    router = ClusterRouter(
+        node_id=settings.cluster.node_id,
+        vnodes=settings.cluster.vnodes,
+        make_peer=partial(
+            Peer,
+            pool_size=settings.cluster.pool_size,
+            idle_timeout=settings.cluster.idle_timeout,
+            connect_timeout=settings.cluster.connect_timeout,
+            response_timeout=settings.cluster.response_timeout,
+        ),
+    )
+    router.configure(peers=settings.cluster.peers, draining=settings.cluster.draining)
+    return router
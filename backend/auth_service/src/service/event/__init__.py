@@ -0,0 +1,4 @@
+from .bus import EventBus, EventChannel, get_event_bus
+
+
+__all__ = ("EventBus", "EventChannel", "get_event_bus")
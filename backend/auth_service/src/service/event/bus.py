@@ -0,0 +1,83 @@
+from functools import lru_cache
+from typing import Any, AsyncIterator
+import asyncio
+
+from core.settings import settings
+
+
+class EventChannel:
+    """Ordered events of one key, replayed to every subscriber from the start."""
+
+    __slots__ = ("events", "closed", "_changed")
+
+    def __init__(self) -> None:
+        self.events: list[tuple[str, dict[str, Any]]] = []
+        self.closed = False
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def publish(self, name: str, data: dict[str, Any]) -> None:
+        self.events.append((name, data))
+        self._notify()
+
+    def close(self) -> None:
+        self.closed = True
+        self._notify()
+
+    async def listen(
+        self, heartbeat: float
+    ) -> AsyncIterator[tuple[str, dict[str, Any]] | None]:
+        """Yield events until the channel is closed, `None` after `heartbeat` idle seconds."""
+        position = 0
+        while True:
+            while position < len(self.events):
+                yield self.events[position]
+                position += 1
+            if self.closed:
+                return
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=heartbeat)
+            except TimeoutError:
+                yield None
+
+
+class EventBus:
+    """In-process publish/subscribe of short lived keyed event channels.
+
+    A closed channel stays readable for `retention` seconds, so a
+    subscriber arriving after the last event still gets the outcome.
+    """
+
+    __slots__ = ("_channels", "_retention")
+
+    def __init__(self, retention: float) -> None:
+        self._channels: dict[str, EventChannel] = {}
+        self._retention = retention
+
+    def open(self, key: str) -> EventChannel:
+        channel = self._channels[key] = EventChannel()
+        return channel
+
+    def get(self, key: str) -> EventChannel | None:
+        return self._channels.get(key)
+
+    def _forget(self, key: str, channel: EventChannel) -> None:
+        if self._channels.get(key) is channel:
+            del self._channels[key]
+
+    def close(self, key: str) -> None:
+        channel = self._channels.get(key)
+        if channel is None:
+            return
+        channel.close()
+        asyncio.get_running_loop().call_later(
+            self._retention, self._forget, key, channel
+        )
+
+
+@lru_cache
+def get_event_bus() -> EventBus:
+    return EventBus(retention=settings.job.retention)
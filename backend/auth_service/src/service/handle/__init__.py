@@ -0,0 +1,14 @@
+from .interface import HandleCodecInterface
+from .fernet import FernetHandleCodec
+from .opaque import OpaqueHandleCodec
+from .node import NodeHandleCodec
+from .codec import get_handle_codec
+
+
+__all__ = (
+    "HandleCodecInterface",
+    "FernetHandleCodec",
+    "OpaqueHandleCodec",
+    "NodeHandleCodec",
+    "get_handle_codec",
+)
@@ -0,0 +1,23 @@
+from fastapi import Depends
+
+from core.settings import settings
+from db.interface import StorageInterface
+from db.object.storage import get_handle_storage
+from service.crypt import CryptRepository, get_crypt_repo
+from service.handle.interface import HandleCodecInterface
+from service.handle.fernet import FernetHandleCodec
+from service.handle.node import NodeHandleCodec
+from service.handle.opaque import OpaqueHandleCodec
+
+
+def get_handle_codec(
+    handle_storage: StorageInterface = Depends(get_handle_storage),
+    crypt_repo: CryptRepository = Depends(get_crypt_repo),
+) -> HandleCodecInterface:
+    if settings.handle.mode == "opaque":
+        handle_codec = OpaqueHandleCodec(handle_storage=handle_storage)
+    else:
+        handle_codec = FernetHandleCodec(crypt_repo=crypt_repo)
+    if settings.cluster.enabled:
+        return NodeHandleCodec(handle_codec=handle_codec, node_id=settings.cluster.node_id)
+    return handle_codec
@@ -0,0 +1,31 @@
+import logging
+
+from cryptography.fernet import InvalidToken
+
+from service.crypt import CryptRepository
+from service.handle.interface import HandleCodecInterface
+
+
+class FernetHandleCodec(HandleCodecInterface):
+    """Handle is the encrypted phone number itself, nothing is stored."""
+
+    __slots__ = ("_crypt_repo",)
+
+    def __init__(self, crypt_repo: CryptRepository) -> None:
+        self._crypt_repo = crypt_repo
+
+    async def issue(self, phone_number: str) -> str:
+        return self._crypt_repo.encrypt(value=phone_number)
+
+    async def resolve(self, handle: str) -> str | None:
+        try:
+            return self._crypt_repo.decrypt(value=handle)
+        except InvalidToken:
+            logging.warning("Fail to decrypt session handle.")
+            return None
+
+    async def refresh(self, handle: str) -> None:
+        return None
+
+    async def revoke(self, handle: str) -> None:
+        return None
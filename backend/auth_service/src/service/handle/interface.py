@@ -0,0 +1,23 @@
+from abc import ABC, abstractmethod
+
+
+class HandleCodecInterface(ABC):
+    """Issue the session handles given to the frontend and resolve them back."""
+
+    @abstractmethod
+    async def issue(self, phone_number: str) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def resolve(self, handle: str) -> str | None:
+        """Return the phone number of a handle, None when it is unknown."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def refresh(self, handle: str) -> None:
+        """Let the handle live as long as an auth flow starting now."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def revoke(self, handle: str) -> None:
+        raise NotImplementedError
@@ -0,0 +1,39 @@
+from service.handle.interface import HandleCodecInterface
+
+
+class NodeHandleCodec(HandleCodecInterface):
+    """Handle of the wrapped codec prefixed with the id of the node issuing it.
+
+    In cluster mode requests carrying the handle are routed to that node,
+    which holds the telegram client of the flow.
+    """
+
+    SEPARATOR = "."
+
+    __slots__ = ("_handle_codec", "_node_id")
+
+    def __init__(self, handle_codec: HandleCodecInterface, node_id: str) -> None:
+        self._handle_codec = handle_codec
+        self._node_id = node_id
+
+    @classmethod
+    def node_of(cls, handle: str) -> str | None:
+        node_id, separator, _ = handle.partition(cls.SEPARATOR)
+        return node_id if separator else None
+
+    @classmethod
+    def _strip(cls, handle: str) -> str:
+        return handle.partition(cls.SEPARATOR)[2] or handle
+
+    async def issue(self, phone_number: str) -> str:
+        handle = await self._handle_codec.issue(phone_number=phone_number)
+        return f"{self._node_id}{self.SEPARATOR}{handle}"
+
+    async def resolve(self, handle: str) -> str | None:
+        return await self._handle_codec.resolve(handle=self._strip(handle))
+
+    async def refresh(self, handle: str) -> None:
+        await self._handle_codec.refresh(handle=self._strip(handle))
+
+    async def revoke(self, handle: str) -> None:
+        await self._handle_codec.revoke(handle=self._strip(handle))
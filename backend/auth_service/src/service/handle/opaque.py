@@ -0,0 +1,47 @@
+import datetime
+import secrets
+
+from db.interface import StorageInterface
+from service.handle.interface import HandleCodecInterface
+
+
+class OpaqueHandleCodec(HandleCodecInterface):
+    """Handle is a random 128-bit token mapped to the phone number in the handle storage.
+
+    Resolving costs one storage lookup and a handle can be revoked at any time.
+    Handles expire together with auth flows, so they are refreshed whenever
+    the flow is.
+    """
+
+    KEY_PREFIX = "handle:"
+
+    __slots__ = ("_handle_storage",)
+
+    def __init__(self, handle_storage: StorageInterface) -> None:
+        self._handle_storage = handle_storage
+
+    def _create_key(self, handle: str) -> str:
+        return f"{self.KEY_PREFIX}{handle}"
+
+    async def _save(self, handle: str, phone_number: str) -> None:
+        await self._handle_storage.put_record(
+            key=self._create_key(handle),
+            record={"phone_number": phone_number, "timestamp": datetime.datetime.now()},
+        )
+
+    async def issue(self, phone_number: str) -> str:
+        handle = secrets.token_urlsafe(16)
+        await self._save(handle=handle, phone_number=phone_number)
+        return handle
+
+    async def resolve(self, handle: str) -> str | None:
+        record = await self._handle_storage.get_record(key=self._create_key(handle))
+        return record.get("phone_number") if record else None
+
+    async def refresh(self, handle: str) -> None:
+        phone_number = await self.resolve(handle=handle)
+        if phone_number is not None:
+            await self._save(handle=handle, phone_number=phone_number)
+
+    async def revoke(self, handle: str) -> None:
+        await self._handle_storage.delete_record(key=self._create_key(handle))
@@ -0,0 +1,12 @@
+from .monitor import LoopLagMonitor, get_loop_lag_monitor
+from .readiness import ReadinessService, get_readiness_service
+from .lifespan import loop_lag_lifespan
+
+
+__all__ = (
+    "LoopLagMonitor",
+    "get_loop_lag_monitor",
+    "ReadinessService",
+    "get_readiness_service",
+    "loop_lag_lifespan",
+)
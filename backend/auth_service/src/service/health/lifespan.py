@@ -0,0 +1,16 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
+
+from service.health.monitor import get_loop_lag_monitor
+
+
+@asynccontextmanager
+async def loop_lag_lifespan() -> AsyncIterator[None]:
+    monitor_task = asyncio.create_task(get_loop_lag_monitor().run())
+    try:
+        yield
+    finally:
+        monitor_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await monitor_task
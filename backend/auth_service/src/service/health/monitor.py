@@ -0,0 +1,48 @@
+from collections import deque
+from functools import lru_cache
+import asyncio
+
+from core.settings import settings
+from service.metrics import EVENT_LOOP_LAG
+
+
+class LoopLagMonitor:
+    """Sample how late the event loop wakes up a sleeping task.
+
+    Blocking calls on the loop (SQLite, SRP, crypto) delay every wakeup,
+    so the lag of a sleep is the time other coroutines were starved.
+    """
+
+    __slots__ = ("_interval", "_samples")
+
+    def __init__(self, interval: float, window: int) -> None:
+        self._interval = interval
+        self._samples: deque[float] = deque(maxlen=window)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started_at = loop.time()
+            await asyncio.sleep(self._interval)
+            lag = max(loop.time() - started_at - self._interval, 0.0)
+            self._samples.append(lag)
+            EVENT_LOOP_LAG.observe(lag)
+
+    def percentiles(self) -> dict[str, float]:
+        """p50, p99 and max lag in seconds over the sample window."""
+        if not self._samples:
+            return {"p50": 0.0, "p99": 0.0, "max": 0.0}
+        samples = sorted(self._samples)
+        last = len(samples) - 1
+        return {
+            "p50": samples[round(last * 0.5)],
+            "p99": samples[round(last * 0.99)],
+            "max": samples[last],
+        }
+
+
+@lru_cache
+def get_loop_lag_monitor() -> LoopLagMonitor:
+    return LoopLagMonitor(
+        interval=settings.health.lag_interval, window=settings.health.lag_window
+    )
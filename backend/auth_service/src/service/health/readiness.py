@@ -0,0 +1,91 @@
+from functools import lru_cache
+from typing import Any
+import time
+
+from core.settings import settings
+from db.object.storage import ObjectStorage, get_object_storage
+from service.health.monitor import LoopLagMonitor, get_loop_lag_monitor
+from service.metrics import TELEGRAM_CONNECTIONS
+from service.telegram.rpc import TelegramActivity, get_telegram_activity
+
+
+class ReadinessService:
+    """Report the load of the instance and whether it should take traffic.
+
+    The instance is not ready while any of the loop lag, pending flows,
+    open connections or telegram failures exceeds its threshold. Pending
+    flows are counted by the in-memory storage only, with redis they are
+    reported as null and not checked.
+    """
+
+    __slots__ = (
+        "_loop_lag_monitor",
+        "_telegram_activity",
+        "_max_loop_lag",
+        "_max_pending_flows",
+        "_max_connections",
+        "_max_telegram_failing",
+    )
+
+    def __init__(
+        self,
+        loop_lag_monitor: LoopLagMonitor,
+        telegram_activity: TelegramActivity,
+        max_loop_lag: float,
+        max_pending_flows: int,
+        max_connections: int,
+        max_telegram_failing: float,
+    ) -> None:
+        self._loop_lag_monitor = loop_lag_monitor
+        self._telegram_activity = telegram_activity
+        self._max_loop_lag = max_loop_lag
+        self._max_pending_flows = max_pending_flows
+        self._max_connections = max_connections
+        self._max_telegram_failing = max_telegram_failing
+
+    async def check(self) -> tuple[bool, dict[str, Any]]:
+        now = time.monotonic()
+        loop_lag = self._loop_lag_monitor.percentiles()
+        object_storage = get_object_storage()
+        pending_flows = (
+            sum(object_storage.count_by_step().values())
+            if isinstance(object_storage, ObjectStorage)
+            else None
+        )
+        connections = int(TELEGRAM_CONNECTIONS.value)
+        telegram_failing = self._telegram_activity.failing_for(now)
+
+        failures = [
+            name
+            for name, exceeded in (
+                ("loop_lag", loop_lag["p99"] > self._max_loop_lag),
+                (
+                    "pending_flows",
+                    pending_flows is not None and pending_flows > self._max_pending_flows,
+                ),
+                ("telegram_connections", connections > self._max_connections),
+                ("telegram", telegram_failing > self._max_telegram_failing),
+            )
+            if exceeded
+        ]
+        return not failures, {
+            "status": "unavailable" if failures else "ok",
+            "failures": failures,
+            "loop_lag": loop_lag,
+            "pending_flows": pending_flows,
+            "telegram_connections": connections,
+            "last_rpc_success_age": self._telegram_activity.last_success_age(now),
+            "telegram_failing_for": telegram_failing,
+        }
+
+
+@lru_cache
+def get_readiness_service() -> ReadinessService:
+    return ReadinessService(
+        loop_lag_monitor=get_loop_lag_monitor(),
+        telegram_activity=get_telegram_activity(),
+        max_loop_lag=settings.health.max_loop_lag,
+        max_pending_flows=settings.health.max_pending_flows,
+        max_connections=settings.health.max_connections,
+        max_telegram_failing=settings.health.max_telegram_failing,
+    )
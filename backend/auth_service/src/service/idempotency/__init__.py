@@ -0,0 +1,4 @@
+from .cache import IdempotencyCache, get_idempotency_cache
+
+
+__all__ = ("IdempotencyCache", "get_idempotency_cache")
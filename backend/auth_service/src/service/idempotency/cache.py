@@ -0,0 +1,138 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, TypeVar
+import asyncio
+import hashlib
+import logging
+import time
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+
+from core.settings import settings
+
+
+T = TypeVar("T")
+
+
+class IdempotencyEntry:
+    __slots__ = ("fingerprint", "task", "expires_at")
+
+    def __init__(self, fingerprint: bytes, task: asyncio.Task) -> None:
+        self.fingerprint = fingerprint
+        self.task = task
+        self.expires_at: float | None = None
+
+
+class IdempotencyCache:
+    """Replay responses of requests retried with the same `Idempotency-Key`.
+
+    Keys are scoped by the route and the caller, so a client cannot replay
+    the response of another one by guessing its key. A duplicate of an
+    in-flight request waits for the original one. Results
+    and final client errors are kept for `ttl` seconds, rate limits and
+    server errors are not, so their retries run again. The work runs as a
+    separate task and completes even if the original caller goes away.
+    """
+
+    RETRYABLE_STATUSES = (status.HTTP_429_TOO_MANY_REQUESTS,)
+
+    __slots__ = ("_entries", "_max_size", "_ttl")
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self._entries: OrderedDict[str, IdempotencyEntry] = OrderedDict()
+        self._max_size = max_size
+        self._ttl = ttl
+
+    @staticmethod
+    def _fingerprint(request: BaseModel) -> bytes:
+        return hashlib.sha256(request.model_dump_json().encode()).digest()
+
+    def _is_final(self, task: asyncio.Task) -> bool:
+        if task.cancelled():
+            return False
+        exception = task.exception()
+        if exception is None:
+            return True
+        return (
+            isinstance(exception, HTTPException)
+            and exception.status_code < status.HTTP_500_INTERNAL_SERVER_ERROR
+            and exception.status_code not in self.RETRYABLE_STATUSES
+        )
+
+    def _complete(self, key: str, entry: IdempotencyEntry) -> None:
+        if self._entries.get(key) is not entry:
+            return
+        if self._is_final(entry.task):
+            entry.expires_at = time.monotonic() + self._ttl
+        else:
+            del self._entries[key]
+
+    def _lookup(self, key: str) -> IdempotencyEntry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at is not None and entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        if entry.task.done() and not self._is_final(entry.task):
+            # Its done callback dropping the entry has not run yet.
+            del self._entries[key]
+            return None
+        return entry
+
+    def _add(self, key: str, entry: IdempotencyEntry) -> None:
+        self._entries[key] = entry
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    async def _replay(entry: IdempotencyEntry) -> Any:
+        if not entry.task.done():
+            return await asyncio.shield(entry.task)
+        exception = entry.task.exception()
+        if exception is not None:
+            raise HTTPException(
+                status_code=exception.status_code,
+                detail=exception.detail,
+                headers=exception.headers,
+            )
+        return entry.task.result()
+
+    async def run(
+        self,
+        scope: str,
+        caller: str,
+        key: str | None,
+        request: BaseModel,
+        func: Callable[[], Awaitable[T]],
+    ) -> T:
+        """Run `func` once per `scope`, `caller` and `key`, replaying its outcome to retries."""
+        if key is None:
+            return await func()
+
+        cache_key = f"{scope}:{caller}:{key}"
+        fingerprint = self._fingerprint(request)
+        entry = self._lookup(cache_key)
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Idempotency-Key is reused with another request.",
+                )
+            logging.info("Replay idempotent request. Key: %s", cache_key)
+            return await self._replay(entry)
+
+        entry = IdempotencyEntry(
+            fingerprint=fingerprint, task=asyncio.ensure_future(func())
+        )
+        self._add(cache_key, entry)
+        entry.task.add_done_callback(lambda _: self._complete(cache_key, entry))
+        return await asyncio.shield(entry.task)
+
+
+@lru_cache
+def get_idempotency_cache() -> IdempotencyCache:
+    return IdempotencyCache(
+        max_size=settings.idempotency.max_size, ttl=settings.idempotency.ttl
+    )
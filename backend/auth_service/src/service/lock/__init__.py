@@ -0,0 +1,5 @@
+from .keyed import KeyedLock, get_keyed_lock
+from .single_flight import SingleFlight, get_single_flight
+
+
+__all__ = ("KeyedLock", "get_keyed_lock", "SingleFlight", "get_single_flight")
@@ -0,0 +1,44 @@
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator
+import asyncio
+
+
+class _KeyedLockEntry:
+    __slots__ = ("lock", "users")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class KeyedLock:
+    """Serialize coroutines by key. Idle keys hold no memory."""
+
+    __slots__ = ("_entries",)
+
+    def __init__(self) -> None:
+        self._entries: dict[str, _KeyedLockEntry] = {}
+
+    def locked(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry.lock.locked()
+
+    @asynccontextmanager
+    async def acquire(self, key: str) -> AsyncIterator[None]:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _KeyedLockEntry()
+        entry.users += 1
+        try:
+            async with entry.lock:
+                yield
+        finally:
+            entry.users -= 1
+            if not entry.users:
+                del self._entries[key]
+
+
+@lru_cache
+def get_keyed_lock() -> KeyedLock:
+    return KeyedLock()
@@ -0,0 +1,43 @@
+from functools import lru_cache
+from typing import Awaitable, Callable, TypeVar
+import asyncio
+import logging
+
+from core.logger import redact
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Share one in-progress call between concurrent callers with the same key.
+
+    The call runs as a separate task, so a cancelled caller does not cancel
+    the work the other callers are waiting for.
+    """
+
+    __slots__ = ("_calls",)
+
+    def __init__(self) -> None:
+        self._calls: dict[str, asyncio.Task] = {}
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key=key, task=done))
+        else:
+            logging.info("Join in-progress call. Key: %s", redact(key))
+        return await asyncio.shield(task)
+
+
+@lru_cache
+def get_single_flight() -> SingleFlight:
+    return SingleFlight()
@@ -0,0 +1,28 @@
+from .registry import Counter, Gauge, Histogram, Registry
+from .metrics import (
+    registry,
+    AUTH_REQUEST_LATENCY,
+    TELEGRAM_CALL_LATENCY,
+    AUTH_OUTCOMES,
+    PENDING_FLOWS_BY_STEP,
+    TELEGRAM_CONNECTIONS,
+    SESSION_FILES,
+    EVENT_LOOP_LAG,
+)
+from . import collector
+
+
+__all__ = (
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Registry",
+    "registry",
+    "AUTH_REQUEST_LATENCY",
+    "TELEGRAM_CALL_LATENCY",
+    "AUTH_OUTCOMES",
+    "PENDING_FLOWS_BY_STEP",
+    "TELEGRAM_CONNECTIONS",
+    "SESSION_FILES",
+    "EVENT_LOOP_LAG",
+)
@@ -0,0 +1,32 @@
+import os
+
+from core.executor import run_blocking
+from core.settings import settings
+from db.object.storage import ObjectStorage, get_object_storage
+from service.metrics.metrics import PENDING_FLOWS_BY_STEP, SESSION_FILES, registry
+
+
+async def collect_pending_flows() -> None:
+    """Count auth flows by step. Only the in-memory storage counts its flows."""
+    object_storage = get_object_storage()
+    if not isinstance(object_storage, ObjectStorage):
+        return
+    counts = object_storage.count_by_step()
+    for step, gauge in PENDING_FLOWS_BY_STEP.items():
+        gauge.set(counts.get(step, 0))
+
+
+def _count_session_files() -> int:
+    try:
+        with os.scandir(settings.path.session_dir) as entries:
+            return sum(1 for entry in entries if entry.is_file())
+    except FileNotFoundError:
+        return 0
+
+
+async def collect_session_files() -> None:
+    SESSION_FILES.set(await run_blocking(_count_session_files))
+
+
+registry.add_collector(collect_pending_flows)
+registry.add_collector(collect_session_files)
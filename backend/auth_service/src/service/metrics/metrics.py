@@ -0,0 +1,88 @@
+from service.metrics.registry import Counter, Gauge, Histogram, Registry
+
+
+registry = Registry()
+
+
+AUTH_REQUEST_SECONDS = registry.register(
+    Histogram(
+        name="auth_request_duration_seconds",
+        help="Auth endpoints latency, whole stream for streaming endpoints.",
+        labelnames=("endpoint",),
+    )
+)
+AUTH_REQUEST_LATENCY = {
+    endpoint: AUTH_REQUEST_SECONDS.labels(endpoint)
+    for endpoint in (
+        "send_code",
+        "send_code_async",
+        "send_code_events",
+        "send_code_batch",
+        "validate_code",
+        "validate_password",
+    )
+}
+
+TELEGRAM_CALL_SECONDS = registry.register(
+    Histogram(
+        name="telegram_call_duration_seconds",
+        help="Telegram operations latency, rate limiter queueing excluded.",
+        labelnames=("operation",),
+    )
+)
+TELEGRAM_CALL_LATENCY = {
+    operation: TELEGRAM_CALL_SECONDS.labels(operation)
+    for operation in (
+        "connect",
+        "send_code_request",
+        "sign_in",
+        "is_user_authorized",
+        "other",
+    )
+}
+
+AUTH_OUTCOMES_TOTAL = registry.register(
+    Counter(
+        name="auth_outcomes_total",
+        help="Notable outcomes of auth flows.",
+        labelnames=("outcome",),
+    )
+)
+AUTH_OUTCOMES = {
+    outcome: AUTH_OUTCOMES_TOTAL.labels(outcome)
+    for outcome in (
+        "AlreadyLoggedIn",
+        "CodeExpired",
+        "PasswordExpired",
+        "SessionPasswordNeeded",
+        "FloodWait",
+        "TelegramUnavailable",
+    )
+}
+
+PENDING_FLOWS = registry.register(
+    Gauge(
+        name="auth_pending_flows",
+        help="Auth flows waiting for the user, by step.",
+        labelnames=("step",),
+    )
+)
+PENDING_FLOWS_BY_STEP = {
+    step: PENDING_FLOWS.labels(step) for step in ("validate_code", "validate_password")
+}
+
+TELEGRAM_CONNECTIONS = registry.register(
+    Gauge(name="telegram_open_connections", help="Connected telegram clients.")
+).labels()
+
+SESSION_FILES = registry.register(
+    Gauge(name="telegram_session_files", help="Files in the session directory.")
+).labels()
+
+EVENT_LOOP_LAG = registry.register(
+    Histogram(
+        name="event_loop_lag_seconds",
+        help="Delay of event loop wakeups past their schedule.",
+        buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+    )
+).labels()
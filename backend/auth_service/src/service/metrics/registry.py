@@ -0,0 +1,172 @@
+from bisect import bisect_left
+from typing import Awaitable, Callable
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}"
+
+
+class CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class GaugeChild(CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class HistogramChild:
+    __slots__ = ("_bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self._bounds = bounds
+        # The last slot counts values above the highest bound.
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self._bounds, value)] += 1
+        self.sum += value
+
+
+class Metric:
+    """Metric family with label sets allocated once, ahead of the hot path.
+
+    `labels` is meant to be called at import time, the returned child is
+    updated with plain attribute arithmetic.
+    """
+
+    TYPE = ""
+
+    __slots__ = ("name", "help", "labelnames", "_children")
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._children: dict[tuple[str, ...], object] = {}
+
+    def _create_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._create_child()
+        return child
+
+    def _render_samples(self, lines: list[str]) -> None:
+        for values, child in self._children.items():
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, values)} {child.value}"
+            )
+
+    def render(self, lines: list[str]) -> None:
+        help = self.help.replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {self.name} {help}")
+        lines.append(f"# TYPE {self.name} {self.TYPE}")
+        self._render_samples(lines)
+
+
+class Counter(Metric):
+    TYPE = "counter"
+
+    __slots__ = ()
+
+    def _create_child(self) -> CounterChild:
+        return CounterChild()
+
+
+class Gauge(Metric):
+    TYPE = "gauge"
+
+    __slots__ = ()
+
+    def _create_child(self) -> GaugeChild:
+        return GaugeChild()
+
+
+class Histogram(Metric):
+    TYPE = "histogram"
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    __slots__ = ("buckets",)
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name=name, help=help, labelnames=labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _create_child(self) -> HistogramChild:
+        return HistogramChild(bounds=self.buckets)
+
+    def _render_samples(self, lines: list[str]) -> None:
+        bucket_labelnames = self.labelnames + ("le",)
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(bounds, child.counts):
+                cumulative += count
+                labels = _format_labels(bucket_labelnames, values + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {child.sum}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+
+
+class Registry:
+    """Metrics rendered in the Prometheus text exposition format.
+
+    Collectors refresh gauges which are cheaper to compute at scrape time
+    than to keep up to date on every change.
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    __slots__ = ("_metrics", "_collectors")
+
+    def __init__(self) -> None:
+        self._metrics: list[Metric] = []
+        self._collectors: list[Callable[[], Awaitable[None]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Awaitable[None]]) -> None:
+        self._collectors.append(collector)
+
+    async def render(self) -> str:
+        for collector in self._collectors:
+            await collector()
+        lines: list[str] = []
+        for metric in self._metrics:
+            metric.render(lines)
+        lines.append("")
+        return "\n".join(lines)
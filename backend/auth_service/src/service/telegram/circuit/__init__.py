@@ -0,0 +1,5 @@
+from .breaker import CircuitBreaker
+from .guard import ConnectivityGuard, get_connectivity_guard
+
+
+__all__ = ("CircuitBreaker", "ConnectivityGuard", "get_connectivity_guard")
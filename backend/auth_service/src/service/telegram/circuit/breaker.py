@@ -0,0 +1,75 @@
+import random
+import time
+
+
+class CircuitBreaker:
+    """Track consecutive connection failures of one telegram endpoint.
+
+    The circuit opens after `failure_threshold` failures in a row. Once the
+    backoff is over one probe is let through (half open): a success closes
+    the circuit, a failure opens it again with a doubled, jittered backoff.
+    """
+
+    __slots__ = (
+        "_failure_threshold",
+        "_base_backoff",
+        "_max_backoff",
+        "_failures",
+        "_opened",
+        "_retry_at",
+        "_probing",
+    )
+
+    def __init__(
+        self, failure_threshold: int, base_backoff: float, max_backoff: float
+    ) -> None:
+        self._failure_threshold = failure_threshold
+        self._base_backoff = base_backoff
+        self._max_backoff = max_backoff
+
+        self._failures = 0
+        self._opened = 0
+        self._retry_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if not self._opened:
+            return "closed"
+        if time.monotonic() < self._retry_at:
+            return "open"
+        return "half_open"
+
+    def retry_after(self) -> float:
+        """Seconds to wait before a call may go through, 0 when it may go now."""
+        if not self._opened:
+            return 0.0
+        now = time.monotonic()
+        if now < self._retry_at:
+            return self._retry_at - now
+        return self._base_backoff if self._probing else 0.0
+
+    def begin(self) -> None:
+        """Mark a call let through, the only one while the circuit is half open."""
+        if self._opened:
+            self._probing = True
+
+    def release(self) -> None:
+        """End a call that proved nothing, e.g. cancelled, without an outcome."""
+        self._probing = False
+
+    def success(self) -> None:
+        self._failures = 0
+        self._opened = 0
+        self._probing = False
+
+    def failure(self) -> None:
+        self._failures += 1
+        if self._opened and not self._probing:
+            # A call started before the circuit opened, keep current backoff.
+            return
+        self._probing = False
+        if self._opened or self._failures >= self._failure_threshold:
+            backoff = min(self._max_backoff, self._base_backoff * 2**self._opened)
+            self._retry_at = time.monotonic() + random.uniform(backoff / 2, backoff)
+            self._opened += 1
@@ -0,0 +1,150 @@
+from functools import lru_cache
+import asyncio
+import logging
+import math
+import time
+
+from telethon import TelegramClient
+from telethon.client.telegrambaseclient import DEFAULT_DC_ID
+
+from core.settings import settings
+from exception.telegram import TelegramUnavailable
+from service.metrics import AUTH_OUTCOMES, TELEGRAM_CALL_LATENCY, TELEGRAM_CONNECTIONS
+from service.trace import traced
+from service.telegram.circuit.breaker import CircuitBreaker
+from service.telegram.proxy import ProxyEndpoint, ProxyPool, get_proxy_pool
+from service.telegram.rpc import TelegramActivity, get_telegram_activity
+
+
+class ConnectivityGuard:
+    """Connect telegram clients through circuit breakers of their DC and proxy.
+
+    While a circuit is open connections fail fast with `TelegramUnavailable`
+    instead of waiting for the telethon timeout. Outcomes of connections
+    through a pooled proxy are reported to the proxy pool.
+    """
+
+    __slots__ = (
+        "_failure_threshold",
+        "_base_backoff",
+        "_max_backoff",
+        "_connect_timeout",
+        "_proxy_pool",
+        "_activity",
+        "_breakers",
+    )
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        base_backoff: float,
+        max_backoff: float,
+        connect_timeout: float,
+        proxy_pool: ProxyPool,
+        activity: TelegramActivity,
+    ) -> None:
+        self._failure_threshold = failure_threshold
+        self._base_backoff = base_backoff
+        self._max_backoff = max_backoff
+        self._connect_timeout = connect_timeout
+        self._proxy_pool = proxy_pool
+        self._activity = activity
+
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def _breaker(self, key: str) -> CircuitBreaker:
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(
+                failure_threshold=self._failure_threshold,
+                base_backoff=self._base_backoff,
+                max_backoff=self._max_backoff,
+            )
+        return breaker
+
+    def _proxy_of(self, client: TelegramClient) -> ProxyEndpoint | None:
+        # Telethon keeps the proxy a client was created with privately.
+        return self._proxy_pool.find(getattr(client, "_proxy", None))
+
+    @staticmethod
+    def _keys(client: TelegramClient, proxy: ProxyEndpoint | None) -> list[str]:
+        keys = [f"dc:{client.session.dc_id or DEFAULT_DC_ID}"]
+        if proxy is not None:
+            keys.append(f"proxy:{proxy.key}")
+        return keys
+
+    @staticmethod
+    def _track(client: TelegramClient) -> None:
+        """Count the client as an open connection until it disconnects."""
+        TELEGRAM_CONNECTIONS.inc()
+        client.disconnected.add_done_callback(lambda _: TELEGRAM_CONNECTIONS.dec())
+
+    def stats(self) -> dict[str, str]:
+        return {key: breaker.state for key, breaker in self._breakers.items()}
+
+    @traced("telegram.connect")
+    async def connect(self, client: TelegramClient) -> None:
+        if client.is_connected():
+            return
+        proxy = self._proxy_of(client=client)
+        keys = self._keys(client=client, proxy=proxy)
+        breakers = [self._breaker(key) for key in keys]
+        retry_after = max(breaker.retry_after() for breaker in breakers)
+        if retry_after > 0:
+            AUTH_OUTCOMES["TelegramUnavailable"].inc()
+            raise TelegramUnavailable(
+                f"Telegram is unreachable through {', '.join(keys)}.",
+                seconds=math.ceil(retry_after),
+            )
+        for breaker in breakers:
+            breaker.begin()
+
+        started_at = time.monotonic()
+        try:
+            logging.info("Connect to telegram servers...")
+            await asyncio.wait_for(client.connect(), timeout=self._connect_timeout)
+        except OSError as exception:
+            TELEGRAM_CALL_LATENCY["connect"].observe(time.monotonic() - started_at)
+            if proxy is not None:
+                self._proxy_pool.failure(endpoint=proxy)
+            logging.warning(
+                "Fail to connect to telegram servers through %s. Error: %s",
+                ", ".join(keys),
+                str(exception),
+            )
+            for breaker in breakers:
+                breaker.failure()
+            self._activity.failure()
+            await client.disconnect()
+            AUTH_OUTCOMES["TelegramUnavailable"].inc()
+            raise TelegramUnavailable(
+                f"Fail to connect to telegram through {', '.join(keys)}.",
+                seconds=math.ceil(max(breaker.retry_after() for breaker in breakers))
+                or 1,
+            ) from exception
+        except BaseException:
+            # Cancelled or failed unexpectedly, let the next call probe again.
+            for breaker in breakers:
+                breaker.release()
+            raise
+        latency = time.monotonic() - started_at
+        TELEGRAM_CALL_LATENCY["connect"].observe(latency)
+        self._track(client=client)
+        self._activity.success()
+        for breaker in breakers:
+            breaker.success()
+        if proxy is not None:
+            self._proxy_pool.success(endpoint=proxy, latency=latency)
+            self._proxy_pool.track(client=client, endpoint=proxy)
+
+
+@lru_cache
+def get_connectivity_guard() -> ConnectivityGuard:
+    return ConnectivityGuard(
+        failure_threshold=settings.circuit.failure_threshold,
+        base_backoff=settings.circuit.base_backoff,
+        max_backoff=settings.circuit.max_backoff,
+        connect_timeout=settings.circuit.connect_timeout,
+        proxy_pool=get_proxy_pool(),
+        activity=get_telegram_activity(),
+    )
@@ -1,4 +1,10 @@
 from .create.context import ClientCreateContext, get_client_create_context
+from .serializer import ClientRecordSerializer, get_client_record_serializer
 
 
-__all__ = ("ClientCreateContext", "get_client_create_context")
+__all__ = (
+    "ClientCreateContext",
+    "get_client_create_context",
+    "ClientRecordSerializer",
+    "get_client_record_serializer",
+)
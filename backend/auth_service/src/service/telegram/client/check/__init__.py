@@ -1,4 +1,10 @@
 from .handler import ClientCheckHandler, get_client_check_handler
+from .index import AuthorizedIndex, get_authorized_index
 
 
-__all__ = ("ClientCheckHandler", "get_client_check_handler")
+__all__ = (
+    "ClientCheckHandler",
+    "get_client_check_handler",
+    "AuthorizedIndex",
+    "get_authorized_index",
+)
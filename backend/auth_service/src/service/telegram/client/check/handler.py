@@ -3,8 +3,16 @@ import logging
 import os
 
 from telethon import TelegramClient
+from telethon.sessions import Session, SQLiteSession
 
+from core.executor import run_blocking
+from core.logger import redact
 from core.settings import settings
+from exception.telegram import FloodWait
+from service.telegram.circuit import get_connectivity_guard
+from service.telegram.rpc import get_rpc_limiter
+from service.telegram.session import SharedSession, get_shared_session_store
+from service.trace import traced
 
 
 class ClientCheckHandler:
@@ -16,35 +24,78 @@ class ClientCheckHandler:
         await client.disconnect()
 
     @staticmethod
-    def remove_session_file(phone_number):
+    async def remove_session_file(phone_number):
+        if settings.session.backend == "shared":
+            get_shared_session_store().delete(phone_number=phone_number)
+            logging.info("Deleted shared session: %s", redact(phone_number))
+            return
         path = os.path.join(settings.path.session_dir, f"{phone_number}.session")
         try:
-            os.remove(path)
-            logging.info(f"Deleted: {path}")
+            await run_blocking(os.remove, path)
+            logging.info("Deleted session file of phone: %s", redact(phone_number))
         except OSError as exception:
-            logging.warning("Error deleting %s. Error: %s", path, str(exception))
+            logging.warning(
+                "Error deleting session file of phone %s. Error: %s",
+                redact(phone_number),
+                exception.strerror,
+            )
 
     @staticmethod
-    def check_file_existence(phone_number: str) -> bool:
-        logging.info("Check the %s account session file", phone_number)
+    def _write_session_file(phone_number: str, session: Session) -> None:
+        if settings.session.backend == "shared":
+            shared_session = SharedSession(
+                store=get_shared_session_store(), phone_number=phone_number
+            )
+            shared_session.set_dc(session.dc_id, session.server_address, session.port)
+            shared_session.auth_key = session.auth_key
+            shared_session.save()
+            logging.info("Saved shared session: %s", redact(phone_number))
+            return
+        path = os.path.join(settings.path.session_dir, phone_number)
+        session_file = SQLiteSession(path)
+        try:
+            session_file.set_dc(session.dc_id, session.server_address, session.port)
+            session_file.auth_key = session.auth_key
+            session_file.save()
+            logging.info("Saved session file of phone: %s", redact(phone_number))
+        finally:
+            session_file.close()
+
+    @staticmethod
+    @traced("check.save_session_file")
+    async def save_session_file(phone_number: str, session: Session) -> None:
+        await run_blocking(
+            ClientCheckHandler._write_session_file, phone_number=phone_number, session=session
+        )
+
+    @staticmethod
+    @traced("check.file_existence")
+    async def check_file_existence(phone_number: str) -> bool:
+        logging.info("Check the %s account session file", redact(phone_number))
+        if settings.session.backend == "shared":
+            return await run_blocking(
+                get_shared_session_store().exists, phone_number=phone_number
+            )
         path = os.path.join(settings.path.session_dir, f"{phone_number}.session")
-        return os.path.exists(path=path)
+        return await run_blocking(os.path.exists, path)
 
     @staticmethod
-    async def check_connection(client: TelegramClient) -> bool:
+    @traced("check.connection")
+    async def check_connection(client: TelegramClient) -> None:
+        """Connect the client, raise `TelegramUnavailable` when telegram is unreachable."""
         logging.info("Check %s account connection status.", client.session)
-        try:
-            logging.info("Connect to telegram servers...")
-            await client.connect()
-            return True
-        except OSError:
-            logging.warning("Fail to connect to telegram servers.")
-            return False
+        await get_connectivity_guard().connect(client=client)
 
     @staticmethod
+    @traced("check.init_status")
     async def check_init_status(client: TelegramClient) -> bool:
         logging.info("Check %s account auth status.", client.session)
-        if await client.is_user_authorized():
+        try:
+            authorized = await get_rpc_limiter().call(client, client.is_user_authorized)
+        except FloodWait:
+            await client.disconnect()
+            raise
+        if authorized:
             logging.info("Account is authorized")
             await client.disconnect()
             return True
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Awaitable, Callable
+import asyncio
+import logging
+import time
+
+from core.settings import settings
+from core.logger import redact
+
+
+class AuthorizedIndex:
+    """Remember phone numbers whose sessions are known to be authorized.
+
+    An entry answers without network round trips for `max_staleness`
+    seconds and is re-checked in the background once older than
+    `refresh_after` seconds.
+    """
+
+    __slots__ = (
+        "_checked_at",
+        "_refresh_after",
+        "_max_staleness",
+        "_max_size",
+        "_refreshing",
+    )
+
+    def __init__(
+        self, refresh_after: float, max_staleness: float, max_size: int
+    ) -> None:
+        self._checked_at: OrderedDict[str, float] = OrderedDict()
+        self._refresh_after = refresh_after
+        self._max_staleness = max_staleness
+        self._max_size = max_size
+        self._refreshing: dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._checked_at)
+
+    def mark(self, phone_number: str) -> None:
+        self._checked_at[phone_number] = time.monotonic()
+        self._checked_at.move_to_end(phone_number)
+        while len(self._checked_at) > self._max_size:
+            self._checked_at.popitem(last=False)
+
+    def discard(self, phone_number: str) -> None:
+        self._checked_at.pop(phone_number, None)
+
+    def is_authorized(
+        self, phone_number: str, check: Callable[[str], Awaitable[bool]]
+    ) -> bool:
+        """Answer from memory and schedule `check` when the entry gets old."""
+        checked_at = self._checked_at.get(phone_number)
+        if checked_at is None:
+            return False
+
+        age = time.monotonic() - checked_at
+        if age > self._max_staleness:
+            self.discard(phone_number=phone_number)
+            return False
+        if age > self._refresh_after and phone_number not in self._refreshing:
+            self._refreshing[phone_number] = asyncio.create_task(
+                self._refresh(phone_number=phone_number, check=check)
+            )
+        return True
+
+    async def _refresh(
+        self, phone_number: str, check: Callable[[str], Awaitable[bool]]
+    ) -> None:
+        try:
+            if await check(phone_number):
+                self.mark(phone_number=phone_number)
+            else:
+                logging.info("Session is not authorized anymore: %s", redact(phone_number))
+                self.discard(phone_number=phone_number)
+        except Exception as exception:
+            logging.warning(
+                "Fail to refresh authorization status of phone %s. Error: %s",
+                redact(phone_number),
+                str(exception),
+            )
+        finally:
+            self._refreshing.pop(phone_number, None)
+
+
+@lru_cache
+def get_authorized_index() -> AuthorizedIndex:
+    return AuthorizedIndex(
+        refresh_after=settings.auth_index.refresh_after,
+        max_staleness=settings.auth_index.max_staleness,
+        max_size=settings.auth_index.max_size,
+    )
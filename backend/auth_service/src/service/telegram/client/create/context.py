@@ -3,59 +3,190 @@ import logging
 
 from telethon import TelegramClient
 
-from core.settings import settings
+from core.settings import TelegramCredential, settings
+from core.logger import redact
 from exception.telegram import AlreadyLoggedIn
+from service.metrics import AUTH_OUTCOMES
+from service.trace import traced
 from service.telegram.client.create.repository import ClientRepository, get_client_repository
-from service.telegram.client.check import ClientCheckHandler, get_client_check_handler
+from service.telegram.client.check import (
+    ClientCheckHandler,
+    get_client_check_handler,
+    AuthorizedIndex,
+    get_authorized_index,
+)
+from service.telegram.client.pool import ClientPool, get_client_pool
+from service.telegram.credential import CredentialPool, get_credential_pool
+from service.telegram.proxy import ProxyPool, get_proxy_pool
+from service.telegram.dc import DCPrediction, DCPredictor, get_dc_predictor
+from service.telegram.session import SharedSession, ThreadedSQLiteSession
 
 
 class ClientCreateContext:
-    __slots__ = ("_client_repo", "_client_check_handler")
+    __slots__ = (
+        "_client_repo",
+        "_client_check_handler",
+        "_client_pool",
+        "_dc_predictor",
+        "_authorized_index",
+        "_credential_pool",
+        "_proxy_pool",
+    )
 
     def __init__(
-        self, client_repo: ClientRepository, client_check_handler: ClientCheckHandler
+        self,
+        client_repo: ClientRepository,
+        client_check_handler: ClientCheckHandler,
+        client_pool: ClientPool,
+        dc_predictor: DCPredictor,
+        authorized_index: AuthorizedIndex,
+        credential_pool: CredentialPool,
+        proxy_pool: ProxyPool,
     ) -> None:
         self._client_repo = client_repo
         self._client_check_handler = client_check_handler
+        self._client_pool = client_pool
+        self._dc_predictor = dc_predictor
+        self._authorized_index = authorized_index
+        self._credential_pool = credential_pool
+        self._proxy_pool = proxy_pool
 
-    def _create_client_instance(self, phone_number: str):
+    async def _create_client_instance(
+        self, phone_number: str, credential: TelegramCredential
+    ) -> TelegramClient:
+        if settings.session.backend == "shared":
+            repo = self._client_repo.shared
+        else:
+            repo = self._client_repo.sqlite
         if settings.telegram.use_proxy:
             logging.info("Create telegram client with proxy.")
-            return self._client_repo.sqlite.proxy(phone_number=phone_number)
+            return await repo.proxy(
+                credential=credential,
+                proxy=self._proxy_pool.select().as_telethon(),
+                phone_number=phone_number,
+            )
         logging.info("Create simple telegram client.")
-        return self._client_repo.sqlite.simple(phone_number=phone_number)
+        return await repo.simple(credential=credential, phone_number=phone_number)
 
-    async def create(self, phone_number: str) -> TelegramClient:
-        client = self._create_client_instance(phone_number=phone_number)
-        check_dir_result = self._client_check_handler.check_file_existence(
-            phone_number=phone_number
-        )
-        if check_dir_result:
-            check_connection_result = await self._client_check_handler.check_connection(
-                client=client
+    def restore(self, session: str, api_id: int | None) -> TelegramClient:
+        """Rebuild telegram client from exported string session."""
+        credential = self._credential_pool.get(api_id=api_id)
+        if settings.telegram.use_proxy:
+            logging.info("Restore telegram client with proxy.")
+            return self._client_repo.string.proxy(
+                credential=credential,
+                proxy=self._proxy_pool.select().as_telethon(),
+                session=session,
             )
-            if check_connection_result:
-                check_init_result = await self._client_check_handler.check_init_status(
-                    client=client
-                )
-                if check_init_result:
-                    raise AlreadyLoggedIn(
-                    f"Account with phone number: {phone_number} already logged in."
+        logging.info("Restore simple telegram client.")
+        return self._client_repo.string.simple(credential=credential, session=session)
+
+    def predict_dc(self, phone_number: str) -> DCPrediction | None:
+        if not settings.dc_prediction.enabled:
+            return None
+        return self._dc_predictor.predict(phone_number=phone_number)
+
+    async def _create_new_client(self, phone_number: str) -> TelegramClient:
+        prediction = self.predict_dc(phone_number=phone_number)
+        if settings.pool.enabled and (
+            prediction is None or prediction.dc_id == self._client_pool.dc_id
+        ):
+            client = await self._client_pool.acquire()
+            if client is not None:
+                logging.info(
+                    "Use pre-warmed telegram client for phone: %s", redact(phone_number)
                 )
-                await self._client_check_handler.disconnect_from_telegram_server(client=client)
+                self._credential_pool.acquire(api_id=client.api_id)
                 return client
 
-            self._client_check_handler.remove_session_file(
-                phone_number=phone_number
-            )
+        client = await self._create_client_instance(
+            phone_number=phone_number, credential=self._credential_pool.acquire()
+        )
+        if prediction is not None:
+            logging.info("Start telegram client on predicted DC %s", prediction.dc_id)
+            client.session.set_dc(prediction.dc_id, prediction.server_address, prediction.port)
         return client
 
+    def release(self, client: TelegramClient) -> None:
+        """Give back the credential of a client whose auth flow did not start."""
+        self._credential_pool.release(api_id=client.api_id)
+
+    @traced("client.persist")
+    async def persist(self, client: TelegramClient, phone_number: str) -> None:
+        """Save session of a client which is not backed by its own session file."""
+        if isinstance(client.session, (ThreadedSQLiteSession, SharedSession)):
+            return
+        await self._client_check_handler.save_session_file(
+            phone_number=phone_number, session=client.session
+        )
+
+    async def _check_stored_client(self, client: TelegramClient) -> bool:
+        """Connect a client of a stored session and ask telegram whether it is authorized.
+
+        A failed check disconnects the client, which closes its session.
+        """
+        try:
+            await self._client_check_handler.check_connection(client=client)
+            return await self._client_check_handler.check_init_status(client=client)
+        except BaseException:
+            await self._client_check_handler.disconnect_from_telegram_server(client=client)
+            raise
+
+    async def check_authorized(self, phone_number: str) -> bool:
+        """Connect with the stored session and ask telegram for its status."""
+        if not await self._client_check_handler.check_file_existence(
+            phone_number=phone_number
+        ):
+            return False
+        client = await self._create_client_instance(
+            phone_number=phone_number, credential=self._credential_pool.pick()
+        )
+        if await self._check_stored_client(client=client):
+            return True
+        await self._client_check_handler.disconnect_from_telegram_server(client=client)
+        return False
+
+    @traced("client.create")
+    async def create(self, phone_number: str) -> TelegramClient:
+        if settings.auth_index.enabled and self._authorized_index.is_authorized(
+            phone_number=phone_number, check=self.check_authorized
+        ):
+            AUTH_OUTCOMES["AlreadyLoggedIn"].inc()
+            raise AlreadyLoggedIn("Account is already logged in.")
+
+        check_dir_result = await self._client_check_handler.check_file_existence(
+            phone_number=phone_number
+        )
+        if check_dir_result:
+            client = await self._create_client_instance(
+                phone_number=phone_number, credential=self._credential_pool.pick()
+            )
+            if await self._check_stored_client(client=client):
+                self._authorized_index.mark(phone_number=phone_number)
+                AUTH_OUTCOMES["AlreadyLoggedIn"].inc()
+                raise AlreadyLoggedIn("Account is already logged in.")
+            await self._client_check_handler.disconnect_from_telegram_server(client=client)
+            self._credential_pool.acquire(api_id=client.api_id)
+            return client
+        return await self._create_new_client(phone_number=phone_number)
+
 
 @lru_cache
 def get_client_create_context(
     client_repo: ClientRepository = get_client_repository(),
     client_check_handler: ClientCheckHandler = get_client_check_handler(),
+    client_pool: ClientPool = get_client_pool(),
+    dc_predictor: DCPredictor = get_dc_predictor(),
+    authorized_index: AuthorizedIndex = get_authorized_index(),
+    credential_pool: CredentialPool = get_credential_pool(),
+    proxy_pool: ProxyPool = get_proxy_pool(),
 ) -> ClientCreateContext:
     return ClientCreateContext(
-        client_repo=client_repo, client_check_handler=client_check_handler
+        client_repo=client_repo,
+        client_check_handler=client_check_handler,
+        client_pool=client_pool,
+        dc_predictor=dc_predictor,
+        authorized_index=authorized_index,
+        credential_pool=credential_pool,
+        proxy_pool=proxy_pool,
     )
@@ -13,7 +13,11 @@ class Client:
         logging.info(
             "Try to create the telegram client with provider: %s", str(self._provider)
         )
-        return self._provider.create()
+        client = self._provider.create()
+        # Flood waits are handled by the rpc limiter instead of sleeping
+        # inside the request.
+        client.flood_sleep_threshold = 0
+        return client
 
     def __str__(self) -> str:
         return f"{self.__class__.__name__}(provider={self._provider})"
@@ -1,5 +1,6 @@
 from .string import SimpleStringClientProvider, ProxyStringClientProvider
 from .sqlite import SimpleSQLiteClientProvider, ProxySQLiteClientProvider
+from .shared import SimpleSharedClientProvider, ProxySharedClientProvider
 from .protocol import ProviderProtocol
 
 
@@ -9,4 +10,6 @@ __all__ = (
     "ProxyStringClientProvider",
     "SimpleSQLiteClientProvider",
     "ProxySQLiteClientProvider",
+    "SimpleSharedClientProvider",
+    "ProxySharedClientProvider",
 )
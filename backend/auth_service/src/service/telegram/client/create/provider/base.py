@@ -1,12 +1,12 @@
-from core.settings import settings
+from core.settings import TelegramCredential
 
 
 class BaseClientProvider:
     __slots__ = ("_api_id", "_api_hash")
 
-    def __init__(self) -> None:
-        self._api_id: int = settings.telegram.api_id
-        self._api_hash: str = settings.telegram.api_hash
+    def __init__(self, credential: TelegramCredential) -> None:
+        self._api_id: int = credential.api_id
+        self._api_hash: str = credential.api_hash
 
     def create(self):
         raise NotImplementedError
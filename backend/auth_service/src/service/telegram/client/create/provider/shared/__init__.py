@@ -0,0 +1,5 @@
+from .simple import SimpleSharedClientProvider
+from .proxy import ProxySharedClientProvider
+
+
+__all__ = ("SimpleSharedClientProvider", "ProxySharedClientProvider")
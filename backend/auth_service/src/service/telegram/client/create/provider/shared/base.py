@@ -0,0 +1,22 @@
+from core.settings import TelegramCredential
+from service.telegram.client.create.provider.base import BaseClientProvider
+from service.telegram.proxy import ProxyTuple
+from service.telegram.session import SharedSession
+
+
+class BaseSharedClientProvider(BaseClientProvider):
+    __slots__ = ("_api_id", "_api_hash", "phone_number", "session", "proxy")
+
+    def __init__(
+        self,
+        credential: TelegramCredential,
+        phone_number: str,
+        session: SharedSession,
+        proxy: ProxyTuple | None = None,
+    ) -> None:
+        self.phone_number = phone_number
+        self.session = session
+        self.proxy = proxy
+
+        self._api_id: int = credential.api_id
+        self._api_hash: str = credential.api_hash
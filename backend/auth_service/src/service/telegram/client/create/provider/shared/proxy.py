@@ -0,0 +1,13 @@
+from telethon import TelegramClient
+
+from service.telegram.client.create.provider.shared.base import BaseSharedClientProvider
+
+
+class ProxySharedClientProvider(BaseSharedClientProvider):
+    def create(self) -> TelegramClient:
+        return TelegramClient(
+            session=self.session,
+            api_id=self._api_id,
+            api_hash=self._api_hash,
+            proxy=self.proxy,
+        )
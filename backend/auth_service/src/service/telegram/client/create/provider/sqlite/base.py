@@ -1,18 +1,22 @@
-import os
-
-from core.settings import settings
+from core.settings import TelegramCredential
 from service.telegram.client.create.provider.base import BaseClientProvider
+from service.telegram.proxy import ProxyTuple
+from service.telegram.session import ThreadedSQLiteSession
 
 
 class BaseSQLiteClientProvider(BaseClientProvider):
-    __slots__ = ("_api_id", "_api_hash", "phone_number")
+    __slots__ = ("_api_id", "_api_hash", "phone_number", "session", "proxy")
 
-    def __init__(self, phone_number: str) -> None:
+    def __init__(
+        self,
+        credential: TelegramCredential,
+        phone_number: str,
+        session: ThreadedSQLiteSession,
+        proxy: ProxyTuple | None = None,
+    ) -> None:
         self.phone_number = phone_number
+        self.session = session
+        self.proxy = proxy
 
-        self._api_id: int = settings.telegram.api_id
-        self._api_hash: str = settings.telegram.api_hash
-
-    @staticmethod
-    def _create_path(file: str) -> str:
-        return os.path.join(settings.path.session_dir, file)
+        self._api_id: int = credential.api_id
+        self._api_hash: str = credential.api_hash
@@ -6,7 +6,7 @@ from service.telegram.client.create.provider.sqlite.base import BaseSQLiteClient
 class SimpleSQLiteClientProvider(BaseSQLiteClientProvider):
     def create(self) -> TelegramClient:
         return TelegramClient(
-            session=self._create_path(file=self.phone_number),
+            session=self.session,
             api_id=self._api_id,
             api_hash=self._api_hash,
         )
@@ -0,0 +1,19 @@
+from core.settings import TelegramCredential
+from service.telegram.client.create.provider.base import BaseClientProvider
+from service.telegram.proxy import ProxyTuple
+
+
+class BaseStringClientProvider(BaseClientProvider):
+    __slots__ = ("_api_id", "_api_hash", "session", "proxy")
+
+    def __init__(
+        self,
+        credential: TelegramCredential,
+        session: str | None = None,
+        proxy: ProxyTuple | None = None,
+    ) -> None:
+        self.session = session
+        self.proxy = proxy
+
+        self._api_id: int = credential.api_id
+        self._api_hash: str = credential.api_hash
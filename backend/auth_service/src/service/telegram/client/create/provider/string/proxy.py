@@ -1,15 +1,14 @@
 from telethon import TelegramClient
 from telethon.sessions import StringSession
 
-from core.settings import settings
-from service.telegram.client.create.provider.base import BaseClientProvider
+from service.telegram.client.create.provider.string.base import BaseStringClientProvider
 
 
-class ProxyStringClientProvider(BaseClientProvider):
+class ProxyStringClientProvider(BaseStringClientProvider):
     def create(self) -> TelegramClient:
         return TelegramClient(
-            session=StringSession(),
+            session=StringSession(self.session),
             api_id=self._api_id,
             api_hash=self._api_hash,
-            proxy=(settings.proxy.scheme, settings.proxy.hostname, settings.proxy.port),
+            proxy=self.proxy,
         )
@@ -1,11 +1,13 @@
 from telethon import TelegramClient
 from telethon.sessions import StringSession
 
-from service.telegram.client.create.provider.base import BaseClientProvider
+from service.telegram.client.create.provider.string.base import BaseStringClientProvider
 
 
-class SimpleStringClientProvider(BaseClientProvider):
+class SimpleStringClientProvider(BaseStringClientProvider):
     def create(self) -> TelegramClient:
         return TelegramClient(
-            session=StringSession(), api_id=self._api_id, api_hash=self._api_hash
+            session=StringSession(self.session),
+            api_id=self._api_id,
+            api_hash=self._api_hash,
         )
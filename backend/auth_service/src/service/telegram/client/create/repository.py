@@ -2,42 +2,100 @@ from functools import lru_cache
 
 from telethon import TelegramClient
 
+from core.settings import TelegramCredential
 from service.telegram.client.create.entity import Client
 from service.telegram.client.create.provider import (
     SimpleStringClientProvider,
     ProxyStringClientProvider,
     SimpleSQLiteClientProvider,
     ProxySQLiteClientProvider,
+    SimpleSharedClientProvider,
+    ProxySharedClientProvider,
 )
+from service.telegram.proxy import ProxyTuple
+from service.telegram.session import SharedSession, ThreadedSQLiteSession
 
 
 class ClientRepository:
-    __slots__ = ("string", "sqlite")
+    __slots__ = ("string", "sqlite", "shared")
 
     def __init__(self) -> None:
         self.string = self.String()
         self.sqlite = self.SQLite()
+        self.shared = self.Shared()
 
     class String:
         __slots__ = ()
 
-        def simple(self) -> TelegramClient:
-            return Client(provider=SimpleStringClientProvider()).create()
+        def simple(
+            self, credential: TelegramCredential, session: str | None = None
+        ) -> TelegramClient:
+            return Client(
+                provider=SimpleStringClientProvider(credential=credential, session=session)
+            ).create()
 
-        def proxy(self) -> TelegramClient:
-            return Client(provider=ProxyStringClientProvider()).create()
+        def proxy(
+            self,
+            credential: TelegramCredential,
+            proxy: ProxyTuple,
+            session: str | None = None,
+        ) -> TelegramClient:
+            return Client(
+                provider=ProxyStringClientProvider(
+                    credential=credential, session=session, proxy=proxy
+                )
+            ).create()
 
     class SQLite:
         __slots__ = ()
 
-        def simple(self, phone_number: str) -> TelegramClient:
+        async def simple(
+            self, credential: TelegramCredential, phone_number: str
+        ) -> TelegramClient:
+            session = await ThreadedSQLiteSession.open(phone_number=phone_number)
+            return Client(
+                provider=SimpleSQLiteClientProvider(
+                    credential=credential, phone_number=phone_number, session=session
+                )
+            ).create()
+
+        async def proxy(
+            self, credential: TelegramCredential, proxy: ProxyTuple, phone_number: str
+        ) -> TelegramClient:
+            session = await ThreadedSQLiteSession.open(phone_number=phone_number)
+            return Client(
+                provider=ProxySQLiteClientProvider(
+                    credential=credential,
+                    phone_number=phone_number,
+                    session=session,
+                    proxy=proxy,
+                )
+            ).create()
+
+    class Shared:
+        __slots__ = ()
+
+        async def simple(
+            self, credential: TelegramCredential, phone_number: str
+        ) -> TelegramClient:
+            session = await SharedSession.open(phone_number=phone_number)
             return Client(
-                provider=SimpleSQLiteClientProvider(phone_number=phone_number)
+                provider=SimpleSharedClientProvider(
+                    credential=credential, phone_number=phone_number, session=session
+                )
             ).create()
 
-        def proxy(self, phone_number: str) -> TelegramClient:
+        async def proxy(
+            self, credential: TelegramCredential, proxy: ProxyTuple, phone_number: str
+        ) -> TelegramClient:
+            session = await SharedSession.open(phone_number=phone_number)
             return Client(
-                provider=ProxySQLiteClientProvider(phone_number=phone_number)
+                provider=ProxySharedClientProvider(
+                    credential=credential,
+                    phone_number=phone_number,
+                    session=session,
+                    proxy=proxy,
+                )
             ).create()
 
 
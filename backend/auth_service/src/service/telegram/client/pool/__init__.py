@@ -0,0 +1,5 @@
+from .pool import ClientPool, get_client_pool
+from .lifespan import client_pool_lifespan
+
+
+__all__ = ("ClientPool", "get_client_pool", "client_pool_lifespan")
@@ -0,0 +1,25 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
+
+from core.settings import settings
+from service.telegram.client.pool.pool import get_client_pool
+
+
+@asynccontextmanager
+async def client_pool_lifespan() -> AsyncIterator[None]:
+    if not settings.pool.enabled:
+        yield
+        return
+
+    client_pool = get_client_pool()
+    pool_task = asyncio.create_task(
+        client_pool.run(refill_interval=settings.pool.refill_interval)
+    )
+    try:
+        yield
+    finally:
+        pool_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await pool_task
+        await client_pool.close()
@@ -0,0 +1,167 @@
+from collections import deque
+from functools import lru_cache
+import asyncio
+import logging
+import random
+import time
+
+from telethon import TelegramClient
+from telethon.client.telegrambaseclient import DEFAULT_DC_ID
+from telethon.tl.functions import PingRequest
+
+from core.settings import settings
+from exception.telegram import TelegramUnavailable
+from service.telegram.circuit import get_connectivity_guard
+from service.telegram.credential import CredentialPool, get_credential_pool
+from service.telegram.proxy import ProxyPool, get_proxy_pool
+from service.telegram.client.create.repository import (
+    ClientRepository,
+    get_client_repository,
+)
+
+
+class ClientPool:
+    """Keep telegram clients connected and holding auth keys ahead of time.
+
+    Clients are session-less until acquired, so any of them can be bound
+    to a phone number by the caller.
+    """
+
+    __slots__ = (
+        "_client_repo",
+        "_credential_pool",
+        "_proxy_pool",
+        "_size",
+        "_max_idle",
+        "_health_check_interval",
+        "_idle",
+        "_warming",
+    )
+
+    def __init__(
+        self,
+        client_repo: ClientRepository,
+        credential_pool: CredentialPool,
+        proxy_pool: ProxyPool,
+        size: int,
+        max_idle: float,
+        health_check_interval: float,
+    ) -> None:
+        self._client_repo = client_repo
+        self._credential_pool = credential_pool
+        self._proxy_pool = proxy_pool
+        self._size = size
+        self._max_idle = max_idle
+        self._health_check_interval = health_check_interval
+
+        self._idle: deque[tuple[float, TelegramClient]] = deque()
+        self._warming = 0
+
+    @property
+    def dc_id(self) -> int:
+        """Pooled clients connect to telethon default DC."""
+        return DEFAULT_DC_ID
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    def _create_client(self) -> TelegramClient:
+        credential = self._credential_pool.pick()
+        if settings.telegram.use_proxy:
+            return self._client_repo.string.proxy(
+                credential=credential, proxy=self._proxy_pool.select().as_telethon()
+            )
+        return self._client_repo.string.simple(credential=credential)
+
+    def _is_stale(self, created_at: float) -> bool:
+        return time.monotonic() - created_at > self._max_idle
+
+    async def _warm_up(self) -> None:
+        self._warming += 1
+        try:
+            client = self._create_client()
+            await get_connectivity_guard().connect(client=client)
+            self._idle.append((time.monotonic(), client))
+        except TelegramUnavailable as exception:
+            logging.warning("Fail to warm up telegram client. Error: %s", str(exception))
+        finally:
+            self._warming -= 1
+
+    async def _is_healthy(self, client: TelegramClient) -> bool:
+        if not client.is_connected():
+            return False
+        try:
+            await client(PingRequest(ping_id=random.getrandbits(63)))
+            return True
+        except Exception as exception:
+            logging.warning("Pooled telegram client is unhealthy. Error: %s", str(exception))
+            return False
+
+    async def refill(self) -> None:
+        missing = self._size - len(self._idle) - self._warming
+        if missing > 0:
+            await asyncio.gather(*(self._warm_up() for _ in range(missing)))
+
+    async def check_health(self) -> None:
+        """Ping idle clients and drop the stale or broken ones.
+
+        Clients stay in the pool while they are pinged, so they can still be
+        acquired. A client acquired meanwhile belongs to its flow and is kept.
+        """
+        checked = list(self._idle)
+        results = await asyncio.gather(
+            *(self._is_healthy(client) for _, client in checked)
+        )
+        dropped = {
+            id(client)
+            for (created_at, client), healthy in zip(checked, results)
+            if not healthy or self._is_stale(created_at)
+        }
+        if not dropped:
+            return
+        removed = [client for _, client in self._idle if id(client) in dropped]
+        self._idle = deque(entry for entry in self._idle if id(entry[1]) not in dropped)
+        for client in removed:
+            await client.disconnect()
+
+    async def acquire(self) -> TelegramClient | None:
+        """Take a ready client or return None when the pool is drained."""
+        while self._idle:
+            created_at, client = self._idle.popleft()
+            if client.is_connected() and not self._is_stale(created_at):
+                return client
+            await client.disconnect()
+        logging.info("Telegram clients pool is drained.")
+        return None
+
+    async def run(self, refill_interval: float) -> None:
+        last_health_check = time.monotonic()
+        while True:
+            try:
+                await self.refill()
+                if time.monotonic() - last_health_check >= self._health_check_interval:
+                    await self.check_health()
+                    last_health_check = time.monotonic()
+            except Exception as exception:
+                logging.exception(
+                    "Fail to maintain telegram clients pool. Error: %s", str(exception)
+                )
+            await asyncio.sleep(refill_interval)
+
+    async def close(self) -> None:
+        while self._idle:
+            _, client = self._idle.popleft()
+            await client.disconnect()
+
+
+@lru_cache
+def get_client_pool() -> ClientPool:
+    return ClientPool(
+        client_repo=get_client_repository(),
+        credential_pool=get_credential_pool(),
+        proxy_pool=get_proxy_pool(),
+        size=settings.pool.size,
+        max_idle=settings.pool.max_idle,
+        health_check_interval=settings.pool.health_check_interval,
+    )
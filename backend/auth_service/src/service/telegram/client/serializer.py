@@ -0,0 +1,45 @@
+from functools import lru_cache
+from typing import Any
+import datetime
+
+import orjson
+from telethon.sessions import StringSession
+
+from service.telegram.client.create.context import (
+    ClientCreateContext,
+    get_client_create_context,
+)
+
+
+class ClientRecordSerializer:
+    """Convert auth flow records with live clients to bytes and back.
+
+    The telegram client is replaced by its exported auth key and DC, which
+    is enough to rebuild an equivalent client in any worker. Records
+    without a client, like session handles, are stored as they are.
+    """
+
+    __slots__ = ("_client_context",)
+
+    def __init__(self, client_context: ClientCreateContext) -> None:
+        self._client_context = client_context
+
+    def dump(self, record: dict[str, Any]) -> bytes:
+        payload = {key: value for key, value in record.items() if key != "client"}
+        if "client" in record:
+            payload["session"] = StringSession.save(record["client"].session)
+        return orjson.dumps(payload)
+
+    def load(self, value: bytes) -> dict[str, Any]:
+        record = orjson.loads(value)
+        if "session" in record:
+            record["client"] = self._client_context.restore(
+                session=record.pop("session"), api_id=record.get("api_id")
+            )
+        record["timestamp"] = datetime.datetime.fromisoformat(record["timestamp"])
+        return record
+
+
+@lru_cache
+def get_client_record_serializer() -> ClientRecordSerializer:
+    return ClientRecordSerializer(client_context=get_client_create_context())
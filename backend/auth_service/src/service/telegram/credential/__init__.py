@@ -0,0 +1,4 @@
+from .pool import CredentialPool, get_credential_pool
+
+
+__all__ = ("CredentialPool", "get_credential_pool")
@@ -0,0 +1,97 @@
+from collections import deque
+from functools import lru_cache
+import logging
+import time
+
+from core.settings import TelegramCredential, settings
+from service.telegram.rpc import RPCLimiter, get_rpc_limiter
+
+
+class CredentialPool:
+    """Balance auth flows between telegram app credentials.
+
+    A flow is assigned the credential with the shortest flood wait and then
+    the fewest flows per weight assigned within the last `window` seconds.
+    """
+
+    __slots__ = ("_credentials", "_window", "_rpc_limiter", "_recent", "_assigned")
+
+    def __init__(
+        self,
+        credentials: list[TelegramCredential],
+        window: float,
+        rpc_limiter: RPCLimiter,
+    ) -> None:
+        self._credentials = {credential.api_id: credential for credential in credentials}
+        self._window = window
+        self._rpc_limiter = rpc_limiter
+
+        self._recent: dict[int, deque[float]] = {
+            api_id: deque() for api_id in self._credentials
+        }
+        self._assigned: dict[int, int] = dict.fromkeys(self._credentials, 0)
+
+    def _load(self, api_id: int, now: float) -> int:
+        recent = self._recent[api_id]
+        while recent and now - recent[0] > self._window:
+            recent.popleft()
+        return len(recent)
+
+    def get(self, api_id: int | None) -> TelegramCredential:
+        credential = self._credentials.get(api_id)
+        if credential is None:
+            logging.warning("Unknown telegram api_id %s, use the default one.", api_id)
+            return next(iter(self._credentials.values()))
+        return credential
+
+    def pick(self) -> TelegramCredential:
+        now = time.monotonic()
+        return min(
+            self._credentials.values(),
+            key=lambda credential: (
+                self._rpc_limiter.wait_time(api_id=credential.api_id),
+                self._load(credential.api_id, now) / credential.weight,
+            ),
+        )
+
+    def acquire(self, api_id: int | None = None) -> TelegramCredential:
+        """Assign a new auth flow to `api_id` or to the least loaded credential."""
+        credential = self.pick() if api_id is None else self.get(api_id=api_id)
+        self._recent[credential.api_id].append(time.monotonic())
+        self._assigned[credential.api_id] += 1
+        return credential
+
+    def release(self, api_id: int) -> None:
+        """Drop the latest flow assigned to `api_id`, which ended before using it."""
+        recent = self._recent.get(api_id)
+        if recent:
+            recent.pop()
+        if self._assigned.get(api_id):
+            self._assigned[api_id] -= 1
+
+    def stats(self) -> list[dict[str, int | float]]:
+        now = time.monotonic()
+        return [
+            {
+                "api_id": api_id,
+                "weight": credential.weight,
+                "recent": self._load(api_id, now),
+                "assigned": self._assigned[api_id],
+                "wait": round(self._rpc_limiter.wait_time(api_id=api_id), 3),
+            }
+            for api_id, credential in self._credentials.items()
+        ]
+
+
+@lru_cache
+def get_credential_pool() -> CredentialPool:
+    credentials = settings.telegram.credentials or [
+        TelegramCredential(
+            api_id=settings.telegram.api_id, api_hash=settings.telegram.api_hash
+        )
+    ]
+    return CredentialPool(
+        credentials=credentials,
+        window=settings.storage.ttl,
+        rpc_limiter=get_rpc_limiter(),
+    )
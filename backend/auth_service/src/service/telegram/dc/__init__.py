@@ -0,0 +1,5 @@
+from .predictor import DCPrediction, DCPredictor, get_dc_predictor
+from .lifespan import dc_predictor_lifespan
+
+
+__all__ = ("DCPrediction", "DCPredictor", "get_dc_predictor", "dc_predictor_lifespan")
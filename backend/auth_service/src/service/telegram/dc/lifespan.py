@@ -0,0 +1,41 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
+
+from core.executor import run_blocking
+from core.settings import settings
+from service.telegram.dc.predictor import DCPredictor, get_dc_predictor
+
+
+async def _save(dc_predictor: DCPredictor) -> None:
+    payload = dc_predictor.dump()
+    if payload is not None:
+        await run_blocking(dc_predictor.write, payload)
+
+
+async def _save_periodically(dc_predictor: DCPredictor, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await _save(dc_predictor=dc_predictor)
+
+
+@asynccontextmanager
+async def dc_predictor_lifespan() -> AsyncIterator[None]:
+    if not settings.dc_prediction.enabled:
+        yield
+        return
+
+    dc_predictor = get_dc_predictor()
+    await run_blocking(dc_predictor.load)
+    save_task = asyncio.create_task(
+        _save_periodically(
+            dc_predictor=dc_predictor, interval=settings.dc_prediction.save_interval
+        )
+    )
+    try:
+        yield
+    finally:
+        save_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await save_task
+        await _save(dc_predictor=dc_predictor)
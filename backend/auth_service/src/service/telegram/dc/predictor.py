@@ -0,0 +1,127 @@
+from functools import lru_cache
+from typing import Any
+import logging
+import os
+
+import orjson
+from telethon.sessions import Session
+
+from core.settings import settings
+from core.logger import redact
+from service.telegram.dc.trie import PrefixTrie
+
+
+class DCPrediction:
+    __slots__ = ("dc_id", "server_address", "port")
+
+    def __init__(self, dc_id: int, server_address: str, port: int) -> None:
+        self.dc_id = dc_id
+        self.server_address = server_address
+        self.port = port
+
+
+class DCPredictor:
+    """Learn home DC of phone number prefixes from finished auth flows."""
+
+    __slots__ = (
+        "_trie",
+        "_addresses",
+        "_min_samples",
+        "_path",
+        "_dirty",
+        "hits",
+        "misses",
+        "unknown",
+    )
+
+    def __init__(self, path: str, max_depth: int, min_samples: int) -> None:
+        self._trie = PrefixTrie(max_depth=max_depth)
+        self._addresses: dict[int, tuple[str, int]] = {}
+        self._min_samples = min_samples
+        self._path = path
+        self._dirty = False
+
+        self.hits = 0
+        self.misses = 0
+        self.unknown = 0
+
+    def predict(self, phone_number: str) -> DCPrediction | None:
+        dc_id = self._trie.predict(phone_number=phone_number, min_samples=self._min_samples)
+        if dc_id is None or dc_id not in self._addresses:
+            return None
+        server_address, port = self._addresses[dc_id]
+        return DCPrediction(dc_id=dc_id, server_address=server_address, port=port)
+
+    def observe(self, prediction: DCPrediction | None, dc_id: int) -> None:
+        """Count whether the predicted DC was the one telegram kept us on."""
+        if prediction is None:
+            self.unknown += 1
+        elif prediction.dc_id == dc_id:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def record(self, phone_number: str, session: Session) -> None:
+        logging.info("Record DC %s for phone: %s", session.dc_id, redact(phone_number))
+        self._trie.insert(phone_number=phone_number, dc_id=session.dc_id)
+        self._addresses[session.dc_id] = (session.server_address, session.port)
+        self._dirty = True
+
+    def stats(self) -> dict[str, Any]:
+        predicted = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "unknown": self.unknown,
+            "hit_rate": self.hits / predicted if predicted else None,
+        }
+
+    def load(self) -> None:
+        if not os.path.exists(self._path):
+            return
+        try:
+            with open(self._path, "rb") as file:
+                data = orjson.loads(file.read())
+            trie = PrefixTrie(max_depth=self._trie.max_depth)
+            trie.load(data["trie"])
+            addresses = {
+                int(dc_id): (server_address, port)
+                for dc_id, (server_address, port) in data["addresses"].items()
+            }
+        except (OSError, KeyError, TypeError, ValueError) as exception:
+            logging.warning("Fail to load DC prefixes %s. Error: %s", self._path, str(exception))
+            return
+        self._trie, self._addresses = trie, addresses
+
+    def dump(self) -> bytes | None:
+        """Serialize learned prefixes, `None` when nothing changed since last dump."""
+        if not self._dirty:
+            return None
+        self._dirty = False
+        return orjson.dumps(
+            {
+                "trie": self._trie.dump(),
+                "addresses": {
+                    str(dc_id): address for dc_id, address in self._addresses.items()
+                },
+            }
+        )
+
+    def write(self, payload: bytes) -> None:
+        tmp_path = f"{self._path}.tmp"
+        try:
+            with open(tmp_path, "wb") as file:
+                file.write(payload)
+            os.replace(tmp_path, self._path)
+        except OSError as exception:
+            self._dirty = True
+            logging.warning("Fail to save DC prefixes %s. Error: %s", self._path, str(exception))
+
+
+@lru_cache
+def get_dc_predictor() -> DCPredictor:
+    return DCPredictor(
+        path=settings.path.dc_prefix_file,
+        max_depth=settings.dc_prediction.max_depth,
+        min_samples=settings.dc_prediction.min_samples,
+    )
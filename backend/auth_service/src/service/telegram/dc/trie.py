@@ -0,0 +1,63 @@
+from typing import Any
+
+
+class _PrefixNode:
+    __slots__ = ("children", "counts")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _PrefixNode] = {}
+        self.counts: dict[int, int] = {}
+
+
+class PrefixTrie:
+    """Count DC placements of phone numbers by their leading digits."""
+
+    __slots__ = ("_root", "_max_depth")
+
+    def __init__(self, max_depth: int) -> None:
+        self._root = _PrefixNode()
+        self._max_depth = max_depth
+
+    @property
+    def max_depth(self) -> int:
+        return self._max_depth
+
+    def insert(self, phone_number: str, dc_id: int) -> None:
+        node = self._root
+        for digit in phone_number[: self._max_depth]:
+            node = node.children.setdefault(digit, _PrefixNode())
+            node.counts[dc_id] = node.counts.get(dc_id, 0) + 1
+
+    def predict(self, phone_number: str, min_samples: int) -> int | None:
+        """Return the most frequent DC of the longest prefix with enough samples."""
+        prediction = None
+        node = self._root
+        for digit in phone_number[: self._max_depth]:
+            node = node.children.get(digit)
+            if node is None:
+                break
+            if sum(node.counts.values()) >= min_samples:
+                prediction = max(node.counts, key=node.counts.__getitem__)
+        return prediction
+
+    def dump(self) -> dict[str, Any]:
+        def dump_node(node: _PrefixNode) -> dict[str, Any]:
+            return {
+                "counts": {str(dc_id): count for dc_id, count in node.counts.items()},
+                "children": {
+                    digit: dump_node(child) for digit, child in node.children.items()
+                },
+            }
+
+        return dump_node(self._root)
+
+    def load(self, data: dict[str, Any]) -> None:
+        def load_node(data: dict[str, Any]) -> _PrefixNode:
+            node = _PrefixNode()
+            node.counts = {int(dc_id): count for dc_id, count in data["counts"].items()}
+            node.children = {
+                digit: load_node(child) for digit, child in data["children"].items()
+            }
+            return node
+
+        self._root = load_node(data)
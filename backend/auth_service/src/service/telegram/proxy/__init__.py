@@ -0,0 +1,22 @@
+from .endpoint import ProxyEndpoint, ProxyTuple
+from .strategy import (
+    ProxyStrategy,
+    LeastConnectionsStrategy,
+    EWMALatencyStrategy,
+    STRATEGIES,
+)
+from .pool import ProxyPool, get_proxy_pool
+from .lifespan import proxy_pool_lifespan
+
+
+__all__ = (
+    "ProxyEndpoint",
+    "ProxyTuple",
+    "ProxyStrategy",
+    "LeastConnectionsStrategy",
+    "EWMALatencyStrategy",
+    "STRATEGIES",
+    "ProxyPool",
+    "get_proxy_pool",
+    "proxy_pool_lifespan",
+)
@@ -0,0 +1,84 @@
+from urllib.parse import urlsplit
+
+
+ProxyTuple = (
+    tuple[str, str, int] | tuple[str, str, int, bool, str | None, str | None]
+)
+
+
+class ProxyEndpoint:
+    """One proxy with its connection and health statistics."""
+
+    __slots__ = (
+        "scheme",
+        "hostname",
+        "port",
+        "username",
+        "password",
+        "latency",
+        "active",
+        "failures",
+        "attempts",
+        "errors",
+        "ejected_until",
+    )
+
+    def __init__(
+        self,
+        scheme: str,
+        hostname: str,
+        port: int,
+        username: str | None = None,
+        password: str | None = None,
+    ) -> None:
+        self.scheme = scheme
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+
+        self.latency: float | None = None
+        self.active = 0
+        self.failures = 0
+        self.attempts = 0
+        self.errors = 0
+        self.ejected_until: float | None = None
+
+    @classmethod
+    def from_url(cls, url: str) -> "ProxyEndpoint":
+        parts = urlsplit(url.strip())
+        if not parts.scheme or not parts.hostname or not parts.port:
+            raise ValueError(f"Invalid proxy url: {url!r}")
+        return cls(
+            scheme=parts.scheme,
+            hostname=parts.hostname,
+            port=parts.port,
+            username=parts.username,
+            password=parts.password,
+        )
+
+    @staticmethod
+    def make_key(scheme: str, hostname: str, port: int) -> str:
+        return f"{scheme}://{hostname}:{port}"
+
+    @property
+    def key(self) -> str:
+        return self.make_key(self.scheme, self.hostname, self.port)
+
+    @property
+    def ejected(self) -> bool:
+        return self.ejected_until is not None
+
+    def as_telethon(self) -> ProxyTuple:
+        if self.username is None:
+            return (self.scheme, self.hostname, self.port)
+        return (self.scheme, self.hostname, self.port, True, self.username, self.password)
+
+    def stats(self) -> dict[str, str | int | float | bool | None]:
+        return {
+            "proxy": self.key,
+            "latency": round(self.latency, 4) if self.latency is not None else None,
+            "active": self.active,
+            "failure_rate": round(self.errors / self.attempts, 4) if self.attempts else 0.0,
+            "ejected": self.ejected,
+        }
@@ -0,0 +1,23 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
+
+from core.settings import settings
+from service.telegram.proxy.pool import get_proxy_pool
+
+
+@asynccontextmanager
+async def proxy_pool_lifespan() -> AsyncIterator[None]:
+    if not settings.telegram.use_proxy:
+        yield
+        return
+
+    probe_task = asyncio.create_task(
+        get_proxy_pool().run(interval=settings.proxy.probe_interval)
+    )
+    try:
+        yield
+    finally:
+        probe_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await probe_task
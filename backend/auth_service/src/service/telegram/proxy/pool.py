@@ -0,0 +1,154 @@
+from functools import lru_cache
+import asyncio
+import logging
+import random
+import time
+
+from telethon import TelegramClient
+
+from core.settings import settings
+from service.telegram.proxy.endpoint import ProxyEndpoint, ProxyTuple
+from service.telegram.proxy.strategy import STRATEGIES, ProxyStrategy
+
+
+class ProxyPool:
+    """Hand new telegram clients the best healthy proxy.
+
+    Proxies are probed in the background and fed with the outcome of real
+    connections. After `eject_failures` failures in a row a proxy is
+    ejected, and it is re-admitted by the first successful probe once
+    `eject_time` seconds have passed.
+    """
+
+    __slots__ = (
+        "_endpoints",
+        "_strategy",
+        "_alpha",
+        "_probe_timeout",
+        "_eject_failures",
+        "_eject_time",
+    )
+
+    def __init__(
+        self,
+        endpoints: list[ProxyEndpoint],
+        strategy: ProxyStrategy,
+        alpha: float,
+        probe_timeout: float,
+        eject_failures: int,
+        eject_time: float,
+    ) -> None:
+        self._endpoints = {endpoint.key: endpoint for endpoint in endpoints}
+        self._strategy = strategy
+        self._alpha = alpha
+        self._probe_timeout = probe_timeout
+        self._eject_failures = eject_failures
+        self._eject_time = eject_time
+
+    def find(self, proxy: ProxyTuple | None) -> ProxyEndpoint | None:
+        if not proxy:
+            return None
+        return self._endpoints.get(ProxyEndpoint.make_key(*proxy[:3]))
+
+    def select(self) -> ProxyEndpoint:
+        endpoints = [
+            endpoint for endpoint in self._endpoints.values() if not endpoint.ejected
+        ]
+        if not endpoints:
+            logging.warning("Every proxy is ejected, use the least recently ejected one.")
+            endpoints = [
+                min(self._endpoints.values(), key=lambda endpoint: endpoint.ejected_until)
+            ]
+        scores = [self._strategy.score(endpoint) for endpoint in endpoints]
+        best = min(scores)
+        return random.choice(
+            [endpoint for endpoint, score in zip(endpoints, scores) if score == best]
+        )
+
+    def success(self, endpoint: ProxyEndpoint, latency: float) -> None:
+        endpoint.attempts += 1
+        endpoint.failures = 0
+        if endpoint.latency is None:
+            endpoint.latency = latency
+        else:
+            endpoint.latency += self._alpha * (latency - endpoint.latency)
+        if endpoint.ejected and time.monotonic() >= endpoint.ejected_until:
+            logging.info("Re-admit proxy %s.", endpoint.key)
+            endpoint.ejected_until = None
+
+    def failure(self, endpoint: ProxyEndpoint) -> None:
+        endpoint.attempts += 1
+        endpoint.errors += 1
+        endpoint.failures += 1
+        if endpoint.failures >= self._eject_failures and not endpoint.ejected:
+            logging.warning(
+                "Eject proxy %s after %s failures.", endpoint.key, endpoint.failures
+            )
+            endpoint.ejected_until = time.monotonic() + self._eject_time
+
+    def track(self, client: TelegramClient, endpoint: ProxyEndpoint) -> None:
+        """Count the client as a connection of `endpoint` until it disconnects."""
+        endpoint.active += 1
+
+        def release(_) -> None:
+            endpoint.active -= 1
+
+        client.disconnected.add_done_callback(release)
+
+    async def probe(self, endpoint: ProxyEndpoint) -> None:
+        started_at = time.monotonic()
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(endpoint.hostname, endpoint.port),
+                timeout=self._probe_timeout,
+            )
+        except OSError as exception:
+            logging.warning("Proxy %s probe failed. Error: %s", endpoint.key, str(exception))
+            self.failure(endpoint=endpoint)
+            return
+        self.success(endpoint=endpoint, latency=time.monotonic() - started_at)
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+    async def run(self, interval: float) -> None:
+        while True:
+            await asyncio.gather(
+                *(self.probe(endpoint=endpoint) for endpoint in self._endpoints.values())
+            )
+            await asyncio.sleep(interval)
+
+    def stats(self) -> list[dict[str, str | int | float | bool | None]]:
+        return [endpoint.stats() for endpoint in self._endpoints.values()]
+
+
+def _load_urls() -> list[str]:
+    urls = list(settings.proxy.pool)
+    if settings.proxy.pool_file:
+        with open(settings.proxy.pool_file) as file:
+            urls.extend(
+                line.strip()
+                for line in file
+                if line.strip() and not line.lstrip().startswith("#")
+            )
+    if not urls:
+        urls.append(
+            ProxyEndpoint.make_key(
+                settings.proxy.scheme, settings.proxy.hostname, settings.proxy.port
+            )
+        )
+    return urls
+
+
+@lru_cache
+def get_proxy_pool() -> ProxyPool:
+    return ProxyPool(
+        endpoints=[ProxyEndpoint.from_url(url) for url in dict.fromkeys(_load_urls())],
+        strategy=STRATEGIES[settings.proxy.strategy](),
+        alpha=settings.proxy.ewma_alpha,
+        probe_timeout=settings.proxy.probe_timeout,
+        eject_failures=settings.proxy.eject_failures,
+        eject_time=settings.proxy.eject_time,
+    )
@@ -0,0 +1,31 @@
+from typing import Protocol
+
+from service.telegram.proxy.endpoint import ProxyEndpoint
+
+
+class ProxyStrategy(Protocol):
+    def score(self, endpoint: ProxyEndpoint) -> float: ...
+
+
+class LeastConnectionsStrategy:
+    """Prefer the proxy with the fewest connected clients."""
+
+    __slots__ = ()
+
+    def score(self, endpoint: ProxyEndpoint) -> float:
+        return endpoint.active
+
+
+class EWMALatencyStrategy:
+    """Prefer the fastest proxy, weighted by the clients it already serves."""
+
+    __slots__ = ()
+
+    def score(self, endpoint: ProxyEndpoint) -> float:
+        return (endpoint.latency or 0.0) * (endpoint.active + 1)
+
+
+STRATEGIES: dict[str, type[ProxyStrategy]] = {
+    "least_connections": LeastConnectionsStrategy,
+    "ewma": EWMALatencyStrategy,
+}
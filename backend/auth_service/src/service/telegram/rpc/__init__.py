@@ -0,0 +1,5 @@
+from .activity import TelegramActivity, get_telegram_activity
+from .limiter import RPCLimiter, get_rpc_limiter
+
+
+__all__ = ("TelegramActivity", "get_telegram_activity", "RPCLimiter", "get_rpc_limiter")
@@ -0,0 +1,40 @@
+from functools import lru_cache
+import time
+
+
+class TelegramActivity:
+    """Outcomes of the latest telegram calls and connections.
+
+    A call counts as a success when telegram answered it, RPC errors
+    included. Failures are calls and connections that got no answer.
+    """
+
+    __slots__ = ("last_success_at", "failing_since")
+
+    def __init__(self) -> None:
+        self.last_success_at: float | None = None
+        self.failing_since: float | None = None
+
+    def success(self) -> None:
+        self.last_success_at = time.monotonic()
+        self.failing_since = None
+
+    def failure(self) -> None:
+        if self.failing_since is None:
+            self.failing_since = time.monotonic()
+
+    def last_success_age(self, now: float) -> float | None:
+        if self.last_success_at is None:
+            return None
+        return now - self.last_success_at
+
+    def failing_for(self, now: float) -> float:
+        """Seconds since the first failure not followed by a success."""
+        if self.failing_since is None:
+            return 0.0
+        return now - self.failing_since
+
+
+@lru_cache
+def get_telegram_activity() -> TelegramActivity:
+    return TelegramActivity()
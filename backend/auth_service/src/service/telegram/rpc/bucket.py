@@ -0,0 +1,30 @@
+class TokenBucket:
+    """Token bucket which queues callers by letting the balance go negative."""
+
+    __slots__ = ("_rate", "_capacity", "_tokens", "_updated")
+
+    def __init__(self, rate: float, capacity: int, now: float) -> None:
+        self._rate = rate
+        self._capacity = capacity
+
+        self._tokens = float(capacity)
+        self._updated = now
+
+    def _refill(self, now: float) -> None:
+        if now <= self._updated:
+            return
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until the next token."""
+        self._refill(now)
+        delay = max(0.0, self._updated - now)
+        if self._tokens < 1:
+            delay += (1 - self._tokens) / self._rate
+        return delay
+
+    def take(self) -> None:
+        self._tokens -= 1
@@ -0,0 +1,202 @@
+from functools import lru_cache
+from typing import Awaitable, Callable, TypeVar
+import asyncio
+import logging
+import math
+import time
+
+from telethon import TelegramClient, errors
+
+from core.settings import settings
+from exception.telegram import FloodWait
+from service.metrics import AUTH_OUTCOMES, TELEGRAM_CALL_LATENCY
+from service.telegram.rpc.activity import TelegramActivity, get_telegram_activity
+from service.telegram.rpc.bucket import TokenBucket
+from service.trace import get_tracer
+
+
+T = TypeVar("T")
+
+
+class RPCLimiter:
+    """Schedule telegram calls through per api_id and per DC token buckets.
+
+    A call waits for a token of both buckets. When the wait is longer than
+    `max_wait` it is rejected with `FloodWait` instead of holding the HTTP
+    request. Flood waits reported by telegram block only the calls of the
+    same api_id and method with the same `flood_key`, e.g. phone number.
+    """
+
+    __slots__ = (
+        "_api_rate",
+        "_api_burst",
+        "_dc_rate",
+        "_dc_burst",
+        "_max_wait",
+        "_activity",
+        "_buckets",
+        "_penalties",
+    )
+
+    def __init__(
+        self,
+        api_rate: float,
+        api_burst: int,
+        dc_rate: float,
+        dc_burst: int,
+        max_wait: float,
+        activity: TelegramActivity,
+    ) -> None:
+        self._api_rate = api_rate
+        self._api_burst = api_burst
+        self._dc_rate = dc_rate
+        self._dc_burst = dc_burst
+        self._max_wait = max_wait
+        self._activity = activity
+
+        self._buckets: dict[tuple[int, ...], TokenBucket] = {}
+        self._penalties: dict[tuple[int, str, str | None], float] = {}
+
+    def _bucket(
+        self, key: tuple[int, ...], rate: float, burst: int, now: float
+    ) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate=rate, capacity=burst, now=now)
+        return bucket
+
+    def _api_bucket(self, api_id: int, now: float) -> TokenBucket:
+        return self._bucket((api_id,), self._api_rate, self._api_burst, now)
+
+    def _dc_bucket(self, api_id: int, dc_id: int, now: float) -> TokenBucket:
+        return self._bucket((api_id, dc_id), self._dc_rate, self._dc_burst, now)
+
+    def wait_time(self, api_id: int) -> float:
+        """Longest wait of the api_id buckets."""
+        now = time.monotonic()
+        return max(
+            (bucket.delay(now) for key, bucket in self._buckets.items() if key[0] == api_id),
+            default=0.0,
+        )
+
+    def _penalty(self, key: tuple[int, str, str | None], now: float) -> float:
+        blocked_until = self._penalties.get(key)
+        if blocked_until is None:
+            return 0.0
+        if blocked_until <= now:
+            del self._penalties[key]
+            return 0.0
+        return blocked_until - now
+
+    async def acquire(
+        self, api_id: int, dc_id: int, method: str = "", flood_key: str | None = None
+    ) -> None:
+        now = time.monotonic()
+        buckets = (self._api_bucket(api_id, now), self._dc_bucket(api_id, dc_id, now))
+        delay = max(
+            self._penalty((api_id, method, flood_key), now),
+            *(bucket.delay(now) for bucket in buckets),
+        )
+        if delay > self._max_wait:
+            AUTH_OUTCOMES["FloodWait"].inc()
+            raise FloodWait(
+                f"Telegram calls of api_id {api_id} on DC {dc_id} are limited.",
+                seconds=math.ceil(delay),
+            )
+        for bucket in buckets:
+            bucket.take()
+        if delay > 0:
+            logging.info("Delay telegram call on DC %s for %.2f seconds.", dc_id, delay)
+            await asyncio.sleep(delay)
+
+    def penalize(
+        self, api_id: int, method: str, flood_key: str | None, seconds: float
+    ) -> None:
+        now = time.monotonic()
+        for key, blocked_until in list(self._penalties.items()):
+            if blocked_until <= now:
+                del self._penalties[key]
+        key = (api_id, method, flood_key)
+        self._penalties[key] = max(self._penalties.get(key, now), now + seconds)
+
+    async def call(
+        self,
+        client: TelegramClient,
+        func: Callable[..., Awaitable[T]],
+        *args,
+        flood_key: str | None = None,
+        **kwargs,
+    ) -> T:
+        """Await `func` of `client` once the rate limits allow it.
+
+        Flood waits of the call delay later calls of `func` with the same
+        `flood_key` only.
+        """
+        with get_tracer().span("telegram.rpc") as span:
+            if span is not None:
+                span.name = f"telegram.{func.__name__}"
+                span.set("dc_id", client.session.dc_id)
+            try:
+                return await self._call(client, func, *args, flood_key=flood_key, **kwargs)
+            finally:
+                if span is not None:
+                    # Telethon switches the session DC on migration errors.
+                    span.set("dc_id.final", client.session.dc_id)
+
+    async def _call(
+        self,
+        client: TelegramClient,
+        func: Callable[..., Awaitable[T]],
+        *args,
+        flood_key: str | None,
+        **kwargs,
+    ) -> T:
+        api_id, method = client.api_id, func.__name__
+        with get_tracer().span("telegram.rpc.queue"):
+            await self.acquire(
+                api_id=api_id, dc_id=client.session.dc_id, method=method, flood_key=flood_key
+            )
+        latency = TELEGRAM_CALL_LATENCY.get(method, TELEGRAM_CALL_LATENCY["other"])
+        started_at = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except errors.FloodWaitError as exception:
+            self._activity.success()
+            AUTH_OUTCOMES["FloodWait"].inc()
+            # Telethon switches the session DC on migration errors.
+            logging.warning(
+                "Telegram flood wait %s seconds of %s on DC %s for api_id %s.",
+                exception.seconds,
+                method,
+                client.session.dc_id,
+                api_id,
+            )
+            self.penalize(
+                api_id=api_id, method=method, flood_key=flood_key, seconds=exception.seconds
+            )
+            raise FloodWait(
+                f"Telegram asked to wait {exception.seconds} seconds.",
+                seconds=exception.seconds,
+            ) from exception
+        except errors.RPCError:
+            self._activity.success()
+            raise
+        except OSError:
+            self._activity.failure()
+            raise
+        finally:
+            latency.observe(time.perf_counter() - started_at)
+        self._activity.success()
+        return result
+
+
+@lru_cache
+def get_rpc_limiter() -> RPCLimiter:
+    return RPCLimiter(
+        api_rate=settings.rpc.api_rate,
+        api_burst=settings.rpc.api_burst,
+        dc_rate=settings.rpc.dc_rate,
+        dc_burst=settings.rpc.dc_burst,
+        max_wait=settings.rpc.max_wait,
+        activity=get_telegram_activity(),
+    )
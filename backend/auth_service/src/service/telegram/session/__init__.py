@@ -0,0 +1,13 @@
+from .store import SharedSessionStore, get_shared_session_store
+from .shared import SharedSession
+from .threaded import ThreadedSQLiteSession
+from .lifespan import session_store_lifespan
+
+
+__all__ = (
+    "SharedSessionStore",
+    "get_shared_session_store",
+    "SharedSession",
+    "ThreadedSQLiteSession",
+    "session_store_lifespan",
+)
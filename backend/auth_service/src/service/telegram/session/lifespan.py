@@ -0,0 +1,32 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
+
+from core.executor import run_blocking
+from core.settings import settings
+from service.telegram.session.store import SharedSessionStore, get_shared_session_store
+
+
+async def _flush_periodically(store: SharedSessionStore, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await run_blocking(store.flush)
+
+
+@asynccontextmanager
+async def session_store_lifespan() -> AsyncIterator[None]:
+    if settings.session.backend != "shared":
+        yield
+        return
+
+    store = get_shared_session_store()
+    flush_task = asyncio.create_task(
+        _flush_periodically(store=store, interval=settings.session.flush_interval)
+    )
+    try:
+        yield
+    finally:
+        flush_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await flush_task
+        await run_blocking(store.close)
@@ -0,0 +1,45 @@
+from telethon.crypto import AuthKey
+from telethon.sessions import MemorySession
+
+from core.executor import run_blocking
+from service.telegram.session.store import SharedSessionStore, get_shared_session_store
+
+
+class SharedSession(MemorySession):
+    """Telethon session persisted as one row of the shared session store.
+
+    Only the connection data is persisted. Entities and update states are
+    kept in memory, the auth service never needs them after sign in.
+    """
+
+    def __init__(self, store: SharedSessionStore, phone_number: str) -> None:
+        super().__init__()
+        self._store = store
+        self.phone_number = phone_number
+
+        row = store.get(phone_number=phone_number)
+        if row is not None:
+            self._dc_id, self._server_address, self._port, key, self._takeout_id = row
+            self._auth_key = AuthKey(data=key) if key else None
+
+    @classmethod
+    async def open(cls, phone_number: str) -> "SharedSession":
+        """Load the stored session of a phone number off the loop."""
+        return await run_blocking(
+            cls, store=get_shared_session_store(), phone_number=phone_number
+        )
+
+    def save(self) -> None:
+        self._store.put(
+            phone_number=self.phone_number,
+            row=(
+                self._dc_id,
+                self._server_address,
+                self._port,
+                self._auth_key.key if self._auth_key else b"",
+                self._takeout_id,
+            ),
+        )
+
+    def delete(self) -> None:
+        self._store.delete(phone_number=self.phone_number)
@@ -0,0 +1,106 @@
+from functools import lru_cache
+import logging
+import sqlite3
+import threading
+
+from core.settings import settings
+
+
+SessionRow = tuple[int, str | None, int | None, bytes, int | None]
+
+
+class SharedSessionStore:
+    """Keep telegram sessions of every phone number in one WAL-mode database.
+
+    Writes are buffered and committed by `flush` in one transaction, so a
+    burst of auth flows costs a single fsync instead of one per session.
+    Buffered writes are cheap enough for the event loop, reads and commits
+    are meant to run in the blocking executor.
+    """
+
+    __slots__ = ("_path", "_connection", "_pending", "_pending_lock", "_connection_lock")
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._connection: sqlite3.Connection | None = None
+        self._pending: dict[str, SessionRow | None] = {}
+
+        self._pending_lock = threading.Lock()
+        self._connection_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self._path, check_same_thread=False)
+            self._connection.execute("pragma journal_mode=wal")
+            self._connection.execute("pragma synchronous=normal")
+            self._connection.execute(
+                """create table if not exists sessions (
+                    phone_number text primary key,
+                    dc_id integer,
+                    server_address text,
+                    port integer,
+                    auth_key blob,
+                    takeout_id integer
+                )"""
+            )
+            self._connection.commit()
+        return self._connection
+
+    def get(self, phone_number: str) -> SessionRow | None:
+        with self._pending_lock:
+            if phone_number in self._pending:
+                return self._pending[phone_number]
+        with self._connection_lock:
+            return self._connect().execute(
+                "select dc_id, server_address, port, auth_key, takeout_id "
+                "from sessions where phone_number = ?",
+                (phone_number,),
+            ).fetchone()
+
+    def exists(self, phone_number: str) -> bool:
+        return self.get(phone_number=phone_number) is not None
+
+    def put(self, phone_number: str, row: SessionRow) -> None:
+        with self._pending_lock:
+            self._pending[phone_number] = row
+
+    def delete(self, phone_number: str) -> None:
+        with self._pending_lock:
+            self._pending[phone_number] = None
+
+    def flush(self) -> int:
+        with self._pending_lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+        upserts = [
+            (phone_number, *row) for phone_number, row in pending.items() if row is not None
+        ]
+        deletes = [(phone_number,) for phone_number, row in pending.items() if row is None]
+
+        try:
+            with self._connection_lock, self._connect() as connection:
+                connection.executemany(
+                    "insert or replace into sessions values (?, ?, ?, ?, ?, ?)", upserts
+                )
+                connection.executemany(
+                    "delete from sessions where phone_number = ?", deletes
+                )
+        except sqlite3.Error as exception:
+            logging.warning("Fail to flush telegram sessions. Error: %s", str(exception))
+            with self._pending_lock:
+                self._pending = pending | self._pending
+            return 0
+        return len(pending)
+
+    def close(self) -> None:
+        self.flush()
+        with self._connection_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+@lru_cache
+def get_shared_session_store() -> SharedSessionStore:
+    return SharedSessionStore(path=settings.path.shared_session_file)
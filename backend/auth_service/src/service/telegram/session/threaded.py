@@ -0,0 +1,81 @@
+from typing import Callable
+import asyncio
+import os
+
+from telethon.sessions import MemorySession, SQLiteSession
+
+from core.executor import run_blocking
+from core.settings import settings
+
+
+class ThreadedSQLiteSession(SQLiteSession):
+    """Telethon SQLite session which commits in the blocking executor.
+
+    Telethon awaits the session methods which may return awaitables, so
+    every commit, entity and update state write leaves the event loop.
+    Writes of one session are serialized to keep their order.
+
+    `set_dc` and the `auth_key` and `takeout_id` setters are synchronous
+    for callers, so they only change the session in memory. The sessions
+    table is written by the next `save` or `close`, which telethon always
+    awaits right after them.
+    """
+
+    def __init__(self, session_id: str) -> None:
+        self._write_lock: asyncio.Lock | None = None
+        self._table_stale = False
+        super().__init__(session_id)
+        self._write_lock = asyncio.Lock()
+
+    @classmethod
+    async def open(cls, phone_number: str) -> "ThreadedSQLiteSession":
+        """Open or create the session file of a phone number off the loop."""
+        path = os.path.join(settings.path.session_dir, phone_number)
+        return await run_blocking(cls, path)
+
+    async def _write(self, func: Callable[..., None], *args) -> None:
+        async with self._write_lock:
+            await run_blocking(func, *args)
+
+    def set_dc(self, dc_id, server_address, port) -> None:
+        MemorySession.set_dc(self, dc_id, server_address, port)
+        self._table_stale = True
+
+    @SQLiteSession.auth_key.setter
+    def auth_key(self, value) -> None:
+        self._auth_key = value
+        self._table_stale = True
+
+    @SQLiteSession.takeout_id.setter
+    def takeout_id(self, value) -> None:
+        self._takeout_id = value
+        self._table_stale = True
+
+    def _flush(self) -> None:
+        if self._table_stale:
+            self._table_stale = False
+            self._update_session_table()
+        super().save()
+
+    def _flush_and_close(self) -> None:
+        self._flush()
+        super().close()
+
+    def save(self):
+        if self._write_lock is None:
+            # The database is created and migrated in the constructor,
+            # which already runs in the blocking executor.
+            return super().save()
+        return self._write(self._flush)
+
+    async def close(self) -> None:
+        await self._write(self._flush_and_close)
+
+    async def delete(self) -> None:
+        await self._write(super().delete)
+
+    async def process_entities(self, tlo) -> None:
+        await self._write(super().process_entities, tlo)
+
+    async def set_update_state(self, entity_id, state) -> None:
+        await self._write(super().set_update_state, entity_id, state)
@@ -0,0 +1,18 @@
+from .span import Span, SpanScope, NoopScope, current_span
+from .exporter import FileSpanExporter, get_span_exporter
+from .tracer import Tracer, get_tracer, traced
+from .lifespan import trace_lifespan
+
+
+__all__ = (
+    "Span",
+    "SpanScope",
+    "NoopScope",
+    "current_span",
+    "FileSpanExporter",
+    "get_span_exporter",
+    "Tracer",
+    "get_tracer",
+    "traced",
+    "trace_lifespan",
+)
@@ -0,0 +1,120 @@
+from functools import lru_cache
+import asyncio
+import logging
+import os
+
+import orjson
+
+from core.executor import run_blocking
+from core.settings import settings
+from service.trace.span import Span
+
+
+class FileSpanExporter:
+    """Batch finished spans and append them to a file off the event loop.
+
+    Each batch is one line of OTLP/JSON `resourceSpans`, as written by the
+    OpenTelemetry collector file exporter. Spans are dropped when the queue
+    is full, the file is rotated once it reaches `max_file_size` bytes.
+    """
+
+    SERVICE_NAME = "auth_service"
+
+    __slots__ = (
+        "_path",
+        "_batch_size",
+        "_queue_size",
+        "_max_file_size",
+        "_spans",
+        "_full",
+        "dropped",
+    )
+
+    def __init__(
+        self, path: str, batch_size: int, queue_size: int, max_file_size: int
+    ) -> None:
+        self._path = path
+        self._batch_size = batch_size
+        self._queue_size = queue_size
+        self._max_file_size = max_file_size
+
+        self._spans: list[Span] = []
+        self._full = asyncio.Event()
+        self.dropped = 0
+
+    def export(self, span: Span) -> None:
+        if len(self._spans) >= self._queue_size:
+            self.dropped += 1
+            return
+        self._spans.append(span)
+        if len(self._spans) >= self._batch_size:
+            self._full.set()
+
+    @staticmethod
+    def _encode_span(span: Span) -> dict:
+        encoded = {
+            "traceId": f"{span.trace_id:032x}",
+            "spanId": f"{span.span_id:016x}",
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [
+                {"key": key, "value": {"stringValue": str(value)}}
+                for key, value in span.attributes.items()
+            ],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id is not None:
+            encoded["parentSpanId"] = f"{span.parent_id:016x}"
+        return encoded
+
+    def _write(self, spans: list[Span]) -> None:
+        payload = orjson.dumps({
+            "resourceSpans": [{
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": self.SERVICE_NAME}}
+                    ]
+                },
+                "scopeSpans": [{
+                    "scope": {"name": self.SERVICE_NAME},
+                    "spans": [self._encode_span(span) for span in spans],
+                }],
+            }]
+        })
+        try:
+            if os.path.getsize(self._path) >= self._max_file_size:
+                os.replace(self._path, f"{self._path}.1")
+        except FileNotFoundError:
+            pass
+        with open(self._path, "ab") as file:
+            file.write(payload + b"\n")
+
+    async def flush(self) -> None:
+        self._full.clear()
+        if not self._spans:
+            return
+        spans, self._spans = self._spans, []
+        await run_blocking(self._write, spans)
+
+    async def run(self, interval: float) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=interval)
+            except TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as exception:
+                logging.exception("Fail to export trace spans. Error: %s", str(exception))
+
+
+@lru_cache
+def get_span_exporter() -> FileSpanExporter:
+    return FileSpanExporter(
+        path=settings.path.trace_file,
+        batch_size=settings.trace.batch_size,
+        queue_size=settings.trace.queue_size,
+        max_file_size=settings.trace.max_file_size,
+    )
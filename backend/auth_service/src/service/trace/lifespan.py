@@ -0,0 +1,26 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
+
+from core.settings import settings
+from service.trace.exporter import get_span_exporter
+
+
+@asynccontextmanager
+async def trace_lifespan() -> AsyncIterator[None]:
+    # Nodes of a cluster trace the requests forwarded by sampling nodes.
+    if not settings.trace.sample_rate and not settings.cluster.enabled:
+        yield
+        return
+
+    exporter = get_span_exporter()
+    export_task = asyncio.create_task(
+        exporter.run(interval=settings.trace.flush_interval)
+    )
+    try:
+        yield
+    finally:
+        export_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await export_task
+        await exporter.flush()
@@ -0,0 +1,78 @@
+from contextvars import ContextVar, Token
+from typing import Any, Callable
+import random
+import time
+
+
+class Span:
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+    )
+
+    def __init__(self, trace_id: int, parent_id: int | None, name: str) -> None:
+        self.trace_id = trace_id
+        self.span_id = random.getrandbits(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: dict[str, Any] = {}
+        self.error: str | None = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id:032x}-{self.span_id:016x}-01"
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+class SpanScope:
+    """Make a span current for the enclosed code and export it when it ends."""
+
+    __slots__ = ("span", "_export", "_token")
+
+    def __init__(self, span: Span, export: Callable[[Span], None]) -> None:
+        self.span = span
+        self._export = export
+        self._token: Token | None = None
+
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _current_span.reset(self._token)
+        self.span.end_ns = time.time_ns()
+        if exc_type is not None:
+            self.span.error = exc_type.__name__
+        self._export(self.span)
+
+
+class NoopScope:
+    """Scope of unsampled requests, shared and free of allocations."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+NOOP_SCOPE = NoopScope()
@@ -0,0 +1,84 @@
+from functools import lru_cache, wraps
+from typing import Awaitable, Callable, TypeVar
+import random
+import re
+
+from core.settings import settings
+from service.trace.exporter import get_span_exporter
+from service.trace.span import NOOP_SCOPE, NoopScope, Span, SpanScope, current_span
+
+
+T = TypeVar("T")
+
+
+class Tracer:
+    """Sample traces at the root and open child spans under the current one.
+
+    Unsampled requests have no current span, so their child spans cost
+    one context variable lookup.
+    """
+
+    TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+    __slots__ = ("_sample_rate", "_export")
+
+    def __init__(self, sample_rate: float, export: Callable[[Span], None]) -> None:
+        self._sample_rate = sample_rate
+        self._export = export
+
+    def start_trace(
+        self, name: str, traceparent: str | None = None, trusted: bool = False
+    ) -> SpanScope | NoopScope:
+        """Root scope of a request, joining the W3C trace of the caller.
+
+        Only `trusted` callers decide whether the request is sampled, and
+        send no traceparent when it is not. Others are sampled at the local
+        rate, so they cannot force tracing on.
+        """
+        match = self.TRACEPARENT.match(traceparent) if traceparent else None
+        if trusted:
+            sampled = match is not None and bool(int(match.group(3), 16) & 1)
+        else:
+            sampled = random.random() < self._sample_rate
+        if not sampled:
+            return NOOP_SCOPE
+
+        if match is None:
+            span = Span(trace_id=random.getrandbits(128), parent_id=None, name=name)
+        else:
+            span = Span(
+                trace_id=int(match.group(1), 16),
+                parent_id=int(match.group(2), 16),
+                name=name,
+            )
+        return SpanScope(span=span, export=self._export)
+
+    def span(self, name: str) -> SpanScope | NoopScope:
+        parent = current_span()
+        if parent is None:
+            return NOOP_SCOPE
+        span = Span(trace_id=parent.trace_id, parent_id=parent.span_id, name=name)
+        return SpanScope(span=span, export=self._export)
+
+
+@lru_cache
+def get_tracer() -> Tracer:
+    return Tracer(
+        sample_rate=settings.trace.sample_rate, export=get_span_exporter().export
+    )
+
+
+def traced(name: str):
+    """Run the decorated coroutine function in a child span of the current one."""
+
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> T:
+            if current_span() is None:
+                return await func(*args, **kwargs)
+            with get_tracer().span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,85 @@
+from typing import Callable
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+import orjson
+from starlette.types import ASGIApp, Message
+
+
+async def call(
+    app: ASGIApp,
+    method: str,
+    path: str,
+    body: bytes | dict | None = None,
+    headers: list[tuple[str, str]] = (),
+    client: str = "10.0.0.1",
+) -> tuple[int, dict[str, str], bytes]:
+    """Send one HTTP request to `app` and return its status, headers and body."""
+    if isinstance(body, dict):
+        body = orjson.dumps(body)
+    pending = [body] if body is not None else []
+    messages: list[Message] = []
+    done = asyncio.Event()
+
+    async def receive() -> Message:
+        if pending:
+            return {"type": "http.request", "body": pending.pop(), "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body"):
+            done.set()
+
+    path, _, query_string = path.partition("?")
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string.encode(),
+        "headers": [(b"content-type", b"application/json")]
+        + [(name.lower().encode(), value.encode()) for name, value in headers],
+        "http_version": "1.1",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "client": (client, 50000),
+        "root_path": "",
+    }
+    await app(scope, receive, send)
+    start = messages[0]
+    return (
+        start["status"],
+        {name.decode(): value.decode() for name, value in start["headers"]},
+        b"".join(message.get("body", b"") for message in messages[1:]),
+    )
+
+
+class EchoApp:
+    """App answering 200 with the body it received."""
+
+    def __init__(self) -> None:
+        self.bodies: list[bytes] = []
+
+    async def __call__(self, scope, receive, send) -> None:
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        self.bodies.append(b"".join(chunks))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": self.bodies[-1]})
+
+
+def auth_app(overrides: dict[Callable, Callable]) -> FastAPI:
+    """Auth API with its dependencies replaced by `overrides`."""
+    from api.v1.auth import router
+
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.include_router(router=router)
+    app.dependency_overrides.update(overrides)
+    return app
@@ -0,0 +1,58 @@
+"""Cost of issuing, resolving and refreshing session handles.
+
+Run with `pytest -m benchmark -s`.
+"""
+import asyncio
+import datetime
+import time
+
+import pytest
+
+from db.object.storage import ObjectStorage
+from service.crypt import CryptRepository
+from service.handle import FernetHandleCodec, HandleCodecInterface, OpaqueHandleCodec
+
+
+HANDLES = 20000
+
+
+def make_codec(mode: str) -> HandleCodecInterface:
+    if mode == "opaque":
+        return OpaqueHandleCodec(
+            handle_storage=ObjectStorage(
+                ttl=datetime.timedelta(minutes=5), max_records=None, overflow="reject"
+            )
+        )
+    return FernetHandleCodec(crypt_repo=CryptRepository())
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("mode", ["fernet", "opaque"])
+def test_handle_codec_operations(mode: str):
+    async def main() -> dict[str, float]:
+        codec = make_codec(mode)
+        phone_numbers = [f"79{index:09d}" for index in range(HANDLES)]
+        timings = {}
+
+        started_at = time.perf_counter()
+        handles = [await codec.issue(phone_number=phone_number) for phone_number in phone_numbers]
+        timings["issue"] = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        resolved = [await codec.resolve(handle=handle) for handle in handles]
+        timings["resolve"] = time.perf_counter() - started_at
+        assert resolved == phone_numbers
+
+        started_at = time.perf_counter()
+        for handle in handles:
+            await codec.refresh(handle=handle)
+        timings["refresh"] = time.perf_counter() - started_at
+        return timings
+
+    timings = asyncio.run(main())
+    print(
+        f"\n{mode}: "
+        + ", ".join(
+            f"{name} {elapsed / HANDLES * 1e6:.1f} us" for name, elapsed in timings.items()
+        )
+    )
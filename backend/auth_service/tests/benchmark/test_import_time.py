@@ -0,0 +1,59 @@
+"""Import time of the application against a budget.
+
+Imports `main` in fresh interpreters with `-X importtime` and prints the
+slowest imports of the median run. Run with `pytest -m benchmark -s`.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, "src")
+# The median import measured here is ~940 ms.
+BUDGET_MS = 1100
+RUNS = 7
+TOP = 10
+# Imported only when a non-default backend is configured.
+DEFERRED_MODULES = ("redis", "fakeredis")
+
+
+def measure(module: str) -> tuple[dict[str, tuple[int, int]], list[str]]:
+    """Cumulative microseconds and depth of every module imported by `module`,
+    and the deferred modules it imported anyway.
+    """
+    check = f"import sys; print(*(name for name in {DEFERRED_MODULES!r} if name in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}; {check}"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports[name.strip()] = (int(cumulative), depth)
+    return imports, result.stdout.split()
+
+
+@pytest.mark.benchmark
+def test_main_imports_within_budget():
+    runs = sorted((measure("main") for _ in range(RUNS)), key=lambda run: run[0]["main"][0])
+    imports, deferred = runs[RUNS // 2]
+    total = imports["main"][0] / 1000
+    slowest = sorted(
+        ((name, cumulative) for name, (cumulative, depth) in imports.items() if depth == 1),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    print()
+    for name, cumulative in slowest[:TOP]:
+        print(f"{cumulative / 1000:8.1f} ms  {name}")
+    print(f"Import of main took {total:.1f} ms (median), the budget is {BUDGET_MS} ms.")
+    assert deferred == []
+    assert total <= BUDGET_MS
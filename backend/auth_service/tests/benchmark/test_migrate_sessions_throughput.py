@@ -0,0 +1,34 @@
+"""Throughput of the migration of session files into the shared store.
+
+Run with `pytest -m benchmark -s`.
+"""
+import os
+import time
+
+import pytest
+
+from fakes import write_session_file
+from migrate_sessions import migrate
+from service.telegram.session import SharedSessionStore
+
+
+FILES = 2000
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("batch_size", [100, 1000, FILES])
+def test_migrate_throughput(tmp_path, batch_size: int):
+    session_dir = tmp_path / "session"
+    session_dir.mkdir()
+    for index in range(FILES):
+        write_session_file(session_dir=str(session_dir), phone_number=f"79{index:09d}")
+    store = SharedSessionStore(path=str(tmp_path / "shared.sqlite"))
+
+    started_at = time.perf_counter()
+    migrated = migrate(store=store, session_dir=str(session_dir), remove=True, batch_size=batch_size)
+    elapsed = time.perf_counter() - started_at
+    store.close()
+
+    print(f"\nbatch of {batch_size}: {migrated} files in {elapsed:.2f} s, {migrated / elapsed:.0f} files/s")
+    assert migrated == FILES
+    assert os.listdir(session_dir) == []
@@ -0,0 +1,79 @@
+"""RSS of the process under a burst of new auth flows over the capacity.
+
+Every fake client holds `CLIENT_SIZE` bytes while connected, so a leaked
+client shows in the RSS. Run with `pytest -m benchmark -s`.
+"""
+import asyncio
+import datetime
+import gc
+import os
+
+import pytest
+
+from db.object.storage import ObjectStorage
+from exception.storage import StorageCapacityExceeded
+from fakes import FakeClient, FakeNewConnectionProvider
+from schema.auth import SendCodeRequest
+from service.auth.send_code import facade
+from service.auth.send_code.facade import SendCodeService
+from service.handle import OpaqueHandleCodec
+from service.lock import KeyedLock, SingleFlight
+
+
+MAX_FLOWS = 200
+CLIENT_SIZE = 256 * 1024
+FLOWS = 20000
+CONCURRENCY = 500
+
+
+def rss() -> int:
+    with open("/proc/self/statm") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("overflow", ["reject", "evict"])
+def test_rss_is_bounded_by_capacity(monkeypatch, overflow: str):
+    monkeypatch.setattr(facade, "NewConnectionProcessionProvider", FakeNewConnectionProvider)
+    monkeypatch.setattr(FakeNewConnectionProvider, "client_size", CLIENT_SIZE)
+    FakeClient.connected = 0
+
+    async def main() -> tuple[int, int]:
+        storage = ObjectStorage(
+            ttl=datetime.timedelta(minutes=5), max_records=MAX_FLOWS, overflow=overflow
+        )
+        service = SendCodeService(
+            object_storage=storage,
+            keyed_lock=KeyedLock(),
+            single_flight=SingleFlight(),
+            handle_codec=OpaqueHandleCodec(
+                handle_storage=ObjectStorage(
+                    ttl=datetime.timedelta(minutes=5), max_records=None, overflow="reject"
+                )
+            ),
+        )
+        rejected = peak = 0
+        for start in range(0, FLOWS, CONCURRENCY):
+            results = await asyncio.gather(
+                *(
+                    service.send_code(SendCodeRequest(phone_number=f"79{index:09d}"))
+                    for index in range(start, start + CONCURRENCY)
+                ),
+                return_exceptions=True,
+            )
+            rejected += sum(isinstance(result, StorageCapacityExceeded) for result in results)
+            peak = max(peak, rss())
+            assert FakeClient.connected <= MAX_FLOWS
+        return rejected, peak
+
+    gc.collect()
+    baseline = rss()
+    rejected, peak = asyncio.run(main())
+    growth = peak - baseline
+    print(
+        f"\n{overflow}: {FLOWS} flows, {rejected} rejected, "
+        f"RSS {baseline / 2**20:.1f} MiB -> peak {peak / 2**20:.1f} MiB "
+        f"(+{growth / 2**20:.1f} MiB, capacity holds {MAX_FLOWS * CLIENT_SIZE / 2**20:.1f} MiB)"
+    )
+    # Stored clients plus one burst of clients connected before the capacity check.
+    assert growth < (MAX_FLOWS + CONCURRENCY) * CLIENT_SIZE * 1.5
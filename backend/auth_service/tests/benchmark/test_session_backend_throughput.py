@@ -0,0 +1,90 @@
+"""Auth flow throughput of per-file sessions against the shared session store.
+
+Every flow checks for a stored session, creates its client, saves the
+session after sign in, closes it and loads it back, like `send_code`,
+`validate_code` and the next `send_code` of the phone number do. Run with
+`pytest -m benchmark -s`.
+"""
+import asyncio
+import inspect
+import os
+import time
+
+from telethon.crypto import AuthKey
+import pytest
+
+from core.settings import TelegramCredential, settings
+from service.telegram.client.check import ClientCheckHandler
+from service.telegram.client.create.repository import ClientRepository
+from service.telegram.session import get_shared_session_store, session_store_lifespan
+
+
+FLOWS = 1000
+CONCURRENCY = 50
+CREDENTIAL = TelegramCredential(api_id=1, api_hash="hash")
+
+
+async def maybe_await(result) -> None:
+    if inspect.isawaitable(result):
+        await result
+
+
+async def auth_flow(repo, phone_number: str, auth_key: AuthKey) -> bytes:
+    assert not await ClientCheckHandler.check_file_existence(phone_number=phone_number)
+    client = await repo.simple(credential=CREDENTIAL, phone_number=phone_number)
+    client.session.set_dc(2, "149.154.167.51", 443)
+    client.session.auth_key = auth_key
+    await maybe_await(client.session.save())
+    await maybe_await(client.session.close())
+
+    assert await ClientCheckHandler.check_file_existence(phone_number=phone_number)
+    client = await repo.simple(credential=CREDENTIAL, phone_number=phone_number)
+    key = client.session.auth_key.key
+    await maybe_await(client.session.close())
+    return key
+
+
+def run_flows(backend: str) -> float:
+    repo = getattr(ClientRepository(), "shared" if backend == "shared" else "sqlite")
+    auth_key = AuthKey(data=os.urandom(256))
+
+    async def main() -> float:
+        semaphore = asyncio.Semaphore(CONCURRENCY)
+
+        async def run(index: int) -> bytes:
+            async with semaphore:
+                return await auth_flow(repo, f"79{index:09d}", auth_key)
+
+        async with session_store_lifespan():
+            started_at = time.perf_counter()
+            keys = await asyncio.gather(*(run(index) for index in range(FLOWS)))
+            elapsed = time.perf_counter() - started_at
+        assert keys == [auth_key.key] * FLOWS
+        return elapsed
+
+    return FLOWS / asyncio.run(main())
+
+
+@pytest.mark.benchmark
+def test_shared_store_against_session_files(tmp_path, monkeypatch, override_settings):
+    rates = {}
+    for backend in ("file", "shared"):
+        session_dir = tmp_path / backend
+        session_dir.mkdir()
+        override_settings("session", backend=backend)
+        monkeypatch.setattr(settings.path, "session_dir", str(session_dir))
+        monkeypatch.setattr(
+            settings.path, "shared_session_file", str(session_dir / "shared.sqlite")
+        )
+        get_shared_session_store.cache_clear()
+        try:
+            rates[backend] = run_flows(backend)
+        finally:
+            get_shared_session_store.cache_clear()
+
+    print(
+        f"\n{FLOWS} auth flows, {CONCURRENCY} at once: "
+        f"session files {rates['file']:.0f} flows/s, "
+        f"shared store {rates['shared']:.0f} flows/s "
+        f"(x{rates['shared'] / rates['file']:.1f})"
+    )
@@ -0,0 +1,77 @@
+"""Event loop lag while auth flows write their SQLite sessions.
+
+Every flow replays the session writes of a telethon login: DC switch,
+auth key, update state and commits. Inline sessions run them on the loop,
+threaded ones in the blocking executor. Run with `pytest -m benchmark -s`.
+"""
+import asyncio
+import datetime
+import os
+import statistics
+import time
+
+from telethon import utils
+from telethon.crypto import AuthKey
+from telethon.sessions import SQLiteSession
+from telethon.tl import types
+import pytest
+
+from service.telegram.session import ThreadedSQLiteSession
+
+
+FLOWS = 300
+CONCURRENCY = 50
+TICK = 0.001
+
+
+async def login(path: str, threaded: bool) -> None:
+    if threaded:
+        session = await ThreadedSQLiteSession.open(phone_number=path)
+    else:
+        session = SQLiteSession(path)
+    for dc_id in (2, 4):
+        await utils.maybe_async(session.set_dc(dc_id, "149.154.167.51", 443))
+        session.auth_key = AuthKey(data=os.urandom(256))
+        await utils.maybe_async(session.save())
+    state = types.updates.State(pts=1, qts=0, date=datetime.datetime.now(), seq=1, unread_count=0)
+    await utils.maybe_async(session.set_update_state(0, state))
+    await utils.maybe_async(session.save())
+    await utils.maybe_async(session.close())
+
+
+async def measure(session_dir: str, threaded: bool) -> list[float]:
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def tick() -> None:
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append(time.perf_counter() - started - TICK)
+
+    ticker = asyncio.create_task(tick())
+    for start in range(0, FLOWS, CONCURRENCY):
+        await asyncio.gather(
+            *(
+                login(os.path.join(session_dir, f"{threaded}-79{index:09d}"), threaded)
+                for index in range(start, start + CONCURRENCY)
+            )
+        )
+    done.set()
+    await ticker
+    return lags
+
+
+@pytest.mark.benchmark
+def test_threaded_sessions_keep_the_loop_responsive(tmp_path):
+    results = {}
+    for threaded in (False, True):
+        lags = asyncio.run(measure(str(tmp_path), threaded))
+        results[threaded] = lags
+        print(
+            f"\n{'threaded' if threaded else 'inline'}: {FLOWS} logins, "
+            f"loop lag p50 {statistics.median(lags) * 1000:.2f} ms, "
+            f"p99 {statistics.quantiles(lags, n=100, method="inclusive")[98] * 1000:.2f} ms, "
+            f"max {max(lags) * 1000:.2f} ms"
+        )
+    assert max(results[True]) < max(results[False])
@@ -0,0 +1,65 @@
+"""Overhead of tracing per request and per unsampled traced call.
+
+Requests go through TraceMiddleware to an app awaiting traced service
+calls, spans are kept in memory. Run with `pytest -m benchmark -s`.
+"""
+import asyncio
+import time
+
+import pytest
+
+from asgi import call
+from middleware import trace as trace_middleware
+from middleware.trace import TraceMiddleware
+from service.trace import Tracer, traced
+from service.trace import tracer as tracer_module
+
+
+REQUESTS = 20000
+CALLS = 200000
+
+
+@traced("service.call")
+async def service_call() -> None:
+    return None
+
+
+async def app(scope, receive, send) -> None:
+    await receive()
+    for _ in range(5):
+        await service_call()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def measure_requests(handler) -> float:
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        await call(handler, "POST", "/v1/auth/send_code", body={})
+    return (time.perf_counter() - started) / REQUESTS
+
+
+async def measure_calls() -> float:
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        await service_call()
+    return (time.perf_counter() - started) / CALLS
+
+
+@pytest.mark.benchmark
+def test_tracing_overhead(monkeypatch):
+    timings = {"off": asyncio.run(measure_requests(app))}
+    for sample_rate in (0.0, 0.01, 1.0):
+        tracer = Tracer(sample_rate=sample_rate, export=lambda span: None)
+        monkeypatch.setattr(trace_middleware, "get_tracer", lambda: tracer)
+        monkeypatch.setattr(tracer_module, "get_tracer", lambda: tracer)
+        timings[sample_rate] = asyncio.run(measure_requests(TraceMiddleware(app)))
+    per_call = asyncio.run(measure_calls())
+
+    print()
+    for name, seconds in timings.items():
+        print(f"tracing {name}: {seconds * 1e6:.1f} us per request")
+    print(f"unsampled traced call: {per_call * 1e9:.0f} ns")
+    # 1% sampling costs about as much as unsampled requests.
+    assert timings[0.01] < timings[0.0] * 1.25
+    assert per_call < 2e-6
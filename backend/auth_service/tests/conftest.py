@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+import pytest
+
+# Settings are read at import, they need the required variables set and
+# resolve the media directory against the working directory.
+for name, value in {
+    "UVICORN__HOST": "127.0.0.1",
+    "UVICORN__PORT": "8000",
+    "PROJECT__TITLE": "Auth API",
+    "PROJECT__DESCRIPTION": "Auth API under test",
+    "TELEGRAM__API_ID": "1",
+    "TELEGRAM__API_HASH": "hash",
+    "TELEGRAM__USE_PROXY": "false",
+    "PROXY__PORT": "9150",
+    "LOG__QUEUE": "false",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+def pytest_sessionstart(session) -> None:
+    """Keep media written by the tests out of the tree."""
+    os.chdir(tempfile.mkdtemp(prefix="auth_service_tests_"))
+    os.makedirs(os.path.join("media", "session"))
+
+
+@pytest.fixture
+def override_settings(monkeypatch):
+    """Replace a settings section by one built with the given values."""
+    from core.settings import settings
+
+    def override(name: str, **values) -> None:
+        section = type(getattr(settings, name))(**values)
+        monkeypatch.setitem(settings.__dict__, name, section)
+
+    return override
@@ -0,0 +1,134 @@
+import asyncio
+import datetime
+import os
+import sqlite3
+from types import SimpleNamespace
+
+import orjson
+
+
+class FakeClient:
+    """Telegram client holding `size` bytes while connected, like real buffers."""
+
+    connected = 0
+
+    def __init__(self, size: int = 0, dc_id: int = 2, connected: bool = True) -> None:
+        self.session = SimpleNamespace(dc_id=dc_id, save=lambda: None)
+        self.api_id = 1
+        self.disconnected = asyncio.get_running_loop().create_future()
+        self.buffer = None
+        self.sign_in_error: BaseException | None = None
+        self._size = size
+        self._connected = False
+        if connected:
+            self._connect()
+
+    def _connect(self) -> None:
+        self._connected = True
+        self.buffer = bytearray(self._size)
+        FakeClient.connected += 1
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def connect(self) -> None:
+        if not self._connected:
+            self._connect()
+
+    async def sign_in(self, **kwargs) -> None:
+        if self.sign_in_error is not None:
+            raise self.sign_in_error
+
+    async def disconnect(self) -> None:
+        if self._connected:
+            self._connected = False
+            self.buffer = None
+            FakeClient.connected -= 1
+        if not self.disconnected.done():
+            self.disconnected.set_result(None)
+
+
+class FakeNewConnectionProvider:
+    """Connect a `FakeClient` and send the code without telegram."""
+
+    STEP = "validate_code"
+
+    calls = 0
+    client_size = 0
+
+    def __init__(self, phone_number: str) -> None:
+        self.phone_number = phone_number
+
+    async def process(self):
+        FakeNewConnectionProvider.calls += 1
+        client = FakeClient(size=self.client_size)
+        await asyncio.sleep(0)
+        return {
+            "client": client,
+            "api_id": client.api_id,
+            "phone_code_hash": "hash",
+            "step": self.STEP,
+            "timestamp": datetime.datetime.now(),
+        }
+
+
+class FakeRecordSerializer:
+    """Serialize records like the client serializer, restoring disconnected fake clients."""
+
+    def __init__(self) -> None:
+        self.sign_in_error: BaseException | None = None
+
+    def dump(self, record: dict) -> bytes:
+        payload = {key: value for key, value in record.items() if key != "client"}
+        if "client" in record:
+            payload["session"] = "session"
+        return orjson.dumps(payload)
+
+    def load(self, value: bytes) -> dict:
+        record = orjson.loads(value)
+        if record.pop("session", None):
+            record["client"] = FakeClient(connected=False)
+            record["client"].sign_in_error = self.sign_in_error
+        record["timestamp"] = datetime.datetime.fromisoformat(record["timestamp"])
+        return record
+
+
+class FakeConnectivityGuard:
+    async def connect(self, client: FakeClient) -> None:
+        await client.connect()
+
+
+class FakeRPCLimiter:
+    async def call(self, client: FakeClient, func, *args, flood_key: str | None = None, **kwargs):
+        return await func(*args, **kwargs)
+
+
+class FakePostLoginPipeline:
+    """Take over clients of finished flows and disconnect them on `drain`."""
+
+    def __init__(self) -> None:
+        self.clients: list[FakeClient] = []
+
+    async def submit(self, phone_number: str, client: FakeClient) -> None:
+        self.clients.append(client)
+
+    async def drain(self) -> None:
+        while self.clients:
+            await self.clients.pop().disconnect()
+
+
+def write_session_file(session_dir: str, phone_number: str) -> str:
+    """Write a session file like the ones telethon creates per phone number."""
+    path = os.path.join(session_dir, f"{phone_number}.session")
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute(
+            "create table sessions (dc_id integer primary key, server_address text, "
+            "port integer, auth_key blob, takeout_id integer)"
+        )
+        connection.execute(
+            "insert into sessions values (2, '149.154.167.51', 443, ?, null)",
+            (os.urandom(256),),
+        )
+    connection.close()
+    return path
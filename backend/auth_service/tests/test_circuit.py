@@ -0,0 +1,197 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from exception.telegram import TelegramUnavailable
+from service.telegram.circuit import ConnectivityGuard
+from service.telegram.proxy import ProxyPool
+from service.telegram.proxy.strategy import STRATEGIES
+from service.telegram.rpc import TelegramActivity
+
+
+BASE_BACKOFF = 0.05
+
+
+class StandInClient:
+    """Telegram client connecting to a local TCP server instead of a DC."""
+
+    def __init__(self, port: int, connect: asyncio.Event | None = None) -> None:
+        self.session = SimpleNamespace(dc_id=2)
+        self.disconnected = asyncio.get_running_loop().create_future()
+        self._port = port
+        self._connect = connect
+        self._writer = None
+
+    def is_connected(self) -> bool:
+        return self._writer is not None
+
+    async def connect(self) -> None:
+        if self._connect is not None:
+            await self._connect.wait()
+        _, self._writer = await asyncio.open_connection("127.0.0.1", self._port)
+
+    async def disconnect(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if not self.disconnected.done():
+            self.disconnected.set_result(None)
+
+
+class StandInServer:
+    def __init__(self) -> None:
+        self.port = 0
+        self._server = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(
+            lambda reader, writer: writer.close(), "127.0.0.1", self.port
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+
+def make_guard(failure_threshold: int = 2) -> ConnectivityGuard:
+    return ConnectivityGuard(
+        failure_threshold=failure_threshold,
+        base_backoff=BASE_BACKOFF,
+        max_backoff=BASE_BACKOFF * 4,
+        connect_timeout=1,
+        proxy_pool=ProxyPool(
+            endpoints=[],
+            strategy=STRATEGIES["ewma"](),
+            alpha=0.3,
+            probe_timeout=1,
+            eject_failures=3,
+            eject_time=1,
+        ),
+        activity=TelegramActivity(),
+    )
+
+
+async def wait_half_open(guard: ConnectivityGuard) -> None:
+    while guard.stats()["dc:2"] == "open":
+        await asyncio.sleep(BASE_BACKOFF / 10)
+
+
+def test_trip_half_open_and_recover():
+    async def main():
+        server = StandInServer()
+        await server.start()
+        await server.stop()
+        guard = make_guard()
+
+        # Refused connections trip the circuit after the threshold.
+        for _ in range(2):
+            with pytest.raises(TelegramUnavailable):
+                await guard.connect(StandInClient(port=server.port))
+        assert guard.stats() == {"dc:2": "open"}
+
+        # While open, calls fail fast without connecting.
+        client = StandInClient(port=server.port)
+        with pytest.raises(TelegramUnavailable) as error:
+            await guard.connect(client)
+        assert error.value.seconds >= 1
+        assert not client.disconnected.done()
+
+        # A failed probe opens the circuit again.
+        await wait_half_open(guard)
+        with pytest.raises(TelegramUnavailable):
+            await guard.connect(StandInClient(port=server.port))
+        assert guard.stats() == {"dc:2": "open"}
+
+        # A successful probe closes it once the server is back.
+        await server.start()
+        await wait_half_open(guard)
+        client = StandInClient(port=server.port)
+        await guard.connect(client)
+        assert client.is_connected()
+        assert guard.stats() == {"dc:2": "closed"}
+        await client.disconnect()
+        await server.stop()
+
+    asyncio.run(main())
+
+
+def test_half_open_lets_one_probe_through():
+    async def main():
+        server = StandInServer()
+        await server.start()
+        await server.stop()
+        guard = make_guard(failure_threshold=1)
+        with pytest.raises(TelegramUnavailable):
+            await guard.connect(StandInClient(port=server.port))
+        await server.start()
+        await wait_half_open(guard)
+
+        release = asyncio.Event()
+        probe = asyncio.create_task(guard.connect(StandInClient(port=server.port, connect=release)))
+        await asyncio.sleep(0)
+        with pytest.raises(TelegramUnavailable):
+            await guard.connect(StandInClient(port=server.port))
+        release.set()
+        await probe
+        assert guard.stats() == {"dc:2": "closed"}
+        await server.stop()
+
+    asyncio.run(main())
+
+
+class BrokenClient(StandInClient):
+    async def connect(self) -> None:
+        raise RuntimeError("Unexpected failure.")
+
+
+def test_cancelled_probe_lets_next_call_probe():
+    async def main():
+        server = StandInServer()
+        await server.start()
+        await server.stop()
+        guard = make_guard(failure_threshold=1)
+        with pytest.raises(TelegramUnavailable):
+            await guard.connect(StandInClient(port=server.port))
+        await server.start()
+        await wait_half_open(guard)
+
+        probe = asyncio.create_task(
+            guard.connect(StandInClient(port=server.port, connect=asyncio.Event()))
+        )
+        await asyncio.sleep(0)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        client = StandInClient(port=server.port)
+        await guard.connect(client)
+        assert guard.stats() == {"dc:2": "closed"}
+        await client.disconnect()
+        await server.stop()
+
+    asyncio.run(main())
+
+
+def test_failed_probe_with_unexpected_error_lets_next_call_probe():
+    async def main():
+        server = StandInServer()
+        await server.start()
+        await server.stop()
+        guard = make_guard(failure_threshold=1)
+        with pytest.raises(TelegramUnavailable):
+            await guard.connect(StandInClient(port=server.port))
+        await server.start()
+        await wait_half_open(guard)
+
+        with pytest.raises(RuntimeError):
+            await guard.connect(BrokenClient(port=server.port))
+
+        client = StandInClient(port=server.port)
+        await guard.connect(client)
+        assert guard.stats() == {"dc:2": "closed"}
+        await client.disconnect()
+        await server.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from exception.telegram import TelegramUnavailable
+from fakes import FakeClient
+from service.telegram.client.create.context import ClientCreateContext
+
+
+PHONE_NUMBER = "79000000000"
+
+
+class UnreachableCheckHandler:
+    """Check handler of a stored session while telegram cannot be reached."""
+
+    @staticmethod
+    async def check_file_existence(phone_number: str) -> bool:
+        return True
+
+    @staticmethod
+    async def check_connection(client: FakeClient) -> None:
+        raise TelegramUnavailable("Telegram is unavailable.", seconds=5)
+
+    @staticmethod
+    async def disconnect_from_telegram_server(client: FakeClient) -> None:
+        await client.disconnect()
+
+
+class StoredSessionRepository:
+    def __init__(self) -> None:
+        self.clients: list[FakeClient] = []
+
+    async def simple(self, credential, phone_number: str) -> FakeClient:
+        self.clients.append(FakeClient(connected=False))
+        return self.clients[-1]
+
+
+def make_context() -> tuple[ClientCreateContext, StoredSessionRepository]:
+    repo = StoredSessionRepository()
+    context = ClientCreateContext(
+        client_repo=SimpleNamespace(sqlite=repo, shared=repo),
+        client_check_handler=UnreachableCheckHandler(),
+        client_pool=None,
+        dc_predictor=None,
+        authorized_index=None,
+        credential_pool=SimpleNamespace(pick=lambda: None),
+        proxy_pool=None,
+    )
+    return context, repo
+
+
+@pytest.mark.parametrize("method", ["create", "check_authorized"])
+def test_unreachable_telegram_closes_stored_session(override_settings, method: str):
+    override_settings("auth_index", enabled=False)
+    override_settings("telegram", use_proxy=False)
+
+    async def main():
+        context, repo = make_context()
+        with pytest.raises(TelegramUnavailable):
+            await getattr(context, method)(phone_number=PHONE_NUMBER)
+        assert len(repo.clients) == 1
+        assert repo.clients[0].disconnected.done()
+
+    asyncio.run(main())
@@ -0,0 +1,163 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from fakes import FakeClient, FakeConnectivityGuard
+from service.telegram.client.pool import ClientPool
+from service.telegram.client.pool import pool as pool_module
+
+
+class PingedClient(FakeClient):
+    """Fake client answering pings once `pong` is set, or failing when `broken`."""
+
+    def __init__(self, pong: asyncio.Event) -> None:
+        super().__init__(connected=False)
+        self.pong = pong
+        self.broken = False
+        self.pings = 0
+
+    async def __call__(self, request) -> None:
+        self.pings += 1
+        await self.pong.wait()
+        if self.broken:
+            raise ConnectionError("Connection reset.")
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch, override_settings) -> Clock:
+    override_settings("telegram", use_proxy=False)
+    monkeypatch.setattr(pool_module, "get_connectivity_guard", FakeConnectivityGuard)
+    clock = Clock()
+    monkeypatch.setattr(pool_module, "time", clock)
+    FakeClient.connected = 0
+    return clock
+
+
+def make_pool(size: int, pong: asyncio.Event) -> tuple[ClientPool, list[PingedClient]]:
+    clients: list[PingedClient] = []
+
+    def simple(credential) -> PingedClient:
+        clients.append(PingedClient(pong=pong))
+        return clients[-1]
+
+    pool = ClientPool(
+        client_repo=SimpleNamespace(string=SimpleNamespace(simple=simple)),
+        credential_pool=SimpleNamespace(pick=lambda: None),
+        proxy_pool=None,
+        size=size,
+        max_idle=60,
+        health_check_interval=30,
+    )
+    return pool, clients
+
+
+class NoCredentialPool:
+    def pick(self):
+        raise LookupError("No telegram credentials.")
+
+
+def test_failed_client_creation_does_not_hold_warming_slots(override_settings):
+    override_settings("telegram", use_proxy=False)
+
+    async def main():
+        pool = ClientPool(
+            client_repo=SimpleNamespace(),
+            credential_pool=NoCredentialPool(),
+            proxy_pool=None,
+            size=3,
+            max_idle=60,
+            health_check_interval=60,
+        )
+        for _ in range(2):
+            with pytest.raises(LookupError):
+                await pool.refill()
+            assert pool._warming == 0
+
+    asyncio.run(main())
+
+
+def test_refill_warms_up_to_size_and_acquire_drains(clock):
+    async def main():
+        pool, clients = make_pool(size=3, pong=asyncio.Event())
+        await pool.refill()
+        await pool.refill()
+        assert pool.idle == len(clients) == FakeClient.connected == 3
+
+        acquired = [await pool.acquire() for _ in range(3)]
+        assert acquired == clients
+        assert await pool.acquire() is None
+
+        await pool.refill()
+        assert pool.idle == 3
+        assert len(clients) == 6
+
+    asyncio.run(main())
+
+
+def test_clients_idle_over_max_idle_are_evicted(clock):
+    async def main():
+        pool, clients = make_pool(size=2, pong=asyncio.Event())
+        await pool.refill()
+        clock.now += 61
+        assert await pool.acquire() is None
+        assert pool.idle == FakeClient.connected == 0
+
+        pong = asyncio.Event()
+        pong.set()
+        pool, clients = make_pool(size=2, pong=pong)
+        await pool.refill()
+        clock.now += 61
+        await pool.check_health()
+        assert pool.idle == FakeClient.connected == 0
+
+    asyncio.run(main())
+
+
+def test_health_check_drops_unhealthy_clients(clock):
+    async def main():
+        pong = asyncio.Event()
+        pong.set()
+        pool, clients = make_pool(size=3, pong=pong)
+        await pool.refill()
+        clients[1].broken = True
+        await pool.check_health()
+        assert [client.pings for client in clients] == [1, 1, 1]
+        assert pool.idle == 2
+        assert not clients[1].is_connected()
+        assert [await pool.acquire() for _ in range(2)] == [clients[0], clients[2]]
+
+    asyncio.run(main())
+
+
+def test_clients_stay_acquirable_while_pinged(clock):
+    async def main():
+        pong = asyncio.Event()
+        pool, clients = make_pool(size=3, pong=pong)
+        await pool.refill()
+        clients[0].broken = True
+        health_check = asyncio.create_task(pool.check_health())
+        while not all(client.pings for client in clients):
+            await asyncio.sleep(0)
+
+        # Pings in flight neither drain the pool nor make room for extra clients.
+        assert await pool.acquire() is clients[0]
+        await pool.refill()
+        assert pool.idle == 3
+        assert len(clients) == 4
+
+        pong.set()
+        await health_check
+        # The broken client belongs to its flow now.
+        assert clients[0].is_connected()
+        assert pool.idle == 3
+
+    asyncio.run(main())
@@ -0,0 +1,404 @@
+from functools import partial
+import asyncio
+import socket
+
+import orjson
+import pytest
+import uvicorn
+
+from middleware.cluster import ClusterMiddleware
+from service.cluster import ClusterRouter, Peer
+
+
+SECRET = "secret"
+
+
+@pytest.fixture(autouse=True)
+def cluster_mode(override_settings):
+    override_settings("cluster", enabled=True, secret=SECRET)
+
+
+class NodeApp:
+    """Auth API stand-in answering with the id of the node serving it.
+
+    Batches get one NDJSON line per phone number.
+    """
+
+    def __init__(self, node_id: str) -> None:
+        self.node_id = node_id
+        self.bodies: list[bytes] = []
+
+    async def __call__(self, scope, receive, send) -> None:
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        self.bodies.append(body)
+        if scope["path"].endswith("/batch"):
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/x-ndjson")],
+            })
+            for phone_number in orjson.loads(body)["phone_numbers"]:
+                line = orjson.dumps({"phone_number": phone_number, "node": self.node_id})
+                await send({"type": "http.response.body", "body": line + b"\n", "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json")],
+        })
+        await send({"type": "http.response.body", "body": orjson.dumps({"node": self.node_id})})
+
+
+def listen() -> socket.socket:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    return sock
+
+
+def url_of(sock: socket.socket) -> str:
+    return "http://127.0.0.1:%s" % sock.getsockname()[1]
+
+
+def make_router(node_id: str, peers: dict[str, str]) -> ClusterRouter:
+    router = ClusterRouter(
+        node_id=node_id,
+        vnodes=64,
+        make_peer=partial(
+            Peer, pool_size=4, idle_timeout=4, connect_timeout=1, response_timeout=2
+        ),
+    )
+    router.configure(peers=peers, draining=())
+    return router
+
+
+class Cluster:
+    """Nodes served by uvicorn in the running event loop."""
+
+    def __init__(self, count: int) -> None:
+        self.sockets = {f"node-{index}": listen() for index in range(1, count + 1)}
+        self.urls = {node_id: url_of(sock) for node_id, sock in self.sockets.items()}
+        self.apps = {node_id: NodeApp(node_id) for node_id in self.sockets}
+        self.routers = {node_id: make_router(node_id, self.urls) for node_id in self.sockets}
+        self.servers: dict[str, tuple[uvicorn.Server, asyncio.Task]] = {}
+
+    async def start(self, node_id: str) -> None:
+        server = uvicorn.Server(
+            uvicorn.Config(
+                ClusterMiddleware(self.apps[node_id], router=self.routers[node_id]),
+                lifespan="off",
+                log_level="warning",
+            )
+        )
+        task = asyncio.create_task(server.serve(sockets=[self.sockets[node_id]]))
+        while not server.started:
+            await asyncio.sleep(0.01)
+        self.servers[node_id] = server, task
+
+    async def stop(self, node_id: str) -> None:
+        server, task = self.servers.pop(node_id)
+        server.should_exit = True
+        await task
+
+    async def __aenter__(self) -> "Cluster":
+        for node_id in self.sockets:
+            await self.start(node_id)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        for node_id in list(self.servers):
+            await self.stop(node_id)
+        for router in self.routers.values():
+            router.close()
+
+
+async def post(
+    url: str, path: str, payload: dict, headers: dict[str, str] | None = None
+) -> tuple[int, dict]:
+    """POST JSON on a new connection and return the status and JSON body."""
+    status, content = await post_raw(url, path, payload, headers)
+    return status, orjson.loads(content)
+
+
+async def post_lines(url: str, path: str, payload: dict) -> tuple[int, list[dict]]:
+    """POST JSON on a new connection and return the status and NDJSON lines."""
+    status, content = await post_raw(url, path, payload)
+    return status, [orjson.loads(line) for line in content.splitlines()]
+
+
+async def post_raw(
+    url: str, path: str, payload: dict, headers: dict[str, str] | None = None
+) -> tuple[int, bytes]:
+    host, port = url.removeprefix("http://").split(":")
+    reader, writer = await asyncio.open_connection(host, int(port))
+    body = orjson.dumps(payload)
+    head = [
+        f"POST {path} HTTP/1.1",
+        f"host: {host}",
+        "connection: close",
+        "content-type: application/json",
+        f"content-length: {len(body)}",
+        *(f"{name}: {value}" for name, value in (headers or {}).items()),
+    ]
+    writer.write("\r\n".join(head).encode() + b"\r\n\r\n" + body)
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    if b"transfer-encoding: chunked" in head.lower():
+        chunks = b""
+        while True:
+            size, _, content = content.partition(b"\r\n")
+            if not int(size, 16):
+                break
+            chunks += content[: int(size, 16)]
+            content = content[int(size, 16) + 2 :]
+        content = chunks
+    return int(head.split(b" ", 2)[1]), content
+
+
+def phone_numbers(router: ClusterRouter, owner: str, count: int) -> list[str]:
+    numbers = (f"79{index:09d}" for index in range(10000))
+    return [number for number in numbers if router.owners(number)[0] == owner][:count]
+
+
+def test_flows_are_served_by_their_owner_node():
+    async def main():
+        async with Cluster(count=3) as cluster:
+            for node_id in cluster.urls:
+                for phone_number in phone_numbers(cluster.routers["node-1"], node_id, 5):
+                    for entry in cluster.urls.values():
+                        status, payload = await post(
+                            entry, "/v1/auth/send_code", {"phone_number": phone_number}
+                        )
+                        assert status == 200
+                        assert payload == {"node": node_id}
+            # Every request reached one node only.
+            assert [len(app.bodies) for app in cluster.apps.values()] == [15, 15, 15]
+
+            status, payload = await post(
+                cluster.urls["node-1"], "/v1/auth/validate_code", {"session": "node-3.token"}
+            )
+            assert (status, payload) == (200, {"node": "node-3"})
+
+    asyncio.run(main())
+
+
+def test_batch_is_split_by_owner_nodes():
+    async def main():
+        async with Cluster(count=3) as cluster:
+            router = cluster.routers["node-1"]
+            owners = {
+                phone_number: node_id
+                for node_id in cluster.urls
+                for phone_number in phone_numbers(router, node_id, 3)
+            }
+            status, lines = await post_lines(
+                cluster.urls["node-1"], "/v1/auth/send_code/batch", {"phone_numbers": list(owners)}
+            )
+            assert status == 200
+            assert {line["phone_number"]: line["node"] for line in lines} == owners
+            assert len(lines) == len(owners)
+            for node_id, app in cluster.apps.items():
+                assert [orjson.loads(body)["phone_numbers"] for body in app.bodies] == [
+                    [phone_number for phone_number, owner in owners.items() if owner == node_id]
+                ]
+
+            # Phone numbers of a stopped node go to their next owner.
+            await cluster.stop("node-2")
+            batch = phone_numbers(router, "node-2", 3)
+            status, lines = await post_lines(
+                cluster.urls["node-1"], "/v1/auth/send_code/batch", {"phone_numbers": batch}
+            )
+            assert status == 200
+            assert {line["phone_number"]: line["node"] for line in lines} == {
+                phone_number: router.owners(phone_number)[1] for phone_number in batch
+            }
+
+    asyncio.run(main())
+
+
+def test_batch_part_dropped_by_its_node_is_reported():
+    async def main():
+        dropping = DroppingNode()
+        app = NodeApp("node-1")
+        router = make_router("node-1", {"node-1": "http://127.0.0.1:1", "node-2": await dropping.start()})
+        server = uvicorn.Server(
+            uvicorn.Config(ClusterMiddleware(app, router=router), lifespan="off", log_level="warning")
+        )
+        sock = listen()
+        task = asyncio.create_task(server.serve(sockets=[sock]))
+        while not server.started:
+            await asyncio.sleep(0.01)
+
+        local = phone_numbers(router, "node-1", 2)
+        remote = phone_numbers(router, "node-2", 2)
+        # The first request of the node's connection is answered, the batch comes next.
+        await post(url_of(sock), "/v1/auth/send_code", {"phone_number": remote[0]})
+        status, lines = await post_lines(
+            url_of(sock), "/v1/auth/send_code/batch", {"phone_numbers": local + remote}
+        )
+        assert status == 200
+        assert sorted(lines, key=lambda line: line["phone_number"]) == sorted(
+            [{"phone_number": phone_number, "node": "node-1"} for phone_number in local]
+            + [{"phone_number": phone_number, "error": "Internal"} for phone_number in remote],
+            key=lambda line: line["phone_number"],
+        )
+        assert len(dropping.requests) == 2
+
+        server.should_exit = True
+        await task
+        router.close()
+        dropping.server.close()
+
+    asyncio.run(main())
+
+
+def test_forged_node_header_does_not_skip_routing():
+    async def main():
+        async with Cluster(count=2) as cluster:
+            phone_number = phone_numbers(cluster.routers["node-1"], "node-2", 1)[0]
+            for headers in (
+                {"x-cluster-node": "node-2"},
+                {"x-cluster-node": "node-2", "x-cluster-token": "guess"},
+            ):
+                status, payload = await post(
+                    cluster.urls["node-1"],
+                    "/v1/auth/send_code",
+                    {"phone_number": phone_number},
+                    headers=headers,
+                )
+                assert (status, payload) == (200, {"node": "node-2"})
+            assert cluster.apps["node-1"].bodies == []
+
+            # Nodes are trusted by the shared secret.
+            status, payload = await post(
+                cluster.urls["node-1"],
+                "/v1/auth/send_code",
+                {"phone_number": phone_number},
+                headers={"x-cluster-node": "node-2", "x-cluster-token": SECRET},
+            )
+            assert (status, payload) == (200, {"node": "node-1"})
+
+    asyncio.run(main())
+
+
+def test_flows_of_a_stopped_node_move_to_the_next_owner():
+    async def main():
+        async with Cluster(count=3) as cluster:
+            router = cluster.routers["node-1"]
+            phone_number = phone_numbers(router, "node-2", 1)[0]
+            await cluster.stop("node-2")
+            status, payload = await post(
+                cluster.urls["node-1"], "/v1/auth/send_code", {"phone_number": phone_number}
+            )
+            assert status == 200
+            assert payload == {"node": router.owners(phone_number)[1]}
+
+            # The node holding a flow is not replaced.
+            status, _ = await post(
+                cluster.urls["node-1"], "/v1/auth/validate_code", {"session": "node-2.token"}
+            )
+            assert status == 503
+
+    asyncio.run(main())
+
+
+class DroppingNode:
+    """Node answering the first request of a connection and dropping the next ones."""
+
+    def __init__(self) -> None:
+        self.requests: list[bytes] = []
+        self.server: asyncio.Server | None = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        answered = False
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError:
+                break
+            length = next(
+                int(line.split(b":")[1])
+                for line in head.split(b"\r\n")
+                if line.lower().startswith(b"content-length")
+            )
+            self.requests.append(head.split(b" ", 1)[0] + await reader.readexactly(length))
+            if answered:
+                break
+            answered = True
+            body = orjson.dumps({"node": "node-2"})
+            writer.write(
+                b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\n"
+                b"content-length: %d\r\n\r\n%s" % (len(body), body)
+            )
+            await writer.drain()
+        writer.close()
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return "http://127.0.0.1:%s" % self.server.sockets[0].getsockname()[1]
+
+
+def test_request_dropped_mid_exchange_is_not_sent_again():
+    async def main():
+        dropping = DroppingNode()
+        app = NodeApp("node-1")
+        router = make_router("node-1", {"node-1": "http://127.0.0.1:1", "node-2": await dropping.start()})
+        middleware = ClusterMiddleware(app, router=router)
+        sock = listen()
+        server = uvicorn.Server(uvicorn.Config(middleware, lifespan="off", log_level="warning"))
+        task = asyncio.create_task(server.serve(sockets=[sock]))
+        while not server.started:
+            await asyncio.sleep(0.01)
+
+        phone_number = phone_numbers(router, "node-2", 1)[0]
+        first, second = [
+            await post(url_of(sock), "/v1/auth/send_code", {"phone_number": phone_number})
+            for _ in range(2)
+        ]
+        assert first == (200, {"node": "node-2"})
+        # The node may have sent the code, the request goes neither again nor elsewhere.
+        assert second[0] == 502
+        assert len(dropping.requests) == 2
+        assert app.bodies == []
+
+        server.should_exit = True
+        await task
+        router.close()
+        dropping.server.close()
+
+    asyncio.run(main())
+
+
+def test_idempotent_request_dropped_on_reused_connection_is_retried():
+    async def main():
+        dropping = DroppingNode()
+        peer = Peer(
+            node_id="node-2",
+            url=await dropping.start(),
+            pool_size=1,
+            idle_timeout=4,
+            connect_timeout=1,
+            response_timeout=2,
+        )
+        for _ in range(2):
+            messages = []
+
+            async def send(message) -> None:
+                messages.append(message)
+
+            await peer.forward(
+                method="GET", target=b"/v1/auth/send_code/events/x", headers=[], body=b"", send=send
+            )
+            assert messages[0]["status"] == 200
+        # The second request was dropped on the reused connection and sent on a new one.
+        assert len(dropping.requests) == 3
+        peer.close()
+        dropping.server.close()
+
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+import pytest
+
+from core.settings import TelegramCredential
+from service.telegram.credential import CredentialPool
+from service.telegram.credential import pool as pool_module
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class FakeLimiter:
+    def __init__(self) -> None:
+        self.waits: dict[int, float] = {}
+
+    def wait_time(self, api_id: int) -> float:
+        return self.waits.get(api_id, 0.0)
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(pool_module, "time", clock)
+    return clock
+
+
+def make_pool(limiter: FakeLimiter, window: float = 60) -> CredentialPool:
+    return CredentialPool(
+        credentials=[
+            TelegramCredential(api_id=1, api_hash="one", weight=1),
+            TelegramCredential(api_id=2, api_hash="two", weight=3),
+        ],
+        window=window,
+        rpc_limiter=limiter,
+    )
+
+
+def assigned(pool: CredentialPool) -> dict[int, int]:
+    return {stats["api_id"]: stats["recent"] for stats in pool.stats()}
+
+
+def test_flows_are_split_by_weight_within_the_window(clock):
+    pool = make_pool(FakeLimiter())
+    for _ in range(40):
+        pool.acquire()
+        clock.now += 1
+    assert assigned(pool) == {1: 10, 2: 30}
+
+    # Flows older than the window no longer count.
+    clock.now += 61
+    assert assigned(pool) == {1: 0, 2: 0}
+    assert [stats["assigned"] for stats in pool.stats()] == [10, 30]
+
+
+def test_credential_in_flood_wait_is_skipped(clock):
+    limiter = FakeLimiter()
+    pool = make_pool(limiter)
+    limiter.waits[2] = 5.0
+    assert {pool.acquire().api_id for _ in range(10)} == {1}
+
+    # The shortest wait wins when every credential waits.
+    limiter.waits[1] = 10.0
+    assert pool.pick().api_id == 2
+    assert next(stats for stats in pool.stats() if stats["api_id"] == 2)["wait"] == 5.0
+
+
+def test_released_flows_free_their_credential(clock):
+    pool = make_pool(FakeLimiter())
+    for _ in range(4):
+        pool.acquire(api_id=1)
+    pool.release(api_id=1)
+    pool.release(api_id=1)
+    assert assigned(pool) == {1: 2, 2: 0}
+    assert [stats["assigned"] for stats in pool.stats()] == [2, 0]
+
+    # Releasing more than assigned, or an unknown credential, is ignored.
+    for api_id in (1, 1, 1, 9):
+        pool.release(api_id=api_id)
+    assert assigned(pool) == {1: 0, 2: 0}
+    assert [stats["assigned"] for stats in pool.stats()] == [0, 0]
+    assert pool.get(api_id=9).api_id == 1
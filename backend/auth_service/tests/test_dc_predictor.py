@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import pytest
+
+from service.telegram.dc import DCPredictor
+from service.telegram.dc.trie import PrefixTrie
+
+
+def session(dc_id: int) -> SimpleNamespace:
+    return SimpleNamespace(dc_id=dc_id, server_address=f"10.0.0.{dc_id}", port=443)
+
+
+def test_longest_prefix_with_enough_samples_wins():
+    trie = PrefixTrie(max_depth=5)
+    for _ in range(3):
+        trie.insert(phone_number="79000000000", dc_id=2)
+    trie.insert(phone_number="79100000000", dc_id=4)
+    trie.insert(phone_number="79100000001", dc_id=4)
+
+    assert trie.predict(phone_number="79000000009", min_samples=3) == 2
+    # "791" has two samples only, its shorter prefix "79" has five.
+    assert trie.predict(phone_number="79100000009", min_samples=3) == 2
+    assert trie.predict(phone_number="79100000009", min_samples=2) == 4
+    assert trie.predict(phone_number="19000000000", min_samples=1) is None
+
+
+def test_prefixes_are_capped_at_max_depth():
+    trie = PrefixTrie(max_depth=2)
+    trie.insert(phone_number="79000000000", dc_id=2)
+    trie.insert(phone_number="79900000000", dc_id=4)
+    trie.insert(phone_number="79900000001", dc_id=4)
+    assert trie.dump()["children"]["7"]["children"]["9"]["children"] == {}
+    # Digits past the depth do not tell the phone numbers apart.
+    assert trie.predict(phone_number="79000000000", min_samples=1) == 4
+
+
+def test_predictor_counts_hits_misses_and_unknown(tmp_path):
+    predictor = DCPredictor(path=str(tmp_path / "dc.json"), max_depth=5, min_samples=2)
+    assert predictor.predict(phone_number="79000000000") is None
+    predictor.observe(prediction=None, dc_id=2)
+
+    for index in range(2):
+        predictor.record(phone_number=f"7900000000{index}", session=session(2))
+    prediction = predictor.predict(phone_number="79000000009")
+    assert (prediction.dc_id, prediction.server_address, prediction.port) == (2, "10.0.0.2", 443)
+    predictor.observe(prediction=prediction, dc_id=2)
+    predictor.observe(prediction=prediction, dc_id=2)
+    predictor.observe(prediction=prediction, dc_id=4)
+    assert predictor.stats() == {"hits": 2, "misses": 1, "unknown": 1, "hit_rate": 2 / 3}
+
+
+def test_predictor_survives_save_and_load(tmp_path):
+    path = str(tmp_path / "dc.json")
+    predictor = DCPredictor(path=path, max_depth=5, min_samples=1)
+    predictor.record(phone_number="79000000000", session=session(2))
+    predictor.record(phone_number="38000000000", session=session(4))
+    payload = predictor.dump()
+    assert predictor.dump() is None
+    predictor.write(payload)
+
+    loaded = DCPredictor(path=path, max_depth=5, min_samples=1)
+    loaded.load()
+    assert loaded.predict(phone_number="79000000001").dc_id == 2
+    assert loaded.predict(phone_number="38000000001").server_address == "10.0.0.4"
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b"{not json", b"[]", b'{"trie": {"counts": {}, "children": {}}}', b'{"trie": 1, "addresses": {}}'],
+)
+def test_corrupt_file_keeps_predictor_empty(tmp_path, content: bytes):
+    path = tmp_path / "dc.json"
+    path.write_bytes(content)
+    predictor = DCPredictor(path=str(path), max_depth=5, min_samples=1)
+    predictor.load()
+    assert predictor.predict(phone_number="79000000000") is None
+    assert predictor.dump() is None
@@ -0,0 +1,110 @@
+import asyncio
+import datetime
+
+from db.object.storage import ObjectStorage
+from telethon import errors
+
+from fakes import (
+    FakeClient,
+    FakeConnectivityGuard,
+    FakePostLoginPipeline,
+    FakeRPCLimiter,
+)
+from schema.auth import ValidateCodeRequest
+from service.auth import ValidateCodeService
+from service.handle import NodeHandleCodec, OpaqueHandleCodec
+from service.lock import KeyedLock
+
+
+PHONE_NUMBER = "79000000000"
+TTL = datetime.timedelta(seconds=0.2)
+
+
+def test_refreshed_handle_outlives_its_first_ttl():
+    async def main():
+        handle_storage = ObjectStorage(ttl=TTL, max_records=None, overflow="reject")
+        codec = OpaqueHandleCodec(handle_storage=handle_storage)
+        refreshed = await codec.issue(phone_number=PHONE_NUMBER)
+        stale = await codec.issue(phone_number=PHONE_NUMBER)
+
+        await asyncio.sleep(TTL.total_seconds() / 2)
+        await codec.refresh(handle=refreshed)
+        await asyncio.sleep(TTL.total_seconds() * 0.75)
+        assert len(handle_storage.pop_expired(limit=10)) == 1
+
+        assert await codec.resolve(handle=refreshed) == PHONE_NUMBER
+        assert await codec.resolve(handle=stale) is None
+
+    asyncio.run(main())
+
+
+def test_refresh_of_revoked_handle_does_not_restore_it():
+    async def main():
+        codec = NodeHandleCodec(
+            handle_codec=OpaqueHandleCodec(
+                handle_storage=ObjectStorage(ttl=TTL, max_records=None, overflow="reject")
+            ),
+            node_id="node-1",
+        )
+        handle = await codec.issue(phone_number=PHONE_NUMBER)
+        await codec.revoke(handle=handle)
+        await codec.refresh(handle=handle)
+        assert await codec.resolve(handle=handle) is None
+
+    asyncio.run(main())
+
+
+def test_handles_take_no_slot_of_the_flow_capacity():
+    async def main():
+        storage = ObjectStorage(ttl=TTL, max_records=2, overflow="reject")
+        handle_storage = ObjectStorage(ttl=TTL, max_records=None, overflow="reject")
+        codec = OpaqueHandleCodec(handle_storage=handle_storage)
+        handles = []
+        for index in range(2):
+            handles.append(await codec.issue(phone_number=f"{PHONE_NUMBER}{index}"))
+            await storage.put_record(
+                key=f"{PHONE_NUMBER}{index}",
+                record={"client": FakeClient(), "timestamp": datetime.datetime.now()},
+            )
+        assert len(storage.storage) == 2
+        for index, handle in enumerate(handles):
+            assert await codec.resolve(handle=handle) == f"{PHONE_NUMBER}{index}"
+
+    asyncio.run(main())
+
+
+def test_password_step_refreshes_handle():
+    async def main():
+        storage = ObjectStorage(ttl=TTL, max_records=10, overflow="reject")
+        handle_storage = ObjectStorage(ttl=TTL, max_records=None, overflow="reject")
+        codec = OpaqueHandleCodec(handle_storage=handle_storage)
+        service = ValidateCodeService(
+            object_storage=storage,
+            handle_codec=codec,
+            keyed_lock=KeyedLock(),
+            post_login_pipeline=FakePostLoginPipeline(),
+            rpc_limiter=FakeRPCLimiter(),
+            connectivity_guard=FakeConnectivityGuard(),
+        )
+        handle = await codec.issue(phone_number=PHONE_NUMBER)
+        client = FakeClient()
+        client.sign_in_error = errors.SessionPasswordNeededError(request=None)
+        await storage.put_record(
+            key=PHONE_NUMBER,
+            record={
+                "client": client,
+                "handle": handle,
+                "step": "validate_code",
+                "timestamp": datetime.datetime.now(),
+            },
+        )
+
+        await asyncio.sleep(TTL.total_seconds() / 2)
+        response = await service.validate(ValidateCodeRequest(session=handle, code=12345))
+        assert response.step == "validate_password"
+        await asyncio.sleep(TTL.total_seconds() * 0.75)
+        assert handle_storage.pop_expired(limit=10) == []
+        assert storage.pop_expired(limit=10) == []
+        assert await codec.resolve(handle=handle) == PHONE_NUMBER
+
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+import asyncio
+
+from fastapi import HTTPException
+import pytest
+
+from schema.auth import SendCodeRequest
+from service.idempotency import IdempotencyCache
+from service.idempotency.cache import IdempotencyEntry
+
+
+REQUEST = SendCodeRequest(phone_number="79000000000")
+
+
+def make_func(results: list[str], outcome: str | BaseException):
+    async def func() -> str:
+        results.append(outcome)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    return func
+
+
+async def run(cache: IdempotencyCache, caller: str, func) -> str:
+    return await cache.run(
+        scope="send_code", caller=caller, key="key", request=REQUEST, func=func
+    )
+
+
+def test_keys_are_scoped_by_caller():
+    async def main():
+        cache = IdempotencyCache(max_size=10, ttl=60)
+        calls: list[str] = []
+        first = await run(cache, "10.0.0.1", make_func(calls, "first"))
+        second = await run(cache, "10.0.0.2", make_func(calls, "second"))
+        replayed = await run(cache, "10.0.0.1", make_func(calls, "third"))
+        assert (first, second, replayed) == ("first", "second", "first")
+        assert calls == ["first", "second"]
+
+    asyncio.run(main())
+
+
+def test_final_client_error_is_replayed():
+    async def main():
+        cache = IdempotencyCache(max_size=10, ttl=60)
+        calls: list[str] = []
+        error = HTTPException(status_code=409, detail="Already logged in.")
+        for _ in range(2):
+            with pytest.raises(HTTPException) as raised:
+                await run(cache, "10.0.0.1", make_func(calls, error))
+            assert raised.value.status_code == 409
+        assert calls == [error]
+
+    asyncio.run(main())
+
+
+def test_unexpected_error_is_not_replayed_before_its_entry_is_dropped():
+    async def main():
+        cache = IdempotencyCache(max_size=10, ttl=60)
+        failed = asyncio.get_running_loop().create_future()
+        failed.set_exception(RuntimeError("Unexpected error."))
+        failed.exception()
+        # The done callback dropping the entry is still scheduled.
+        cache._add(
+            "send_code:10.0.0.1:key",
+            IdempotencyEntry(fingerprint=cache._fingerprint(REQUEST), task=failed),
+        )
+        calls: list[str] = []
+        result = await run(cache, "10.0.0.1", make_func(calls, "retried"))
+        assert result == "retried"
+
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from service.lock import KeyedLock, SingleFlight
+
+
+def test_keyed_lock_serializes_same_key_only():
+    async def main():
+        keyed_lock = KeyedLock()
+        running: dict[str, int] = {}
+        peaks: dict[str, int] = {}
+
+        async def work(key: str) -> None:
+            async with keyed_lock.acquire(key=key):
+                running[key] = running.get(key, 0) + 1
+                peaks[key] = max(peaks.get(key, 0), running[key])
+                await asyncio.sleep(0.01)
+                running[key] -= 1
+
+        started_at = asyncio.get_running_loop().time()
+        await asyncio.gather(*(work(key) for key in ("a", "b", "c") for _ in range(3)))
+        elapsed = asyncio.get_running_loop().time() - started_at
+        assert peaks == {"a": 1, "b": 1, "c": 1}
+        # Keys run in parallel, three calls of one key take three sleeps.
+        assert elapsed < 0.06
+        assert keyed_lock._entries == {}
+
+    asyncio.run(main())
+
+
+def test_keyed_lock_drops_entries_of_cancelled_waiters():
+    async def main():
+        keyed_lock = KeyedLock()
+        release = asyncio.Event()
+
+        async def hold() -> None:
+            async with keyed_lock.acquire(key="a"):
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert keyed_lock.locked(key="a")
+        assert keyed_lock._entries["a"].users == 2
+
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert keyed_lock._entries["a"].users == 1
+        release.set()
+        await holder
+        assert not keyed_lock.locked(key="a")
+        assert keyed_lock._entries == {}
+
+    asyncio.run(main())
+
+
+def test_single_flight_shares_one_call():
+    async def main():
+        single_flight = SingleFlight()
+        calls = 0
+
+        async def func() -> int:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        results = await asyncio.gather(*(single_flight.do(key="a", func=func) for _ in range(5)))
+        assert results == [1] * 5
+        assert await single_flight.do(key="b", func=func) == 2
+        # Finished calls are not cached.
+        assert single_flight._calls == {}
+        assert await single_flight.do(key="a", func=func) == 3
+
+    asyncio.run(main())
+
+
+def test_single_flight_shares_exception():
+    async def main():
+        single_flight = SingleFlight()
+        calls = 0
+
+        async def func() -> None:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise LookupError(calls)
+
+        results = await asyncio.gather(
+            *(single_flight.do(key="a", func=func) for _ in range(3)), return_exceptions=True
+        )
+        assert [type(result) for result in results] == [LookupError] * 3
+        assert len({id(result) for result in results}) == 1
+        with pytest.raises(LookupError, match="2"):
+            await single_flight.do(key="a", func=func)
+
+    asyncio.run(main())
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    async def main():
+        single_flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def func() -> str:
+            await release.wait()
+            return "done"
+
+        first = asyncio.create_task(single_flight.do(key="a", func=func))
+        second = asyncio.create_task(single_flight.do(key="a", func=func))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        assert first.cancelled()
+
+        release.set()
+        assert await second == "done"
+        assert single_flight._calls == {}
+
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from core import logger
+
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "src")
+
+
+@pytest.fixture
+def redact_key(override_settings):
+    def set_key(key: str) -> None:
+        override_settings("log", redact_key=key)
+        logger._redact_key.cache_clear()
+
+    yield set_key
+    logger._redact_key.cache_clear()
+
+
+def test_redact_is_keyed(redact_key):
+    redact_key("first")
+    first = logger.redact("79000000000")
+    assert first == logger.redact("79000000000")
+    assert len(first) == 12
+    assert first != logger.redact("79000000001")
+
+    redact_key("second")
+    assert logger.redact("79000000000") != first
+
+
+def test_redact_key_is_random_when_unset(redact_key):
+    redact_key("")
+    first = logger.redact("79000000000")
+    logger._redact_key.cache_clear()
+    assert logger.redact("79000000000") != first
+
+
+def test_import_does_not_load_log_settings():
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import core.logger; from core.settings import settings; print('log' in vars(settings))",
+        ],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "False"
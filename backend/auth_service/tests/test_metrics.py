@@ -0,0 +1,90 @@
+import asyncio
+
+from fastapi import FastAPI
+
+from asgi import call
+from api.v1.auth import router as auth_router
+from api.v1.metrics import router as metrics_router
+from middleware import MetricsMiddleware
+from service.metrics import AUTH_REQUEST_LATENCY, Counter, Gauge, Histogram, Registry
+
+
+def test_render_exposition_format():
+    registry = Registry()
+    requests = registry.register(
+        Counter(name="requests_total", help="Requests.\nBy path \\ method.", labelnames=("path",))
+    )
+    requests.labels('/a"b\\c\nd').inc()
+    requests.labels("/").inc(2)
+    connections = registry.register(Gauge(name="connections", help="Connections.")).labels()
+    connections.inc(3)
+    connections.dec()
+    latency = registry.register(
+        Histogram(name="latency_seconds", help="Latency.", labelnames=("op",), buckets=(1.0, 0.1))
+    )
+    child = latency.labels("connect")
+    for value in (0.1, 0.5, 5.0):
+        child.observe(value)
+    collected = []
+
+    async def collect() -> None:
+        collected.append(True)
+        connections.set(connections.value + 10)
+
+    registry.add_collector(collect)
+
+    assert asyncio.run(registry.render()) == (
+        "# HELP requests_total Requests.\\nBy path \\\\ method.\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{path="/a\\"b\\\\c\\nd"} 1.0\n'
+        'requests_total{path="/"} 2.0\n'
+        "# HELP connections Connections.\n"
+        "# TYPE connections gauge\n"
+        "connections 12.0\n"
+        "# HELP latency_seconds Latency.\n"
+        "# TYPE latency_seconds histogram\n"
+        'latency_seconds_bucket{op="connect",le="0.1"} 1\n'
+        'latency_seconds_bucket{op="connect",le="1.0"} 2\n'
+        'latency_seconds_bucket{op="connect",le="+Inf"} 3\n'
+        'latency_seconds_sum{op="connect"} 5.6\n'
+        'latency_seconds_count{op="connect"} 3\n'
+    )
+    assert collected == [True]
+
+
+def test_latency_is_observed_by_route_not_path():
+    app = FastAPI()
+    app.include_router(router=auth_router)
+    app.add_middleware(MetricsMiddleware)
+    histogram = AUTH_REQUEST_LATENCY["send_code_events"]
+
+    async def main():
+        counts = list(histogram.counts)
+        for handle in ("first", "second"):
+            status, _, _ = await call(app, "GET", f"/auth/send_code/events/{handle}")
+            assert status == 404
+        assert sum(histogram.counts) - sum(counts) == 2
+
+        before = [sum(child.counts) for child in AUTH_REQUEST_LATENCY.values()]
+        status, _, _ = await call(app, "GET", "/unknown")
+        assert status == 404
+        assert [sum(child.counts) for child in AUTH_REQUEST_LATENCY.values()] == before
+
+    asyncio.run(main())
+
+
+def test_metrics_endpoint():
+    app = FastAPI()
+    app.include_router(router=metrics_router)
+
+    async def main():
+        status, headers, body = await call(app, "GET", "/metrics")
+        assert status == 200
+        assert headers["content-type"] == Registry.CONTENT_TYPE
+        text = body.decode()
+        assert "# TYPE auth_request_duration_seconds histogram" in text
+        assert 'auth_outcomes_total{outcome="FloodWait"}' in text
+        assert "telegram_session_files " in text
+        assert text.endswith("\n")
+
+    asyncio.run(main())
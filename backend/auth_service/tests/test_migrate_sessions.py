@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from fakes import write_session_file
+from migrate_sessions import MigrationError, migrate
+from service.telegram.session import SharedSessionStore
+
+
+class FailingStore(SharedSessionStore):
+    """Store whose commits fail, like `flush` on a locked or full database."""
+
+    def flush(self) -> int:
+        return 0
+
+
+@pytest.fixture
+def session_dir(tmp_path):
+    for index in range(5):
+        write_session_file(session_dir=str(tmp_path), phone_number=f"7900000000{index}")
+    return str(tmp_path)
+
+
+def test_migrate_removes_files_of_committed_sessions(session_dir, tmp_path_factory):
+    store = SharedSessionStore(path=str(tmp_path_factory.mktemp("store") / "shared.sqlite"))
+    assert migrate(store=store, session_dir=session_dir, remove=True, batch_size=2) == 5
+    assert os.listdir(session_dir) == []
+    for index in range(5):
+        row = store.get(phone_number=f"7900000000{index}")
+        assert row[:3] == (2, "149.154.167.51", 443)
+    store.close()
+
+
+def test_migrate_skips_sessions_already_in_store(session_dir, tmp_path_factory):
+    store = SharedSessionStore(path=str(tmp_path_factory.mktemp("store") / "shared.sqlite"))
+    assert migrate(store=store, session_dir=session_dir, remove=False) == 5
+    assert len(os.listdir(session_dir)) == 5
+    assert migrate(store=store, session_dir=session_dir, remove=True) == 0
+    assert os.listdir(session_dir) == []
+    store.close()
+
+
+def test_failed_commit_keeps_files(session_dir, tmp_path_factory):
+    store = FailingStore(path=str(tmp_path_factory.mktemp("store") / "shared.sqlite"))
+    with pytest.raises(MigrationError):
+        migrate(store=store, session_dir=session_dir, remove=True)
+    assert len(os.listdir(session_dir)) == 5
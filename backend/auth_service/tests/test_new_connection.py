@@ -0,0 +1,78 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.settings import TelegramCredential
+from exception.telegram import TelegramUnavailable
+from fakes import FakeClient, FakeRPCLimiter
+from service.auth.send_code.connection_processing.provider import new
+from service.telegram.credential import CredentialPool
+
+
+PHONE_NUMBER = "79000000000"
+
+
+class FakeClientContext:
+    """Create disconnected fake clients under credentials of a real pool."""
+
+    def __init__(self) -> None:
+        self.credential_pool = CredentialPool(
+            credentials=[TelegramCredential(api_id=1, api_hash="hash")],
+            window=60,
+            rpc_limiter=SimpleNamespace(wait_time=lambda api_id: 0.0),
+        )
+        self.clients: list[FakeClient] = []
+
+    def predict_dc(self, phone_number: str) -> None:
+        return None
+
+    async def create(self, phone_number: str) -> FakeClient:
+        self.credential_pool.acquire()
+        self.clients.append(FakeClient(connected=False))
+        return self.clients[-1]
+
+    async def persist(self, client: FakeClient, phone_number: str) -> None:
+        pass
+
+    def release(self, client: FakeClient) -> None:
+        self.credential_pool.release(api_id=client.api_id)
+
+
+class FailingGuard:
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+    async def connect(self, client: FakeClient) -> None:
+        await client.connect()
+        raise self.error
+
+
+def make_provider(monkeypatch, guard) -> tuple[new.NewConnectionProcessionProvider, FakeClientContext]:
+    context = FakeClientContext()
+    monkeypatch.setattr(new, "get_client_create_context", lambda: context)
+    monkeypatch.setattr(new, "get_connectivity_guard", lambda: guard)
+    monkeypatch.setattr(new, "get_rpc_limiter", lambda: FakeRPCLimiter())
+    monkeypatch.setattr(new, "get_dc_predictor", lambda: None)
+    return new.NewConnectionProcessionProvider(phone_number=PHONE_NUMBER), context
+
+
+@pytest.mark.parametrize(
+    "error",
+    [TelegramUnavailable("Telegram is unavailable.", seconds=5), TimeoutError()],
+    ids=lambda error: type(error).__name__,
+)
+def test_failed_connect_releases_client_and_credential(monkeypatch, error: BaseException):
+    FakeClient.connected = 0
+
+    async def main():
+        provider, context = make_provider(monkeypatch, FailingGuard(error))
+        for _ in range(3):
+            with pytest.raises(type(error)):
+                await provider.process()
+        assert len(context.clients) == 3
+        assert all(client.disconnected.done() for client in context.clients)
+        assert FakeClient.connected == 0
+        assert context.credential_pool.stats()[0]["recent"] == 0
+
+    asyncio.run(main())
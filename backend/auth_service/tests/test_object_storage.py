@@ -0,0 +1,117 @@
+from collections import Counter
+import asyncio
+import datetime
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from db.object import storage as storage_module
+from db.object.reaper import ObjectStorageReaper
+from db.object.storage import ObjectStorage
+from exception.storage import StorageCapacityExceeded
+from fakes import FakeClient
+
+
+MAX_RECORDS = 50
+KEYS = 200
+OPERATIONS = 20000
+TTL = datetime.timedelta(minutes=5)
+
+
+class Clock(datetime.datetime):
+    current = datetime.datetime(2026, 1, 1)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    monkeypatch.setattr(
+        storage_module,
+        "datetime",
+        SimpleNamespace(datetime=Clock, timedelta=datetime.timedelta),
+    )
+    Clock.current = datetime.datetime(2026, 1, 1)
+    FakeClient.connected = 0
+
+
+def check_index(storage: ObjectStorage) -> None:
+    """Every stored record is indexed and counted, stale index entries stay bounded."""
+    assert len(storage.storage) <= MAX_RECORDS
+    index = set(storage._expiry_index)
+    for key, record in storage.storage.items():
+        assert (record["timestamp"] + TTL, key) in index
+    assert len(storage._expiry_index) <= 2 * MAX_RECORDS + 64
+    assert FakeClient.connected == len(storage.storage)
+    steps = Counter(record["step"] for record in storage.storage.values())
+    assert {step: count for step, count in storage.count_by_step().items() if count} == steps
+
+
+@pytest.mark.parametrize("overflow", ["reject", "evict"])
+def test_expiry_index_stays_consistent_under_churn(overflow: str):
+    async def main():
+        rng = random.Random(overflow)
+        storage = ObjectStorage(ttl=TTL, max_records=MAX_RECORDS, overflow=overflow)
+        reaper = ObjectStorageReaper(object_storage=storage, interval=1, batch_size=8)
+        rejected = reaped = 0
+        for operation in range(OPERATIONS):
+            # Bursts of flows, far more than the TTL holds, between quiet periods.
+            pause = TTL if operation % 1000 == 0 else datetime.timedelta()
+            Clock.current += pause + datetime.timedelta(seconds=rng.expovariate(1 / 0.3))
+            key = f"79{rng.randrange(KEYS):09d}"
+            action = rng.random()
+            if action < 0.5:
+                record = await storage.get_record(key)
+                if record is not None:
+                    await record["client"].disconnect()
+                client = FakeClient()
+                try:
+                    await storage.put_record(
+                        key=key,
+                        record={
+                            "client": client,
+                            "step": "validate_code",
+                            "timestamp": Clock.current,
+                        },
+                    )
+                except StorageCapacityExceeded:
+                    assert overflow == "reject"
+                    rejected += 1
+                    await client.disconnect()
+                    # Only unexpired records fill the storage.
+                    assert len(storage.storage) == MAX_RECORDS
+                    assert all(
+                        record["timestamp"] + TTL > Clock.current
+                        for record in storage.storage.values()
+                    )
+            elif action < 0.7:
+                record = await storage.get_record(key)
+                if record is not None:
+                    await storage.update_record(
+                        key=key,
+                        record={**record, "step": "validate_password", "timestamp": Clock.current},
+                    )
+            elif action < 0.85:
+                record = await storage.get_record(key)
+                await storage.delete_record(key=key)
+                if record is not None:
+                    await record["client"].disconnect()
+            else:
+                reaped += await reaper.reap()
+                assert all(
+                    record["timestamp"] + TTL > Clock.current
+                    for record in storage.storage.values()
+                )
+            check_index(storage)
+
+        assert reaped > 0
+        assert (rejected > 0) == (overflow == "reject")
+        Clock.current += TTL
+        await reaper.reap()
+        assert storage.storage == {}
+        assert FakeClient.connected == 0
+
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+import asyncio
+import datetime
+
+import pytest
+
+from db.object.reaper import ObjectStorageReaper
+from db.object.storage import ObjectStorage
+from exception.telegram import CodeExpired, PasswordExpired
+from fakes import FakeClient, FakeConnectivityGuard, FakeRPCLimiter
+from schema.auth import ValidateCodeRequest, ValidatePasswordRequest
+from service.auth import ValidateCodeService, ValidatePasswordService
+from service.auth.post_login import PostLoginPipeline
+from service.crypt import CryptRepository
+from service.handle import FernetHandleCodec
+from service.lock import KeyedLock
+
+
+FLOWS = 50
+TTL = datetime.timedelta(minutes=5)
+
+
+class FakeClientContext:
+    async def persist(self, client: FakeClient, phone_number: str) -> None:
+        await asyncio.sleep(0)
+
+
+class FakeAuthorizedIndex:
+    def __init__(self) -> None:
+        self.authorized: set[str] = set()
+
+    def mark(self, phone_number: str) -> None:
+        self.authorized.add(phone_number)
+
+
+@pytest.fixture(autouse=True)
+def reset_connections(override_settings):
+    override_settings("dc_prediction", enabled=False)
+    FakeClient.connected = 0
+
+
+def make_services(storage: ObjectStorage, pipeline: PostLoginPipeline):
+    dependencies = dict(
+        object_storage=storage,
+        handle_codec=FernetHandleCodec(crypt_repo=CryptRepository()),
+        keyed_lock=KeyedLock(),
+        post_login_pipeline=pipeline,
+        rpc_limiter=FakeRPCLimiter(),
+        connectivity_guard=FakeConnectivityGuard(),
+    )
+    return ValidateCodeService(**dependencies), ValidatePasswordService(**dependencies)
+
+
+def make_pipeline() -> PostLoginPipeline:
+    return PostLoginPipeline(
+        client_context=FakeClientContext(),
+        dc_predictor=None,
+        authorized_index=FakeAuthorizedIndex(),
+        queue_size=8,
+    )
+
+
+async def start_flows(
+    service: ValidateCodeService,
+    storage: ObjectStorage,
+    step: str = "validate_code",
+    age: datetime.timedelta = datetime.timedelta(),
+) -> list[str]:
+    handles = []
+    for index in range(FLOWS):
+        phone_number = f"79{index:09d}"
+        handle = await service._handle_codec.issue(phone_number=phone_number)
+        await storage.put_record(
+            key=phone_number,
+            record={
+                "client": FakeClient(),
+                "api_id": 1,
+                "handle": handle,
+                "phone_code_hash": "hash",
+                "step": step,
+                "timestamp": datetime.datetime.now() - age,
+            },
+        )
+        handles.append(handle)
+    return handles
+
+
+def test_connections_return_to_baseline_after_logins():
+    async def main():
+        storage = ObjectStorage(ttl=TTL, max_records=None, overflow="reject")
+        pipeline = make_pipeline()
+        pipeline.start(workers=2)
+        validate_code, validate_password = make_services(storage, pipeline)
+        code_handles = await start_flows(validate_code, storage)
+        assert FakeClient.connected == FLOWS
+
+        responses = await asyncio.gather(
+            *(
+                validate_code.validate(ValidateCodeRequest(session=handle, code=12345))
+                for handle in code_handles
+            )
+        )
+        assert {response.step for response in responses} == {"final"}
+        await pipeline.stop(timeout=5)
+        assert FakeClient.connected == 0
+        assert storage.storage == {}
+
+        pipeline.start(workers=2)
+        password_handles = await start_flows(validate_password, storage, step="validate_password")
+        for handle in password_handles:
+            await validate_password.validate(
+                ValidatePasswordRequest(session=handle, password="password")
+            )
+        await pipeline.stop(timeout=5)
+        assert FakeClient.connected == 0
+
+    asyncio.run(main())
+
+
+def test_connections_return_to_baseline_after_flows_expire(override_settings):
+    override_settings("storage", ttl=int(TTL.total_seconds()))
+
+    async def main():
+        storage = ObjectStorage(ttl=TTL, max_records=None, overflow="reject")
+        validate_code, validate_password = make_services(storage, make_pipeline())
+        age = TTL + datetime.timedelta(seconds=1)
+
+        # Abandoned flows are reaped.
+        await start_flows(validate_code, storage, age=age)
+        assert FakeClient.connected == FLOWS
+        reaper = ObjectStorageReaper(object_storage=storage, interval=1, batch_size=16)
+        assert await reaper.reap() == FLOWS
+        assert FakeClient.connected == 0
+
+        # Flows expiring on validation release their clients.
+        for handle in await start_flows(validate_code, storage, age=age):
+            with pytest.raises(CodeExpired):
+                await validate_code.validate(ValidateCodeRequest(session=handle, code=12345))
+        assert FakeClient.connected == 0
+
+        for handle in await start_flows(validate_password, storage, step="validate_password", age=age):
+            with pytest.raises(PasswordExpired):
+                await validate_password.validate(
+                    ValidatePasswordRequest(session=handle, password="password")
+                )
+        assert FakeClient.connected == 0
+
+    asyncio.run(main())
@@ -0,0 +1,174 @@
+import asyncio
+
+import pytest
+
+from fakes import FakeClient
+from service.telegram.proxy import (
+    EWMALatencyStrategy,
+    LeastConnectionsStrategy,
+    ProxyEndpoint,
+    ProxyPool,
+    get_proxy_pool,
+)
+from service.telegram.proxy import pool as pool_module
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class ProbeWriter:
+    def close(self) -> None:
+        pass
+
+    async def wait_closed(self) -> None:
+        pass
+
+
+class Probe:
+    """Stub of the probe connection, failing for the hosts in `down`."""
+
+    def __init__(self, clock: Clock) -> None:
+        self.clock = clock
+        self.down: set[str] = set()
+        self.latency = 0.01
+
+    async def open_connection(self, host: str, port: int):
+        if host in self.down:
+            raise ConnectionRefusedError(f"{host} is down")
+        self.clock.now += self.latency
+        return None, ProbeWriter()
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(pool_module, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def probe(monkeypatch, clock) -> Probe:
+    probe = Probe(clock)
+    monkeypatch.setattr(pool_module.asyncio, "open_connection", probe.open_connection)
+    return probe
+
+
+def make_pool(strategy, hosts=("a", "b", "c"), eject_failures: int = 2) -> ProxyPool:
+    return ProxyPool(
+        endpoints=[ProxyEndpoint(scheme="socks5", hostname=host, port=1080) for host in hosts],
+        strategy=strategy,
+        alpha=0.5,
+        probe_timeout=1,
+        eject_failures=eject_failures,
+        eject_time=60,
+    )
+
+
+def endpoint(pool: ProxyPool, host: str) -> ProxyEndpoint:
+    return pool.find(("socks5", host, 1080))
+
+
+def test_ewma_prefers_fast_and_idle_proxies(clock):
+    pool = make_pool(EWMALatencyStrategy(), hosts=("a", "b"))
+    a, b = endpoint(pool, "a"), endpoint(pool, "b")
+    pool.success(endpoint=a, latency=0.1)
+    pool.success(endpoint=a, latency=0.2)
+    assert a.latency == pytest.approx(0.15)
+    pool.success(endpoint=b, latency=0.2)
+    assert pool.select() is a
+
+    # Latency is weighted by the clients the proxy already serves.
+    a.active = 1
+    assert pool.select() is b
+
+
+def test_least_connections_counts_connected_clients(clock):
+    async def main():
+        pool = make_pool(LeastConnectionsStrategy(), hosts=("a", "b"))
+        a, b = endpoint(pool, "a"), endpoint(pool, "b")
+        clients = [FakeClient(), FakeClient()]
+        for client in clients:
+            pool.track(client=client, endpoint=a)
+        pool.track(client=FakeClient(), endpoint=b)
+        assert (a.active, b.active) == (2, 1)
+        assert pool.select() is b
+
+        for client in clients:
+            await client.disconnect()
+        # Done callbacks of the disconnected futures run on the next loop turn.
+        await asyncio.sleep(0)
+        assert a.active == 0
+        assert pool.select() is a
+
+    asyncio.run(main())
+
+
+def test_failing_proxy_is_ejected_and_readmitted(clock, probe):
+    async def main():
+        pool = make_pool(LeastConnectionsStrategy(), hosts=("a", "b"))
+        a, b = endpoint(pool, "a"), endpoint(pool, "b")
+        probe.down.add("a")
+        await pool.probe(endpoint=a)
+        assert not a.ejected
+        await pool.probe(endpoint=a)
+        assert a.ejected
+        assert {pool.select() for _ in range(20)} == {b}
+
+        # A successful probe re-admits it once the eject time is over.
+        probe.down.clear()
+        await pool.probe(endpoint=a)
+        assert a.ejected
+        clock.now += 60
+        await pool.probe(endpoint=a)
+        assert not a.ejected
+        assert a.latency == pytest.approx(probe.latency)
+        assert (a.attempts, a.errors, a.failures) == (4, 2, 0)
+
+    asyncio.run(main())
+
+
+def test_least_recently_ejected_proxy_is_used_when_all_are_ejected(clock):
+    pool = make_pool(EWMALatencyStrategy(), hosts=("a", "b"), eject_failures=1)
+    pool.failure(endpoint=endpoint(pool, "b"))
+    clock.now += 1
+    pool.failure(endpoint=endpoint(pool, "a"))
+    assert pool.select() is endpoint(pool, "b")
+
+
+def test_pool_file_is_merged_with_pool_setting(tmp_path, override_settings):
+    pool_file = tmp_path / "proxies.txt"
+    pool_file.write_text(
+        "# proxies of the data center\n"
+        "socks5://b:1080\n"
+        "\n"
+        "  http://user:secret@c:3128  \n"
+        "socks5://a:1080\n"
+    )
+    override_settings(
+        "proxy", port=9150, pool=["socks5://a:1080"], pool_file=str(pool_file), strategy="ewma"
+    )
+    pool = get_proxy_pool.__wrapped__()
+    assert [stats["proxy"] for stats in pool.stats()] == [
+        "socks5://a:1080",
+        "socks5://b:1080",
+        "http://c:3128",
+    ]
+    assert endpoint(pool, "b") is not None
+    assert pool.find(("http", "c", 3128)).as_telethon() == (
+        "http", "c", 3128, True, "user", "secret"
+    )
+
+    override_settings("proxy", port=9150, hostname="tor", pool_file=None)
+    assert [stats["proxy"] for stats in get_proxy_pool.__wrapped__().stats()] == [
+        "socks5://tor:9150"
+    ]
+
+    pool_file.write_text("socks5://no-port\n")
+    override_settings("proxy", port=9150, pool_file=str(pool_file))
+    with pytest.raises(ValueError):
+        get_proxy_pool.__wrapped__()
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from asgi import EchoApp, call
+from middleware.rate_limit import middleware
+from middleware.rate_limit.middleware import RateLimitMiddleware
+
+
+@pytest.fixture(autouse=True)
+def limits(override_settings):
+    override_settings("rate_limit", enabled=True, ip_burst=1000, phone_burst=2, phone_rate=0.01)
+    override_settings("batch", max_size=5)
+    middleware.get_rate_limit_backend.cache_clear()
+    yield
+    middleware.get_rate_limit_backend.cache_clear()
+
+
+def test_batch_charges_every_phone_number():
+    async def main():
+        app = EchoApp()
+        limited = RateLimitMiddleware(app)
+        for _ in range(2):
+            status, _, _ = await call(
+                limited, "POST", "/v1/auth/send_code", body={"phone_number": "79000000001"}
+            )
+            assert status == 200
+
+        # A batch with a throttled phone number is throttled as a whole.
+        batch = {"phone_numbers": ["79000000001", "79000000002"]}
+        status, headers, _ = await call(limited, "POST", "/v1/auth/send_code/batch", body=batch)
+        assert status == 429
+        assert int(headers["retry-after"]) > 0
+
+        # Phone numbers of accepted batches are charged as single requests are.
+        batch = {"phone_numbers": ["79000000003", "79000000003", "79000000004"]}
+        for _ in range(2):
+            status, _, _ = await call(limited, "POST", "/v1/auth/send_code/batch", body=batch)
+            assert status == 200
+        status, _, _ = await call(
+            limited, "POST", "/v1/auth/send_code", body={"phone_number": "79000000004"}
+        )
+        assert status == 429
+        assert len(app.bodies) == 4
+
+    asyncio.run(main())
+
+
+def test_oversized_body_is_rejected_unread(override_settings):
+    override_settings("project", title="Auth API", description="Auth API", max_body_size=1024)
+
+    async def main():
+        app = EchoApp()
+        body = b'{"phone_numbers": [' + b'"79000000001",' * 100 + b'"79000000002"]}'
+        status, _, _ = await call(RateLimitMiddleware(app), "POST", "/v1/auth/send_code/batch", body=body)
+        assert status == 413
+        assert app.bodies == []
+
+        status, _, echoed = await call(
+            RateLimitMiddleware(app), "POST", "/v1/auth/send_code", body=body[:1000]
+        )
+        assert status == 200 and echoed == body[:1000]
+
+    asyncio.run(main())
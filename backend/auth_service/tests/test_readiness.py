@@ -0,0 +1,53 @@
+import asyncio
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from db.object.storage import ObjectStorage
+from service.health import readiness
+from service.health.readiness import ReadinessService
+
+
+def make_service() -> ReadinessService:
+    return ReadinessService(
+        loop_lag_monitor=SimpleNamespace(percentiles=lambda: {"p50": 0.0, "p99": 0.0}),
+        telegram_activity=SimpleNamespace(
+            failing_for=lambda now: 0.0, last_success_age=lambda now: None
+        ),
+        max_loop_lag=0.5,
+        max_pending_flows=2,
+        max_connections=1000,
+        max_telegram_failing=60,
+    )
+
+
+@pytest.mark.parametrize(
+    ("steps", "ready"),
+    [(["validate_code", "validate_password"], True), (["validate_code"] * 3, False)],
+)
+def test_pending_flows_are_read_from_storage_counters(monkeypatch, steps: list[str], ready: bool):
+    storage = ObjectStorage(ttl=datetime.timedelta(minutes=5), max_records=None, overflow="reject")
+    monkeypatch.setattr(readiness, "get_object_storage", lambda: storage)
+
+    async def main():
+        for index, step in enumerate(steps):
+            await storage.put_record(
+                key=f"79{index:09d}",
+                record={"step": step, "timestamp": datetime.datetime.now()},
+            )
+        # Flows leaving the storage stop counting.
+        await storage.put_record(key="gone", record={"step": "validate_code"})
+        await storage.delete_record(key="gone")
+        return await make_service().check()
+
+    is_ready, report = asyncio.run(main())
+    assert is_ready is ready
+    assert report["pending_flows"] == len(steps)
+
+
+def test_pending_flows_are_unknown_with_redis(monkeypatch):
+    monkeypatch.setattr(readiness, "get_object_storage", lambda: object())
+    is_ready, report = asyncio.run(make_service().check())
+    assert is_ready
+    assert report["pending_flows"] is None
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+from telethon import errors
+import pytest
+
+from exception.telegram import FloodWait
+from service.telegram.rpc import RPCLimiter, TelegramActivity
+
+
+class MigratingClient:
+    """Client answering calls with a flood wait after migrating to `migrate_to`."""
+
+    def __init__(self, dc_id: int = 2, migrate_to: int | None = None) -> None:
+        self.api_id = 1
+        self.session = SimpleNamespace(dc_id=dc_id)
+        self._migrate_to = migrate_to
+        self.flood_wait = 0
+
+    async def send_code_request(self, phone_number: str) -> str:
+        if self._migrate_to is not None:
+            self.session.dc_id = self._migrate_to
+        if self.flood_wait:
+            raise errors.FloodWaitError(request=None, capture=self.flood_wait)
+        return phone_number
+
+    async def sign_in(self, phone: str) -> str:
+        return phone
+
+
+def make_limiter(max_wait: float = 1) -> RPCLimiter:
+    return RPCLimiter(
+        api_rate=1000,
+        api_burst=1000,
+        dc_rate=1000,
+        dc_burst=1000,
+        max_wait=max_wait,
+        activity=TelegramActivity(),
+    )
+
+
+def test_flood_wait_blocks_only_its_phone_number_and_method():
+    async def main():
+        limiter = make_limiter()
+        client = MigratingClient()
+        client.flood_wait = 60
+        with pytest.raises(FloodWait):
+            await limiter.call(client, client.send_code_request, "1", flood_key="1")
+        client.flood_wait = 0
+
+        # The same phone number and method is rejected without calling telegram.
+        with pytest.raises(FloodWait) as error:
+            await limiter.call(client, client.send_code_request, "1", flood_key="1")
+        assert 59 <= error.value.seconds <= 60
+        # Other phone numbers and other methods of the same DC go through.
+        assert await limiter.call(client, client.send_code_request, "2", flood_key="2") == "2"
+        assert await limiter.call(client, client.sign_in, phone="1", flood_key="1") == "1"
+        assert limiter.wait_time(api_id=client.api_id) == 0
+
+    asyncio.run(main())
+
+
+def test_short_flood_wait_delays_the_next_call():
+    async def main():
+        limiter = make_limiter(max_wait=5)
+        client = MigratingClient()
+        client.flood_wait = 1
+        with pytest.raises(FloodWait):
+            await limiter.call(client, client.send_code_request, "1", flood_key="1")
+        client.flood_wait = 0
+
+        started_at = asyncio.get_running_loop().time()
+        await limiter.call(client, client.send_code_request, "1", flood_key="1")
+        assert asyncio.get_running_loop().time() - started_at >= 0.9
+
+    asyncio.run(main())
+
+
+def test_flood_wait_reports_dc_after_migration(caplog):
+    async def main():
+        limiter = make_limiter()
+        client = MigratingClient(dc_id=2, migrate_to=4)
+        client.flood_wait = 60
+        with caplog.at_level(logging.WARNING), pytest.raises(FloodWait):
+            await limiter.call(client, client.send_code_request, "1", flood_key="1")
+
+    asyncio.run(main())
+    assert "send_code_request on DC 4" in caplog.text
@@ -0,0 +1,113 @@
+import asyncio
+import datetime
+import logging
+
+from pydantic import ValidationError
+import pytest
+
+from db.object.storage import ObjectStorage
+from exception.storage import StorageCapacityExceeded
+from fakes import FakeClient, FakeNewConnectionProvider
+from schema.auth import SendCodeBatchRequest, SendCodeRequest
+from service.auth.send_code import facade
+from service.auth.send_code.facade import SendCodeService
+from service.handle import OpaqueHandleCodec
+from service.lock import KeyedLock, SingleFlight
+
+
+@pytest.fixture(autouse=True)
+def fake_provider(monkeypatch):
+    monkeypatch.setattr(facade, "NewConnectionProcessionProvider", FakeNewConnectionProvider)
+    FakeNewConnectionProvider.calls = 0
+    FakeClient.connected = 0
+
+
+def make_service(max_flows: int, overflow: str = "reject") -> tuple[SendCodeService, ObjectStorage]:
+    storage = ObjectStorage(
+        ttl=datetime.timedelta(minutes=5), max_records=max_flows, overflow=overflow
+    )
+    service = SendCodeService(
+        object_storage=storage,
+        keyed_lock=KeyedLock(),
+        single_flight=SingleFlight(),
+        handle_codec=OpaqueHandleCodec(
+            handle_storage=ObjectStorage(
+                ttl=datetime.timedelta(minutes=5), max_records=None, overflow="reject"
+            )
+        ),
+    )
+    return service, storage
+
+
+def request(index: int) -> SendCodeRequest:
+    return SendCodeRequest(phone_number=f"7900000{index:04d}")
+
+
+def test_full_storage_rejects_before_connecting():
+    async def main():
+        service, _ = make_service(max_flows=1)
+        await service.send_code(request(0))
+        with pytest.raises(StorageCapacityExceeded):
+            await service.send_code(request(1))
+        assert FakeNewConnectionProvider.calls == 1
+        assert FakeClient.connected == 1
+
+    asyncio.run(main())
+
+
+def test_phone_numbers_are_not_logged(caplog):
+    async def main():
+        service, _ = make_service(max_flows=1, overflow="evict")
+        for index in range(2):
+            await service.send_code(request(index))
+        service, _ = make_service(max_flows=1)
+        await service.send_code(request(2))
+        with pytest.raises(StorageCapacityExceeded) as error:
+            await service.send_code(request(3))
+        return str(error.value)
+
+    caplog.set_level(logging.DEBUG)
+    message = asyncio.run(main())
+    phone_numbers = [request(index).phone_number for index in range(4)]
+    assert caplog.records
+    for text in (caplog.text, message):
+        assert not any(phone_number in text for phone_number in phone_numbers)
+
+
+def test_concurrent_flows_over_capacity_release_their_clients():
+    async def main():
+        service, storage = make_service(max_flows=2)
+        results = await asyncio.gather(
+            *(service.send_code(request(index)) for index in range(5)),
+            return_exceptions=True,
+        )
+        rejected = [result for result in results if isinstance(result, BaseException)]
+        assert len(rejected) == 3
+        assert all(isinstance(result, StorageCapacityExceeded) for result in rejected)
+        # Every flow passed the capacity check and connected, only stored ones stay so.
+        assert FakeNewConnectionProvider.calls == 5
+        assert FakeClient.connected == len(storage.storage) == 2
+        handles = service._handle_codec._handle_storage.storage
+        assert len(handles) == 2
+
+    asyncio.run(main())
+
+
+def test_evicted_flows_release_their_clients():
+    async def main():
+        service, storage = make_service(max_flows=2, overflow="evict")
+        for index in range(5):
+            await service.send_code(request(index))
+        assert FakeClient.connected == len(storage.storage) == 2
+        assert list(storage.storage) == [request(3).phone_number, request(4).phone_number]
+
+    asyncio.run(main())
+
+
+def test_batch_size_limit_is_read_on_validation(override_settings):
+    phone_numbers = [request(index).phone_number for index in range(3)]
+    override_settings("batch", max_size=3)
+    assert SendCodeBatchRequest(phone_numbers=phone_numbers).phone_numbers == phone_numbers
+    override_settings("batch", max_size=2)
+    with pytest.raises(ValidationError):
+        SendCodeBatchRequest(phone_numbers=phone_numbers)
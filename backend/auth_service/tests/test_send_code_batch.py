@@ -0,0 +1,164 @@
+import asyncio
+import datetime
+
+import orjson
+import pytest
+
+from asgi import auth_app, call
+from db.object.storage import ObjectStorage
+from exception.telegram import FloodWait
+from fakes import FakeClient, FakeNewConnectionProvider
+from service.auth import get_send_code_batch_service
+from service.auth.send_code import facade
+from service.auth.send_code.batch import SendCodeBatchService
+from service.auth.send_code.facade import SendCodeService
+from service.handle import OpaqueHandleCodec
+from service.lock import KeyedLock, SingleFlight
+
+
+TTL = datetime.timedelta(minutes=5)
+
+
+class DelayedProvider(FakeNewConnectionProvider):
+    """Send the code after `delays[phone_number]` seconds, or raise `errors[phone_number]`."""
+
+    delays: dict[str, float] = {}
+    errors: dict[str, BaseException] = {}
+    started = 0
+
+    async def process(self):
+        DelayedProvider.started += 1
+        await asyncio.sleep(self.delays.get(self.phone_number, 0))
+        if self.phone_number in self.errors:
+            raise self.errors[self.phone_number]
+        return await super().process()
+
+
+@pytest.fixture(autouse=True)
+def delayed_provider(monkeypatch):
+    monkeypatch.setattr(facade, "NewConnectionProcessionProvider", DelayedProvider)
+    monkeypatch.setattr(DelayedProvider, "delays", {})
+    monkeypatch.setattr(DelayedProvider, "errors", {})
+    DelayedProvider.started = 0
+    FakeClient.connected = 0
+
+
+def make_app(concurrency: int = 10):
+    service = SendCodeBatchService(
+        send_code_service=SendCodeService(
+            object_storage=ObjectStorage(ttl=TTL, max_records=100, overflow="reject"),
+            keyed_lock=KeyedLock(),
+            single_flight=SingleFlight(),
+            handle_codec=OpaqueHandleCodec(
+                handle_storage=ObjectStorage(ttl=TTL, max_records=None, overflow="reject")
+            ),
+        ),
+        concurrency=concurrency,
+    )
+    return auth_app({get_send_code_batch_service: lambda: service})
+
+
+async def send_batch(app, phone_numbers: list[str]) -> tuple[int, list[dict]]:
+    status, _, body = await call(
+        app, "POST", "/auth/send_code/batch", body={"phone_numbers": phone_numbers}
+    )
+    return status, [orjson.loads(line) for line in body.splitlines()]
+
+
+def test_lines_come_in_completion_order():
+    phone_numbers = ["79000000001", "79000000002", "79000000003"]
+    DelayedProvider.delays.update(zip(phone_numbers, (0.06, 0.02, 0.04)))
+
+    async def main():
+        status, lines = await send_batch(make_app(), phone_numbers)
+        assert status == 200
+        assert [line["phone_number"] for line in lines] == [
+            "79000000002",
+            "79000000003",
+            "79000000001",
+        ]
+        assert all(line["step"] == "validate_code" and line["session"] for line in lines)
+
+    asyncio.run(main())
+
+
+def test_failed_phone_number_does_not_abort_the_batch():
+    phone_numbers = ["79000000001", "79000000002", "79000000003"]
+    DelayedProvider.errors["79000000002"] = FloodWait("Flood limit reached.", seconds=30)
+    DelayedProvider.errors["79000000003"] = RuntimeError("Unexpected error.")
+
+    async def main():
+        status, lines = await send_batch(make_app(), phone_numbers)
+        assert status == 200
+        lines.sort(key=lambda line: line["phone_number"])
+        assert lines[0].pop("session")
+        assert lines == [
+            {"phone_number": "79000000001", "step": "validate_code"},
+            {"phone_number": "79000000002", "error": "FloodWait", "retry_after": 30},
+            {"phone_number": "79000000003", "error": "Internal"},
+        ]
+
+    asyncio.run(main())
+
+
+def test_batch_over_max_size_is_rejected(override_settings):
+    override_settings("batch", max_size=2)
+
+    async def main():
+        app = make_app()
+        status, _ = await send_batch(app, ["79000000001", "79000000002"])
+        assert status == 200
+        status, _, _ = await call(
+            app,
+            "POST",
+            "/auth/send_code/batch",
+            body={"phone_numbers": ["79000000001", "79000000002", "79000000003"]},
+        )
+        assert status == 422
+        assert DelayedProvider.started == 2
+
+    asyncio.run(main())
+
+
+def test_client_disconnect_cancels_pending_phone_numbers():
+    phone_numbers = [f"7900000000{index}" for index in range(5)]
+    DelayedProvider.delays.update(dict.fromkeys(phone_numbers[1:], 0.05))
+
+    async def main():
+        app = make_app(concurrency=2)
+        pending = [orjson.dumps({"phone_numbers": phone_numbers})]
+        lines = []
+        first_line = asyncio.Event()
+
+        async def receive():
+            if pending:
+                return {"type": "http.request", "body": pending.pop(), "more_body": False}
+            await first_line.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                lines.append(orjson.loads(message["body"]))
+                first_line.set()
+
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/auth/send_code/batch",
+            "raw_path": b"/auth/send_code/batch",
+            "query_string": b"",
+            "headers": [(b"content-type", b"application/json")],
+            "http_version": "1.1",
+            "scheme": "http",
+            "server": ("testserver", 80),
+            "client": ("10.0.0.1", 50000),
+            "root_path": "",
+        }
+        await asyncio.wait_for(app(scope, receive, send), timeout=5)
+        assert [line["phone_number"] for line in lines] == [phone_numbers[0]]
+        # Phone numbers in flight finish for the flows sharing them, the
+        # ones waiting for the semaphore never reach telegram.
+        await asyncio.sleep(0.2)
+        assert DelayedProvider.started == 3
+
+    asyncio.run(main())
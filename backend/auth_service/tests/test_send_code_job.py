@@ -0,0 +1,204 @@
+import asyncio
+import datetime
+
+import orjson
+import pytest
+
+from asgi import auth_app, call
+from db.object.storage import ObjectStorage
+from exception.telegram import FloodWait
+from fakes import FakeClient, FakeNewConnectionProvider
+from service.auth import get_send_code_job_service
+from service.auth.send_code import facade
+from service.auth.send_code.facade import SendCodeService
+from service.auth.send_code.job import SendCodeJobs, SendCodeJobService
+from service.event import EventBus
+from service.handle import OpaqueHandleCodec
+from service.lock import KeyedLock, SingleFlight
+
+
+PHONE_NUMBER = "79000000000"
+TTL = datetime.timedelta(minutes=5)
+
+
+class BlockedProvider(FakeNewConnectionProvider):
+    """Send the code once `sent` is set."""
+
+    sent: asyncio.Event
+
+    async def process(self):
+        await BlockedProvider.sent.wait()
+        return await super().process()
+
+
+@pytest.fixture(autouse=True)
+def blocked_provider(monkeypatch):
+    monkeypatch.setattr(facade, "NewConnectionProcessionProvider", BlockedProvider)
+    FakeClient.connected = 0
+
+
+def make_app(max_running: int = 10, retention: float = 60) -> tuple:
+    BlockedProvider.sent = asyncio.Event()
+    handle_codec = OpaqueHandleCodec(
+        handle_storage=ObjectStorage(ttl=TTL, max_records=None, overflow="reject")
+    )
+    jobs = SendCodeJobs(max_running=max_running)
+    event_bus = EventBus(retention=retention)
+    service = SendCodeJobService(
+        send_code_service=SendCodeService(
+            object_storage=ObjectStorage(ttl=TTL, max_records=10, overflow="reject"),
+            keyed_lock=KeyedLock(),
+            single_flight=SingleFlight(),
+            handle_codec=handle_codec,
+        ),
+        handle_codec=handle_codec,
+        jobs=jobs,
+        event_bus=event_bus,
+    )
+    return auth_app({get_send_code_job_service: lambda: service}), jobs, event_bus
+
+
+async def submit(app, phone_number: str = PHONE_NUMBER) -> tuple[int, dict[str, str], dict]:
+    status, headers, body = await call(
+        app, "POST", "/auth/send_code/async", body={"phone_number": phone_number}
+    )
+    return status, headers, orjson.loads(body)
+
+
+def parse_events(body: bytes) -> list[tuple[str, dict] | None]:
+    events = []
+    for block in body.decode().split("\n\n")[:-1]:
+        if block == ": keep-alive":
+            events.append(None)
+            continue
+        name, data = block.split("\n")
+        events.append((name.removeprefix("event: "), orjson.loads(data.removeprefix("data: "))))
+    return events
+
+
+def test_accepted_job_streams_its_steps(override_settings):
+    override_settings("job", heartbeat=0.01)
+
+    async def main():
+        app, jobs, _ = make_app()
+        status, _, accepted = await submit(app)
+        assert status == 202
+        assert accepted["step"] == "pending"
+        assert jobs.running == 1
+
+        asyncio.get_running_loop().call_later(0.05, BlockedProvider.sent.set)
+        status, headers, body = await call(
+            app, "GET", f"/auth/send_code/events/{accepted['session']}"
+        )
+        assert status == 200
+        assert headers["content-type"].startswith("text/event-stream")
+        events = parse_events(body)
+        # Keep-alive comments are sent while telegram is slow.
+        assert None in events
+        assert [event for event in events if event is not None] == [
+            ("step", {"step": "pending", "session": accepted["session"]}),
+            ("step", {"step": "validate_code", "session": accepted["session"]}),
+        ]
+        assert jobs.running == 0
+
+    asyncio.run(main())
+
+
+def test_subscriber_after_the_job_gets_every_event():
+    async def main():
+        app, jobs, event_bus = make_app()
+        _, _, accepted = await submit(app)
+        BlockedProvider.sent.set()
+        while jobs.running:
+            await asyncio.sleep(0)
+        assert event_bus.get(accepted["session"]).closed
+
+        for _ in range(2):
+            status, _, body = await call(
+                app, "GET", f"/auth/send_code/events/{accepted['session']}"
+            )
+            assert status == 200
+            assert [name for name, _ in parse_events(body)] == ["step", "step"]
+
+    asyncio.run(main())
+
+
+def test_events_expire_after_retention():
+    async def main():
+        app, jobs, event_bus = make_app(retention=0.05)
+        _, _, accepted = await submit(app)
+        BlockedProvider.sent.set()
+        while jobs.running:
+            await asyncio.sleep(0)
+        status, _, _ = await call(app, "GET", f"/auth/send_code/events/{accepted['session']}")
+        assert status == 200
+
+        await asyncio.sleep(0.1)
+        assert event_bus.get(accepted["session"]) is None
+        status, _, _ = await call(app, "GET", f"/auth/send_code/events/{accepted['session']}")
+        assert status == 404
+        status, _, _ = await call(app, "GET", "/auth/send_code/events/unknown")
+        assert status == 404
+
+    asyncio.run(main())
+
+
+def test_jobs_over_max_running_are_rejected(override_settings):
+    override_settings("capacity", retry_after=7)
+
+    async def main():
+        app, jobs, _ = make_app(max_running=2)
+        for index in range(2):
+            status, _, _ = await submit(app, phone_number=f"7900000000{index}")
+            assert status == 202
+        status, headers, body = await submit(app, phone_number="79000000009")
+        assert status == 429
+        assert headers["retry-after"] == "7"
+        assert jobs.running == 2
+
+        BlockedProvider.sent.set()
+        while jobs.running:
+            await asyncio.sleep(0)
+        status, _, _ = await submit(app, phone_number="79000000009")
+        assert status == 202
+        await jobs.stop()
+
+    asyncio.run(main())
+
+
+def test_failed_job_streams_its_error(monkeypatch):
+    async def fail(self):
+        raise FloodWait("Telegram flood limit reached.", seconds=30)
+
+    monkeypatch.setattr(BlockedProvider, "process", fail)
+
+    async def main():
+        app, jobs, _ = make_app()
+        _, _, accepted = await submit(app)
+        status, _, body = await call(
+            app, "GET", f"/auth/send_code/events/{accepted['session']}"
+        )
+        assert status == 200
+        assert parse_events(body) == [
+            ("step", {"step": "pending", "session": accepted["session"]}),
+            ("error", {"error": "FloodWait", "retry_after": 30}),
+        ]
+
+    asyncio.run(main())
+
+
+def test_stream_of_job_cancelled_on_shutdown_ends():
+    async def main():
+        app, jobs, _ = make_app()
+        _, _, accepted = await submit(app)
+        # Cancelled before the job started.
+        await jobs.stop()
+        status, _, body = await asyncio.wait_for(
+            call(app, "GET", f"/auth/send_code/events/{accepted['session']}"), timeout=1
+        )
+        assert status == 200
+        assert parse_events(body) == [
+            ("step", {"step": "pending", "session": accepted["session"]}),
+        ]
+
+    asyncio.run(main())
@@ -0,0 +1,43 @@
+import asyncio
+import os
+import threading
+
+from telethon.crypto import AuthKey
+from telethon.sessions import SQLiteSession
+
+from service.telegram.session import ThreadedSQLiteSession
+
+
+def test_session_table_is_written_off_the_loop(tmp_path, monkeypatch):
+    path = str(tmp_path / "79000000000")
+    writers: list[str] = []
+    update_session_table = ThreadedSQLiteSession._update_session_table
+
+    def record_writer(self) -> None:
+        writers.append(threading.current_thread().name)
+        update_session_table(self)
+
+    async def main():
+        session = await ThreadedSQLiteSession.open(phone_number=path)
+        monkeypatch.setattr(ThreadedSQLiteSession, "_update_session_table", record_writer)
+        auth_key = AuthKey(data=os.urandom(256))
+
+        session.set_dc(4, "149.154.167.91", 443)
+        session.auth_key = auth_key
+        session.takeout_id = 7
+        assert writers == []
+        await session.save()
+        assert len(writers) == 1
+        assert writers[0].startswith("blocking")
+
+        session.set_dc(2, "149.154.167.51", 443)
+        await session.close()
+        assert len(writers) == 2
+        return auth_key
+
+    auth_key = asyncio.run(main())
+    stored = SQLiteSession(path)
+    assert (stored.dc_id, stored.server_address, stored.port) == (2, "149.154.167.51", 443)
+    assert stored.auth_key.key == auth_key.key
+    assert stored.takeout_id == 7
+    stored.close()
@@ -0,0 +1,86 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from asgi import EchoApp, call
+from middleware import trace as trace_middleware
+from middleware.cluster import ClusterMiddleware
+from middleware.trace import TraceMiddleware
+from service.trace import Span, Tracer
+
+
+TRACE_ID = "0af7651916cd43dd8448eb211c80319c"
+SAMPLED = f"00-{TRACE_ID}-b7ad6b7169203331-01"
+UNSAMPLED = f"00-{TRACE_ID}-b7ad6b7169203331-00"
+
+
+def make_tracer(sample_rate: float) -> tuple[Tracer, list[Span]]:
+    spans: list[Span] = []
+    return Tracer(sample_rate=sample_rate, export=spans.append), spans
+
+
+@pytest.mark.parametrize(
+    ("sample_rate", "traceparent", "trusted", "sampled"),
+    [
+        # Clients cannot force tracing on, nor off.
+        (0, SAMPLED, False, False),
+        (1, UNSAMPLED, False, True),
+        (1, None, False, True),
+        # Cluster nodes pass on their decision.
+        (0, SAMPLED, True, True),
+        (1, UNSAMPLED, True, False),
+        (1, None, True, False),
+    ],
+)
+def test_only_trusted_callers_decide_sampling(sample_rate, traceparent, trusted, sampled):
+    tracer, spans = make_tracer(sample_rate)
+    with tracer.start_trace(name="POST", traceparent=traceparent, trusted=trusted) as span:
+        assert (span is not None) is sampled
+    assert len(spans) == int(sampled)
+
+
+def test_sampled_request_joins_trace_of_caller():
+    tracer, spans = make_tracer(1)
+    with tracer.start_trace(name="POST", traceparent=SAMPLED):
+        pass
+    assert f"{spans[0].trace_id:032x}" == TRACE_ID
+    assert f"{spans[0].parent_id:016x}" == "b7ad6b7169203331"
+
+
+def test_client_traceparent_does_not_force_sampling(override_settings, monkeypatch):
+    override_settings("cluster", enabled=True, secret="secret")
+    tracer, spans = make_tracer(0)
+    monkeypatch.setattr(trace_middleware, "get_tracer", lambda: tracer)
+    app = TraceMiddleware(EchoApp())
+
+    async def main():
+        _, headers, _ = await call(
+            app, "POST", "/v1/auth/send_code", body={}, headers=[("traceparent", SAMPLED)]
+        )
+        assert "traceparent" not in headers
+        _, headers, _ = await call(
+            app,
+            "POST",
+            "/v1/auth/send_code",
+            body={},
+            headers=[("traceparent", SAMPLED), ("x-cluster-token", "secret")],
+        )
+        assert headers["traceparent"].startswith(f"00-{TRACE_ID}-")
+
+    asyncio.run(main())
+    assert len(spans) == 1
+
+
+@pytest.mark.parametrize("sample_rate", [0, 1])
+def test_forwarded_request_carries_sampling_of_the_node(override_settings, sample_rate: float):
+    override_settings("cluster", enabled=True, secret="secret")
+    tracer, _ = make_tracer(sample_rate)
+    router = SimpleNamespace(node_id="node-1")
+    scope = {"headers": [(b"traceparent", SAMPLED.encode())], "client": ("10.0.0.1", 50000)}
+    with tracer.start_trace(name="POST", traceparent=SAMPLED) as span:
+        headers = dict(ClusterMiddleware._headers(router, scope))
+    if span is None:
+        assert b"traceparent" not in headers
+    else:
+        assert headers[b"traceparent"] == span.traceparent.encode()
@@ -0,0 +1,240 @@
+import asyncio
+import datetime
+import os
+from types import SimpleNamespace
+
+from fakeredis import FakeAsyncRedis
+from telethon import errors
+from telethon.crypto import AuthKey
+import pytest
+
+from core.settings import TelegramCredential
+from db.object.storage import ObjectStorage
+from db.redis.storage import RedisStorage
+from fakes import (
+    FakeClient,
+    FakeConnectivityGuard,
+    FakePostLoginPipeline,
+    FakeRecordSerializer,
+    FakeRPCLimiter,
+)
+from schema.auth import ValidateCodeRequest, ValidatePasswordRequest
+from service.auth import ValidateCodeService, ValidatePasswordService
+from service.crypt import CryptRepository
+from service.handle import FernetHandleCodec
+from service.lock import KeyedLock
+from service.telegram.client.create.context import ClientCreateContext
+from service.telegram.client.create.repository import ClientRepository
+from service.telegram.client.serializer import ClientRecordSerializer
+from service.telegram.credential import CredentialPool
+
+
+PHONE_NUMBER = "79000000000"
+TTL = datetime.timedelta(minutes=5)
+
+
+@pytest.fixture(autouse=True)
+def reset_connections():
+    FakeClient.connected = 0
+
+
+def make_services(storage) -> tuple[ValidateCodeService, ValidatePasswordService, FakePostLoginPipeline]:
+    pipeline = FakePostLoginPipeline()
+    dependencies = dict(
+        object_storage=storage,
+        handle_codec=FernetHandleCodec(crypt_repo=CryptRepository()),
+        keyed_lock=KeyedLock(),
+        post_login_pipeline=pipeline,
+        rpc_limiter=FakeRPCLimiter(),
+        connectivity_guard=FakeConnectivityGuard(),
+    )
+    return ValidateCodeService(**dependencies), ValidatePasswordService(**dependencies), pipeline
+
+
+async def start_flow(service: ValidateCodeService, storage, step: str = "validate_code") -> str:
+    handle = await service._handle_codec.issue(phone_number=PHONE_NUMBER)
+    await storage.put_record(
+        key=PHONE_NUMBER,
+        record={
+            "client": FakeClient(),
+            "api_id": 1,
+            "handle": handle,
+            "phone_code_hash": "hash",
+            "step": step,
+            "timestamp": datetime.datetime.now(),
+        },
+    )
+    return handle
+
+
+def redis_storage(serializer: FakeRecordSerializer) -> RedisStorage:
+    return RedisStorage(
+        redis=FakeAsyncRedis(),
+        serializer=serializer,
+        ttl=TTL,
+        max_records=10,
+        overflow="reject",
+    )
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        errors.PhoneCodeInvalidError(request=None),
+        errors.FloodWaitError(request=None, capture=5),
+        TimeoutError(),
+    ],
+    ids=lambda error: type(error).__name__,
+)
+def test_validate_code_failure_releases_restored_client(error: BaseException):
+    async def main():
+        serializer = FakeRecordSerializer()
+        storage = redis_storage(serializer)
+        validate_code, _, _ = make_services(storage)
+        handle = await start_flow(validate_code, storage)
+        # Stored flows hold no connection, restored clients connect on demand.
+        assert FakeClient.connected == 0
+
+        serializer.sign_in_error = error
+        for _ in range(3):
+            with pytest.raises(type(error)):
+                await validate_code.validate(ValidateCodeRequest(session=handle, code=12345))
+            assert FakeClient.connected == 0
+        assert (await storage.get_record(PHONE_NUMBER))["step"] == "validate_code"
+
+    asyncio.run(main())
+
+
+def test_validate_code_password_step_releases_restored_client():
+    async def main():
+        serializer = FakeRecordSerializer()
+        storage = redis_storage(serializer)
+        validate_code, _, _ = make_services(storage)
+        handle = await start_flow(validate_code, storage)
+
+        serializer.sign_in_error = errors.SessionPasswordNeededError(request=None)
+        response = await validate_code.validate(ValidateCodeRequest(session=handle, code=12345))
+        assert response.step == "validate_password"
+        assert FakeClient.connected == 0
+        assert (await storage.get_record(PHONE_NUMBER))["step"] == "validate_password"
+
+    asyncio.run(main())
+
+
+def test_validate_password_failure_releases_restored_client():
+    async def main():
+        serializer = FakeRecordSerializer()
+        storage = redis_storage(serializer)
+        _, validate_password, _ = make_services(storage)
+        handle = await start_flow(validate_password, storage, step="validate_password")
+
+        serializer.sign_in_error = errors.PasswordHashInvalidError(request=None)
+        with pytest.raises(errors.PasswordHashInvalidError):
+            await validate_password.validate(
+                ValidatePasswordRequest(session=handle, password="password")
+            )
+        assert FakeClient.connected == 0
+
+    asyncio.run(main())
+
+
+def test_successful_validation_hands_client_to_post_login():
+    async def main():
+        storage = redis_storage(FakeRecordSerializer())
+        validate_code, _, pipeline = make_services(storage)
+        handle = await start_flow(validate_code, storage)
+
+        response = await validate_code.validate(ValidateCodeRequest(session=handle, code=12345))
+        assert response.step == "final"
+        assert FakeClient.connected == len(pipeline.clients) == 1
+        assert await storage.get_record(PHONE_NUMBER) is None
+        await pipeline.drain()
+        assert FakeClient.connected == 0
+
+    asyncio.run(main())
+
+
+def test_failure_keeps_client_of_object_storage():
+    async def main():
+        storage = ObjectStorage(ttl=TTL, max_records=10, overflow="reject")
+        validate_code, _, _ = make_services(storage)
+        handle = await start_flow(validate_code, storage)
+        client = storage.storage[PHONE_NUMBER]["client"]
+
+        client.sign_in_error = errors.PhoneCodeInvalidError(request=None)
+        with pytest.raises(errors.PhoneCodeInvalidError):
+            await validate_code.validate(ValidateCodeRequest(session=handle, code=12345))
+        assert client.is_connected()
+        assert FakeClient.connected == 1
+
+    asyncio.run(main())
+
+
+def test_client_record_round_trip_through_redis(override_settings):
+    override_settings("telegram", use_proxy=False)
+
+    async def main():
+        credential_pool = CredentialPool(
+            credentials=[
+                TelegramCredential(api_id=1, api_hash="hash"),
+                TelegramCredential(api_id=2, api_hash="hash"),
+            ],
+            window=60,
+            rpc_limiter=SimpleNamespace(wait_time=lambda api_id: 0.0),
+        )
+        client_repo = ClientRepository()
+        client_context = ClientCreateContext(
+            client_repo=client_repo,
+            client_check_handler=None,
+            client_pool=None,
+            dc_predictor=None,
+            authorized_index=None,
+            credential_pool=credential_pool,
+            proxy_pool=None,
+        )
+        redis = FakeAsyncRedis()
+        storage = RedisStorage(
+            redis=redis,
+            serializer=ClientRecordSerializer(client_context=client_context),
+            ttl=TTL,
+            max_records=10,
+            overflow="reject",
+        )
+
+        client = client_repo.string.simple(credential=credential_pool.get(api_id=2))
+        client.session.set_dc(4, "149.154.167.91", 443)
+        client.session.auth_key = AuthKey(data=os.urandom(256))
+        timestamp = datetime.datetime.now()
+        await storage.put_record(
+            key=PHONE_NUMBER,
+            record={"client": client, "api_id": 2, "step": "validate_code", "timestamp": timestamp},
+        )
+        assert 0 < await redis.ttl(RedisStorage.KEY_PREFIX + PHONE_NUMBER) <= TTL.total_seconds()
+        assert await redis.zscore(RedisStorage.INDEX_KEY, PHONE_NUMBER) is not None
+
+        record = await storage.get_record(PHONE_NUMBER)
+        restored = record.pop("client")
+        assert restored is not client
+        assert record == {"api_id": 2, "step": "validate_code", "timestamp": timestamp}
+        assert restored.api_id == 2
+        assert restored.session.dc_id == 4
+        assert restored.session.server_address == "149.154.167.91"
+        assert restored.session.auth_key.key == client.session.auth_key.key
+
+        # Restored clients are connected by the validation, fake just the socket.
+        disconnected = asyncio.Event()
+        restored.is_connected = lambda: not disconnected.is_set()
+
+        async def disconnect() -> None:
+            disconnected.set()
+
+        restored.disconnect = disconnect
+        await storage.release_record({"client": restored})
+        assert disconnected.is_set()
+
+        await storage.delete_record(PHONE_NUMBER)
+        assert not await storage.record_exists(PHONE_NUMBER)
+        assert await redis.zscore(RedisStorage.INDEX_KEY, PHONE_NUMBER) is None
+        assert await storage.has_capacity()
+
+    asyncio.run(main())